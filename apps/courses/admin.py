@@ -1,5 +1,33 @@
 from django.contrib import admin
-from .models import Curso, GrupoEquivalencia, Inscripcion
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.forms.models import BaseInlineFormSet
+from django.http import QueryDict
+from django.utils.functional import cached_property
+from .models import AnalisisRun, Curso, CursoAnalisis, GrupoEquivalencia, Inscripcion
+
+
+class ConteoEstimadoPaginator(Paginator):
+    """
+    En PostgreSQL, para changelists sin filtros usa la estimación de pg_class en vez de un COUNT(*) completo.
+    """
+    umbral_estimacion = 10000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                    [self.object_list.model._meta.db_table]
+                )
+                fila = cursor.fetchone()
+            if fila and fila[0] > self.umbral_estimacion:
+                return int(fila[0])
+        return super().count
 
 
 @admin.register(GrupoEquivalencia)
@@ -8,34 +36,89 @@ class GrupoEquivalenciaAdmin(admin.ModelAdmin):
     search_fields = ('nombre',)
 
 
+class InscripcionPaginadaFormSet(BaseInlineFormSet):
+    por_pagina = 50
+    request = None
+
+    def get_queryset(self):
+        if not hasattr(self, '_pagina'):
+            qs = super().get_queryset().select_related('usuario')
+            self.paginator = Paginator(qs, self.por_pagina)
+            numero = self.request.GET.get('p_inscritos', 1) if self.request else 1
+            self._pagina = self.paginator.get_page(numero)
+        return self._pagina.object_list
+
+    @property
+    def pagina(self):
+        self.get_queryset()
+        return self._pagina
+
+    def _url_pagina(self, numero):
+        # Conserva _changelist_filters y el resto de la query: guardar o volver debe llegar al listado filtrado
+        params = self.request.GET.copy() if self.request else QueryDict(mutable=True)
+        params['p_inscritos'] = numero
+        return f'?{params.urlencode()}'
+
+    @property
+    def url_anterior(self):
+        return self._url_pagina(self.pagina.previous_page_number())
+
+    @property
+    def url_siguiente(self):
+        return self._url_pagina(self.pagina.next_page_number())
+
+
 class InscripcionInline(admin.TabularInline):
     model = Inscripcion
+    formset = InscripcionPaginadaFormSet
+    template = 'admin/courses/inscripcion_inline_paginado.html'
     extra = 0
     readonly_fields = ('usuario', 'created_at')
     can_delete = True
 
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.request = request
+        return formset
+
 
 @admin.register(Curso)
 class CursoAdmin(admin.ModelAdmin):
-    list_display = ('nombre', 'escuela', 'creador_email', 'estado', 'ver_inscritos', 'minimo_alumnos', 'created_at')
-    list_filter = ('estado', 'escuela__facultad', 'created_at')
+    list_display = ('nombre', 'escuela', 'creador_email', 'estado', 'ver_inscritos', 'minimo_alumnos',
+                    'agrupacion_provisional', 'created_at')
+    list_filter = ('estado', 'agrupacion_provisional', 'escuela__facultad', 'created_at')
     search_fields = ('nombre', 'creador__email', 'escuela__nombre')
+    autocomplete_fields = ('escuela', 'creador', 'delegado_pendiente', 'grupo_equivalencia')
+
+    paginator = ConteoEstimadoPaginator
+    show_full_result_count = False
 
     actions = ['marcar_como_aprobado', 'marcar_como_cerrado']
     inlines = [InscripcionInline]
 
+    def get_queryset(self, request):
+        inscritos = (
+            Inscripcion.objects
+            .filter(curso=OuterRef('pk'))
+            .order_by()
+            .values('curso')
+            .annotate(total=Count('id'))
+            .values('total')
+        )
+        return (
+            super().get_queryset(request)
+            .select_related('escuela', 'creador')
+            .annotate(inscritos_count=Coalesce(Subquery(inscritos), 0))
+        )
+
+    @admin.display(description='Delegado', ordering='creador__email')
     def creador_email(self, obj):
         return obj.creador.email
 
-    creador_email.short_description = 'Delegado'
-
+    @admin.display(description='Progreso', ordering='inscritos_count')
     def ver_inscritos(self, obj):
         return f"{obj.total_inscritos} / {obj.minimo_alumnos}"
 
-    ver_inscritos.short_description = 'Progreso'
-
-    readonly_fields = ('contenido_cache', 'embedding_vector')
-
     @admin.action(description='Marcar cursos seleccionados como APROBADOS')
     def marcar_como_aprobado(self, request, queryset):
         queryset.update(estado='APROBADO')
@@ -45,8 +128,40 @@ class CursoAdmin(admin.ModelAdmin):
         queryset.update(estado='CERRADO')
 
 
+@admin.register(CursoAnalisis)
+class CursoAnalisisAdmin(admin.ModelAdmin):
+    list_display = ('curso', 'contenido_hash', 'updated_at')
+    list_select_related = ('curso__escuela',)
+    search_fields = ('curso__nombre', 'contenido_hash')
+    readonly_fields = ('curso', 'contenido_cache', 'contenido_hash', 'tokens', 'embedding_vector')
+
+
+@admin.register(AnalisisRun)
+class AnalisisRunAdmin(admin.ModelAdmin):
+    # Ordenar por segundos_total descendente muestra los sílabos patológicos primero
+    list_display = ('curso', 'resultado', 'segundos_total', 'segundos_lectura_pdf', 'segundos_embedding',
+                    'segundos_tokens', 'segundos_candidatos', 'segundos_scoring', 'grupos_candidatos',
+                    'cursos_comparados', 'score_hibrido', 'created_at')
+    list_filter = ('resultado', 'created_at')
+    list_select_related = ('curso',)
+    search_fields = ('curso__nombre',)
+    ordering = ('-segundos_total',)
+    readonly_fields = [f.name for f in AnalisisRun._meta.fields]
+
+    paginator = ConteoEstimadoPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(Inscripcion)
 class InscripcionAdmin(admin.ModelAdmin):
     list_display = ('usuario', 'curso', 'created_at')
     list_filter = ('curso__escuela', 'created_at')
+    list_select_related = ('usuario', 'curso__escuela')
     search_fields = ('usuario__email', 'curso__nombre')
+    autocomplete_fields = ('usuario', 'curso')
+
+    paginator = ConteoEstimadoPaginator
+    show_full_result_count = False
@@ -0,0 +1,86 @@
+"""
+Control de admisión de análisis IA según la cola de Celery.
+
+El tiempo de espera estimado es (tareas en cola + 1) x duración media de un análisis / workers. Con eso:
+- NORMAL: se encola como siempre.
+- DEMORADO: se encola, pero se avisa al delegado cuánto tardará de verdad.
+- DIFERIDO: el curso se acepta (queda visible con su agrupación provisional) y el análisis espera
+  a que la cola baje; task_encolar_diferidos lo encola después.
+- RECHAZADO: la cola está saturada; la subida se rechaza antes de leer el PDF.
+"""
+import logging
+from dataclasses import dataclass
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+
+from verunsa.metricas import Contador
+from verunsa.redis_client import get_redis
+from .models import AnalisisRun
+
+logger = logging.getLogger(__name__)
+
+DECISIONES = Contador('admission_decisions_total', "Decisiones de admisión de análisis IA")
+
+NORMAL, DEMORADO, DIFERIDO, RECHAZADO = 'NORMAL', 'DEMORADO', 'DIFERIDO', 'RECHAZADO'
+
+SEGUNDOS_POR_ANALISIS_DEFAULT = 20.0
+CLAVE_PROMEDIO = 'admision:segundos_por_analisis'
+
+
+@dataclass
+class Admision:
+    decision: str
+    en_cola: int
+    espera_segundos: float
+
+    @property
+    def espera_minutos(self):
+        return max(1, round(self.espera_segundos / 60))
+
+
+def decidir(en_cola, segundos_por_analisis, workers):
+    espera = (en_cola + 1) * segundos_por_analisis / max(workers, 1)
+    if en_cola >= settings.ADMISION_COLA_MAXIMA:
+        decision = RECHAZADO
+    elif espera > settings.ADMISION_ESPERA_DIFERIR:
+        decision = DIFERIDO
+    elif espera > settings.ADMISION_ESPERA_AVISO:
+        decision = DEMORADO
+    else:
+        decision = NORMAL
+    return Admision(decision, en_cola, espera)
+
+
+def tareas_en_cola(cola=None):
+    """
+    Mensajes pendientes en la cola del broker (Redis: una lista por cola). None si no se puede medir.
+    """
+    try:
+        return get_redis(settings.CELERY_BROKER_URL).llen(cola or settings.ADMISION_COLA)
+    except redis.RedisError as e:
+        logger.warning(f"No se pudo medir la cola de Celery: {e}")
+        return None
+
+
+def segundos_por_analisis():
+    """
+    Duración media de los últimos análisis (AnalisisRun), cacheada un minuto.
+    """
+    promedio = cache.get(CLAVE_PROMEDIO)
+    if promedio is None:
+        ultimos = list(AnalisisRun.objects.order_by('-created_at').values_list('segundos_total', flat=True)[:50])
+        promedio = sum(ultimos) / len(ultimos) if ultimos else SEGUNDOS_POR_ANALISIS_DEFAULT
+        cache.set(CLAVE_PROMEDIO, promedio, 60)
+    return promedio
+
+
+def evaluar_admision():
+    en_cola = tareas_en_cola()
+    if en_cola is None:
+        # Sin visibilidad de la cola no hay base para rechazar a nadie
+        return Admision(NORMAL, 0, 0.0)
+    admision = decidir(en_cola, segundos_por_analisis(), settings.ADMISION_WORKERS)
+    DECISIONES.inc(decision=admision.decision)
+    return admision
@@ -0,0 +1,130 @@
+import fcntl
+import hashlib
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+TAMANO_BLOQUE = 1024 * 1024
+
+
+class CacheBlobsLocal:
+    """
+    Cache de lectura en disco local delante de un storage remoto (S3).
+
+    La clave es nombre + ETag del objeto, así un archivo reemplazado en el origen nunca se sirve viejo.
+    El tamaño total se acota con desalojo LRU (mtime como reloj). Es seguro entre hijos prefork:
+    las escrituras son atómicas (archivo temporal + os.replace) y el desalojo se serializa con flock.
+    """
+
+    def __init__(self, directorio, max_bytes, storage=None):
+        self.directorio = str(directorio)
+        self.max_bytes = max_bytes
+        self.storage = storage or default_storage
+        self.aciertos = 0
+        self.fallos = 0
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def _etag(self, nombre):
+        if hasattr(self.storage, 'bucket'):
+            # S3Boto3Storage: HEAD del objeto, sin descargarlo
+            from storages.utils import clean_name
+            key = self.storage._normalize_name(clean_name(nombre))
+            respuesta = self.storage.connection.meta.client.head_object(Bucket=self.storage.bucket_name, Key=key)
+            return respuesta['ETag'].strip('"')
+
+        # FileSystemStorage y otros: tamaño + fecha de modificación
+        modificado = self.storage.get_modified_time(nombre).timestamp()
+        return f"{self.storage.size(nombre)}-{modificado}"
+
+    def ruta_local(self, nombre, etag):
+        clave = hashlib.sha256(f"{nombre}\0{etag}".encode('utf-8')).hexdigest()
+        return os.path.join(self.directorio, clave[:2], clave)
+
+    @contextmanager
+    def _lock(self):
+        with open(os.path.join(self.directorio, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _descargar(self, nombre, destino):
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        fd, temporal = tempfile.mkstemp(dir=os.path.dirname(destino), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as salida, self.storage.open(nombre, 'rb') as origen:
+                for bloque in origen.chunks(TAMANO_BLOQUE):
+                    salida.write(bloque)
+            os.replace(temporal, destino)
+        except Exception:
+            if os.path.exists(temporal):
+                os.unlink(temporal)
+            raise
+
+    def _desalojar(self):
+        archivos = []
+        total = 0
+        for raiz, _, nombres in os.walk(self.directorio):
+            for n in nombres:
+                if n == '.lock' or n.endswith('.part'):
+                    continue
+                ruta = os.path.join(raiz, n)
+                try:
+                    st = os.stat(ruta)
+                except FileNotFoundError:
+                    continue
+                archivos.append((st.st_mtime, st.st_size, ruta))
+                total += st.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        for _, tamano, ruta in sorted(archivos):
+            try:
+                os.unlink(ruta)
+            except FileNotFoundError:
+                pass
+            total -= tamano
+            if total <= self.max_bytes:
+                break
+
+    def abrir(self, nombre):
+        """
+        Devuelve un archivo local abierto en modo binario. Se abre antes de soltar el control,
+        así un desalojo concurrente no lo invalida (el unlink no afecta descriptores abiertos).
+        """
+        ruta = self.ruta_local(nombre, self._etag(nombre))
+        try:
+            archivo = open(ruta, 'rb')
+            os.utime(ruta)
+            self.aciertos += 1
+            return archivo
+        except FileNotFoundError:
+            pass
+
+        self.fallos += 1
+        self._descargar(nombre, ruta)
+        archivo = open(ruta, 'rb')
+        with self._lock():
+            self._desalojar()
+        return archivo
+
+
+_CACHE_SILABOS = None
+
+
+def get_cache_silabos():
+    global _CACHE_SILABOS
+    if _CACHE_SILABOS is None:
+        _CACHE_SILABOS = CacheBlobsLocal(
+            settings.SYLLABUS_CACHE_DIR,
+            settings.SYLLABUS_CACHE_MAX_MB * 1024 * 1024
+        )
+    return _CACHE_SILABOS
@@ -0,0 +1,161 @@
+import logging
+import math
+import re
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Case, Count, ExpressionWrapper, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+
+from .models import CursoAnalisis, GrupoEquivalencia, TerminoCurso
+from .services import limpiar_texto_para_tokens, normalizar_nombre_curso
+
+logger = logging.getLogger(__name__)
+
+# Parámetros BM25 estándar
+K1 = 1.2
+B = 0.75
+
+PESO_NOMBRE = 3
+PESO_CODIGO = 5
+MAX_TERMINOS_CONSULTA = 12
+# Un término presente en más de la mitad de los cursos casi no ordena y es el más caro de recorrer
+DF_MAX_RELATIVO = 0.5
+
+CLAVE_ESTADISTICAS = 'busqueda:estadisticas'
+TTL_ESTADISTICAS = 300
+
+
+def normalizar_termino(texto):
+    return normalizar_nombre_curso(texto).replace(' ', '')[:64]
+
+
+def palabras_nombre(texto):
+    """
+    Lemas + palabras tal cual (sin tildes) del nombre: cubre lematizaciones raras y códigos tipo "MAT101".
+    """
+    terminos = {normalizar_termino(t) for t in limpiar_texto_para_tokens(texto)}
+    terminos.update(normalizar_termino(p) for p in re.split(r'\s+', texto) if len(p) > 2)
+    terminos.discard('')
+    return terminos
+
+
+def terminos_curso(nombre, codigo, tokens):
+    frecuencias = Counter()
+    for token in tokens or ():
+        termino = normalizar_termino(token)
+        if termino:
+            frecuencias[termino] += 1
+    for termino in palabras_nombre(nombre):
+        frecuencias[termino] += PESO_NOMBRE
+    codigo = normalizar_termino(codigo or '')
+    if codigo:
+        frecuencias[codigo] += PESO_CODIGO
+    return frecuencias
+
+
+def _postings(curso, tokens):
+    frecuencias = terminos_curso(curso.nombre, curso.codigo_curso, tokens)
+    longitud = sum(frecuencias.values())
+    return longitud, [
+        TerminoCurso(termino=termino, curso_id=curso.id, frecuencia=frecuencia, longitud=longitud)
+        for termino, frecuencia in frecuencias.items()
+    ]
+
+
+def indexar_curso(curso, tokens=None):
+    """
+    (Re)escribe los postings del curso. Sin tokens se leen de CursoAnalisis; un curso recién creado
+    queda buscable por nombre y código hasta que el análisis IA agregue su contenido.
+    """
+    if tokens is None:
+        tokens = CursoAnalisis.objects.filter(curso_id=curso.id).values_list('tokens', flat=True).first()
+
+    longitud, postings = _postings(curso, tokens)
+    with transaction.atomic():
+        TerminoCurso.objects.filter(curso_id=curso.id).delete()
+        TerminoCurso.objects.bulk_create(postings, batch_size=2000)
+        CursoAnalisis.objects.filter(curso_id=curso.id).update(terminos_indexados=longitud)
+    return longitud
+
+
+def indexar_cursos_en_lote(cursos, tokens_por_curso):
+    """
+    Variante masiva para ingesta y reindexado: un DELETE y un bulk_create por lote.
+    """
+    postings = []
+    longitudes = {}
+    for curso in cursos:
+        longitudes[curso.id], posting_curso = _postings(curso, tokens_por_curso.get(curso.id))
+        postings.extend(posting_curso)
+
+    analisis = list(CursoAnalisis.objects.filter(curso_id__in=longitudes))
+    for a in analisis:
+        a.terminos_indexados = longitudes[a.curso_id]
+
+    with transaction.atomic():
+        TerminoCurso.objects.filter(curso_id__in=longitudes).delete()
+        TerminoCurso.objects.bulk_create(postings, batch_size=5000)
+        CursoAnalisis.objects.bulk_update(analisis, ['terminos_indexados'], batch_size=2000)
+    return len(postings)
+
+
+def estadisticas_indice():
+    """
+    N y longitud media de documento para BM25. Cambian despacio: se cachean unos minutos.
+    """
+    estadisticas = cache.get(CLAVE_ESTADISTICAS)
+    if estadisticas is None:
+        agregado = CursoAnalisis.objects.filter(terminos_indexados__gt=0).aggregate(
+            n=Count('pk'), media=Avg('terminos_indexados')
+        )
+        estadisticas = (agregado['n'] or 0, float(agregado['media'] or 1.0))
+        cache.set(CLAVE_ESTADISTICAS, estadisticas, TTL_ESTADISTICAS)
+    return estadisticas
+
+
+def terminos_consulta(consulta):
+    return sorted(palabras_nombre(consulta))[:MAX_TERMINOS_CONSULTA]
+
+
+def grupos_visibles(escuela_id):
+    return list(GrupoEquivalencia.objects.filter(escuelas=escuela_id).values_list('id', flat=True))
+
+
+def buscar_cursos(usuario, consulta, limite=20):
+    """
+    Devuelve [(curso_id, score)] ordenado por BM25, solo con cursos que el usuario ve en su muro
+    (de su escuela o de un grupo de equivalencia que incluye a su escuela).
+    """
+    terminos = terminos_consulta(consulta)
+    if not terminos or not usuario.escuela_id:
+        return []
+
+    df = dict(
+        TerminoCurso.objects.filter(termino__in=terminos)
+        .values_list('termino')
+        .annotate(df=Count('curso_id'))
+    )
+    if not df:
+        return []
+
+    n, longitud_media = estadisticas_indice()
+    n = max(n, max(df.values()))
+    idf = {t: math.log(1 + (n - d + 0.5) / (d + 0.5)) for t, d in df.items()}
+    selectivos = {t: v for t, v in idf.items() if df[t] <= n * DF_MAX_RELATIVO} or idf
+
+    peso_idf = Case(*[When(termino=t, then=Value(v)) for t, v in selectivos.items()], output_field=FloatField())
+    tf = Cast('frecuencia', FloatField())
+    normalizacion = K1 * (1 - B + B * Cast('longitud', FloatField()) / longitud_media)
+    bm25 = ExpressionWrapper(peso_idf * tf * (K1 + 1) / (tf + normalizacion), output_field=FloatField())
+
+    visibles = Q(curso__escuela_id=usuario.escuela_id) | Q(curso__grupo_equivalencia_id__in=grupos_visibles(usuario.escuela_id))
+
+    return list(
+        TerminoCurso.objects
+        .filter(visibles, termino__in=selectivos)
+        .values_list('curso_id')
+        .annotate(score=Sum(bm25))
+        .order_by('-score')[:limite]
+    )
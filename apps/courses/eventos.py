@@ -0,0 +1,181 @@
+"""
+Progreso de inscripción en vivo: Redis pub/sub -> Server-Sent Events.
+
+La visibilidad del muro es por escuela (la propia del curso + las de su grupo de equivalencia), así que
+hay un canal por escuela y cada curso publica en todos los canales de las escuelas que lo ven.
+Un alumno se suscribe solo al canal de su escuela.
+
+Del lado web cada proceso abre una sola conexión de pub/sub (Difusor) y reparte los mensajes a una cola
+asyncio por stream abierto: mil alumnos conectados a un worker son una conexión a Redis, no mil.
+"""
+import asyncio
+import json
+import logging
+import weakref
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.db import transaction
+
+from verunsa.redis_client import get_redis
+from .models import Curso, GrupoEquivalencia
+
+logger = logging.getLogger(__name__)
+
+
+def canal_escuela(escuela_id):
+    return f'progreso:escuela:{escuela_id}'
+
+
+def datos_progreso(curso):
+    return {
+        'curso_id': str(curso.id),
+        'inscritos': curso.total_inscritos,
+        'minimo_alumnos': curso.minimo_alumnos,
+        'progreso_porcentaje': curso.progreso_porcentaje,
+        'estado': curso.estado,
+        'estado_display': curso.get_estado_display(),
+    }
+
+
+def publicar_progreso(curso_id):
+    curso = Curso.objects.filter(id=curso_id).only('id', 'minimo_alumnos', 'estado', 'escuela_id',
+                                                   'grupo_equivalencia_id').first()
+    if curso is None:
+        return 0
+
+    escuelas = {curso.escuela_id}
+    if curso.grupo_equivalencia_id:
+        escuelas.update(
+            GrupoEquivalencia.escuelas.through.objects
+            .filter(grupoequivalencia_id=curso.grupo_equivalencia_id)
+            .values_list('escuela_id', flat=True)
+        )
+
+    mensaje = json.dumps(datos_progreso(curso))
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for escuela_id in escuelas:
+            pipe.publish(canal_escuela(escuela_id), mensaje)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"No se pudo publicar el progreso del curso {curso_id}: {e}")
+        return 0
+    return len(escuelas)
+
+
+def publicar_progreso_al_confirmar(curso_id):
+    # Tras el commit: los suscriptores recalculan con lo que ya está en la BD
+    transaction.on_commit(lambda: publicar_progreso(curso_id))
+
+
+class Difusor:
+    """
+    Suscripción compartida de un proceso. El canal de una escuela se suscribe con el primer stream que lo
+    pide y se desuscribe al cerrarse el último; sin streams se cierra la conexión. Si Redis se cae, cada
+    cola recibe None y su stream termina (EventSource reconecta y vuelve a suscribir).
+    """
+    TAMANO_COLA = 100  # un alumno lento pierde mensajes viejos: cada uno trae el estado completo del curso
+
+    def __init__(self):
+        self._colas = defaultdict(set)  # canal -> {asyncio.Queue}
+        self._lock = asyncio.Lock()
+        self._cliente = None
+        self._pubsub = None
+        self._tarea = None
+
+    @asynccontextmanager
+    async def suscribir(self, canal):
+        cola = asyncio.Queue(maxsize=self.TAMANO_COLA)
+        async with self._lock:
+            if self._pubsub is None:
+                self._cliente = aioredis.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=settings.REDIS_TIMEOUT)
+                self._pubsub = self._cliente.pubsub()
+            if canal not in self._colas:
+                try:
+                    await self._pubsub.subscribe(canal)
+                except redis.RedisError:
+                    if not self._colas:
+                        await self._cerrar()
+                    raise
+            self._colas[canal].add(cola)
+            if self._tarea is None:
+                self._tarea = asyncio.create_task(self._escuchar(self._pubsub))
+        try:
+            yield cola
+        finally:
+            await self._soltar(canal, cola)
+
+    async def _soltar(self, canal, cola):
+        async with self._lock:
+            colas = self._colas.get(canal)
+            if colas is None or cola not in colas:
+                return  # la suscripción ya se cayó y se limpió en _escuchar
+            colas.discard(cola)
+            if colas:
+                return
+            del self._colas[canal]
+            if not self._colas:
+                await self._cerrar()
+                return
+            try:
+                await self._pubsub.unsubscribe(canal)
+            except redis.RedisError as e:
+                logger.debug(f"No se pudo desuscribir {canal}: {e}")
+
+    async def _escuchar(self, pubsub):
+        try:
+            while True:
+                mensaje = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if mensaje is not None:
+                    self._repartir(mensaje['channel'].decode(), mensaje['data'].decode())
+        except asyncio.CancelledError:
+            raise
+        except redis.RedisError as e:
+            logger.warning(f"Suscripción de progreso interrumpida: {e}")
+            async with self._lock:
+                if self._pubsub is pubsub:
+                    for colas in self._colas.values():
+                        for cola in colas:
+                            self._encolar(cola, None)
+                    self._colas.clear()
+                    self._tarea = None  # no cancelar la tarea actual desde sí misma
+                    await self._cerrar()
+
+    def _repartir(self, canal, datos):
+        for cola in self._colas.get(canal, ()):
+            self._encolar(cola, datos)
+
+    @staticmethod
+    def _encolar(cola, datos):
+        if cola.full():
+            cola.get_nowait()
+        cola.put_nowait(datos)
+
+    async def _cerrar(self):
+        tarea, pubsub, cliente = self._tarea, self._pubsub, self._cliente
+        self._tarea = self._pubsub = self._cliente = None
+        if tarea is not None:
+            tarea.cancel()
+        try:
+            if pubsub is not None:
+                await pubsub.aclose()
+            if cliente is not None:
+                await cliente.aclose()
+        except redis.RedisError as e:
+            logger.debug(f"Error al cerrar la suscripción de progreso: {e}")
+
+
+_DIFUSORES = weakref.WeakKeyDictionary()  # event loop -> Difusor
+
+
+def get_difusor():
+    # Uno por event loop: las conexiones de redis.asyncio no se comparten entre loops
+    loop = asyncio.get_running_loop()
+    difusor = _DIFUSORES.get(loop)
+    if difusor is None:
+        difusor = _DIFUSORES[loop] = Difusor()
+    return difusor
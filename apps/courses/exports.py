@@ -0,0 +1,122 @@
+import csv
+import tempfile
+from itertools import islice
+
+import xlsxwriter
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from apps.users.taxonomia import get_taxonomia
+from .models import Inscripcion
+
+COLUMNAS_ROSTER = ['Nombres', 'Apellidos', 'Correo', 'CUI', 'Celular', 'Escuela', 'Curso', 'Fecha de inscripción']
+CAMPOS_ROSTER = (
+    'usuario__first_name', 'usuario__last_name', 'usuario__email', 'usuario__codigo_alumno',
+    'usuario__celular', 'usuario__escuela_id', 'curso__nombre', 'created_at',
+)
+INDICE_ESCUELA = CAMPOS_ROSTER.index('usuario__escuela_id')  # el nombre sale de la taxonomía en memoria
+INDICE_APELLIDO = CAMPOS_ROSTER.index('usuario__last_name')
+INDICE_CORREO = CAMPOS_ROSTER.index('usuario__email')
+INDICE_CUI = CAMPOS_ROSTER.index('usuario__codigo_alumno')
+INDICE_CELULAR = CAMPOS_ROSTER.index('usuario__celular')
+# La lista se presenta en la escuela cuando el curso llega a la meta; antes no hay trámite que la justifique
+ESTADOS_EXPORTABLES = ('META_ALCANZADA', 'EN_TRAMITE', 'APROBADO')
+TAMANO_CHUNK = 2000
+TAMANO_BLOQUE_XLSX = 64 * 1024
+TAMANO_LOTE_ASYNC = 500
+INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def enmascarar_apellido(apellido):
+    return f"{apellido[0]}****" if apellido else "****"
+
+
+def enmascarar_cui(cui):
+    return "****" + cui[-4:] if cui and len(cui) >= 4 else "****"
+
+
+def _enmascarar(datos):
+    # Alumnos de otros cursos del grupo: lo mismo que muestra el detalle del curso, sin correo ni celular
+    datos[INDICE_APELLIDO] = enmascarar_apellido(datos[INDICE_APELLIDO])
+    datos[INDICE_CUI] = enmascarar_cui(datos[INDICE_CUI])
+    datos[INDICE_CORREO] = datos[INDICE_CELULAR] = ''
+
+
+def filas_roster(curso, alcance_grupo=False):
+    """
+    Itera la lista de inscritos por chunks, sin materializarla. Con alcance_grupo incluye todo el grupo de equivalencia;
+    los datos de contacto completos solo salen para los inscritos del propio curso.
+    """
+    if alcance_grupo and curso.grupo_equivalencia_id:
+        inscripciones = Inscripcion.objects.filter(curso__grupo_equivalencia_id=curso.grupo_equivalencia_id)
+    else:
+        inscripciones = Inscripcion.objects.filter(curso=curso)
+
+    filas = (
+        inscripciones
+        .order_by('curso__nombre', 'created_at')
+        .values_list(*CAMPOS_ROSTER, 'curso_id')
+        .iterator(chunk_size=TAMANO_CHUNK)
+    )
+    taxonomia = get_taxonomia()
+    for fila in filas:
+        *datos, fecha, curso_id = fila
+        if curso_id != curso.id:
+            _enmascarar(datos)
+        datos[INDICE_ESCUELA] = taxonomia.nombre_escuela(datos[INDICE_ESCUELA])
+        yield [d or '' for d in datos] + [timezone.localtime(fecha).strftime('%d/%m/%Y %H:%M')]
+
+
+class _Eco:
+    # csv.writer escribe aquí y devuelve la línea para que el generador la emita
+    def write(self, value):
+        return value
+
+
+def _celda_segura(valor):
+    # Nombres y correos los escribe el alumno: '=...' sería una fórmula viva en la hoja del delegado
+    return f"'{valor}" if isinstance(valor, str) and valor.startswith(INICIO_FORMULA) else valor
+
+
+def generar_csv(filas):
+    writer = csv.writer(_Eco())
+    yield '\ufeff' + writer.writerow(COLUMNAS_ROSTER)  # BOM para que Excel detecte UTF-8
+    for fila in filas:
+        yield writer.writerow([_celda_segura(v) for v in fila])
+
+
+def generar_xlsx(filas):
+    """
+    xlsxwriter en modo constant_memory vuelca cada fila a disco; el .xlsx final se arma al cerrar y se emite por bloques.
+    """
+    with tempfile.TemporaryFile() as salida:
+        workbook = xlsxwriter.Workbook(salida, {'constant_memory': True})
+        hoja = workbook.add_worksheet('Inscritos')
+        negrita = workbook.add_format({'bold': True})
+
+        hoja.write_row(0, 0, COLUMNAS_ROSTER, negrita)
+        for i, fila in enumerate(filas, start=1):
+            # write_row interpreta '=...' como fórmula; write_string guarda siempre texto
+            for j, valor in enumerate(fila):
+                hoja.write_string(i, j, str(valor))
+
+        workbook.close()
+        salida.seek(0)
+
+        while True:
+            bloque = salida.read(TAMANO_BLOQUE_XLSX)
+            if not bloque:
+                break
+            yield bloque
+
+
+async def en_async(partes):
+    """
+    Bajo ASGI, StreamingHttpResponse consume un iterador sync con sync_to_async(list): cargaría el roster entero
+    en memoria. Esto lo entrega por lotes, siempre en el hilo sync de la vista (el cursor no cambia de hilo).
+    """
+    partes = iter(partes)
+    leer_lote = sync_to_async(lambda: list(islice(partes, TAMANO_LOTE_ASYNC)))
+    while lote := await leer_lote():
+        for parte in lote:
+            yield parte
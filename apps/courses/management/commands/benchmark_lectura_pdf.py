@@ -0,0 +1,119 @@
+import io
+import os
+import resource
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from pypdf import PdfReader
+
+from apps.courses.services import leer_pdf_agnostico, extraer_texto_reader
+
+LIMITE_SUBIDA = 3 * 1024 * 1024  # mismo límite que CursoForm
+
+
+def _leer_con_copia(archivo):
+    # Comportamiento anterior: read() completo + BytesIO nuevo
+    archivo.seek(0)
+    contenido = archivo.read()
+    archivo.seek(0)
+    return extraer_texto_reader(PdfReader(io.BytesIO(contenido)))
+
+
+def _subida_en_memoria(datos):
+    return InMemoryUploadedFile(io.BytesIO(datos), 'syllabus', 'silabo.pdf', 'application/pdf', len(datos), None)
+
+
+def _subida_temporal(datos):
+    archivo = TemporaryUploadedFile('silabo.pdf', 'application/pdf', len(datos), None)
+    archivo.write(datos)
+    archivo.flush()
+    return archivo
+
+
+MODOS = {
+    # modo: (construir subida, función de lectura)
+    'copia': (_subida_temporal, _leer_con_copia),
+    'memoria': (_subida_en_memoria, leer_pdf_agnostico),
+    'temporal': (_subida_temporal, leer_pdf_agnostico),
+}
+
+
+def _rss_actual_kb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def _ejecutar_modo(modo, ruta_pdf, concurrencia, repeticiones):
+    """
+    Corre en un proceso nuevo para que ru_maxrss refleje solo este modo.
+    """
+    with open(ruta_pdf, 'rb') as f:
+        datos = f.read()
+
+    construir, leer = MODOS[modo]
+    rss_inicial = _rss_actual_kb()
+
+    def una_subida(_):
+        archivo = construir(datos)
+        try:
+            return len(leer(archivo))
+        finally:
+            archivo.close()
+
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        caracteres = list(pool.map(una_subida, range(concurrencia * repeticiones)))
+    duracion = time.perf_counter() - inicio
+    _, pico_python = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    pico_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'modo': modo,
+        'segundos': duracion,
+        'caracteres': caracteres[0] if caracteres else 0,
+        'pico_rss_mb': max(pico_rss - rss_inicial, 0) / 1024,
+        'pico_python_mb': pico_python / (1024 * 1024),
+    }
+
+
+class Command(BaseCommand):
+    help = "Mide memoria pico (RSS y heap Python) por subida al leer sílabos con lecturas concurrentes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('ruta_pdf', help="PDF de prueba, idealmente cerca del límite de 3 MB")
+        parser.add_argument('--concurrencia', type=int, default=8)
+        parser.add_argument('--repeticiones', type=int, default=3)
+        parser.add_argument('--modos', default=','.join(MODOS), help="Lista separada por comas: " + ', '.join(MODOS))
+
+    def handle(self, *args, **options):
+        ruta_pdf = options['ruta_pdf']
+        if not os.path.exists(ruta_pdf):
+            raise CommandError(f"No existe {ruta_pdf}")
+
+        tamano = os.path.getsize(ruta_pdf)
+        if tamano > LIMITE_SUBIDA:
+            self.stdout.write(self.style.WARNING(f"El PDF ({tamano / 1024 / 1024:.1f} MB) supera el límite de subida."))
+
+        modos = [m.strip() for m in options['modos'].split(',') if m.strip()]
+        for modo in modos:
+            if modo not in MODOS:
+                raise CommandError(f"Modo desconocido: {modo}")
+
+        concurrencia = options['concurrencia']
+        self.stdout.write(
+            f"PDF: {tamano / 1024 / 1024:.2f} MB | concurrencia: {concurrencia} | repeticiones: {options['repeticiones']}"
+        )
+        self.stdout.write(f"{'modo':<10}{'seg':>8}{'RSS/subida MB':>16}{'heap/subida MB':>16}")
+
+        for modo in modos:
+            with ProcessPoolExecutor(max_workers=1) as proceso:
+                r = proceso.submit(_ejecutar_modo, modo, ruta_pdf, concurrencia, options['repeticiones']).result()
+            self.stdout.write(
+                f"{r['modo']:<10}{r['segundos']:>8.2f}"
+                f"{r['pico_rss_mb'] / concurrencia:>16.2f}{r['pico_python_mb'] / concurrencia:>16.2f}"
+            )
@@ -0,0 +1,200 @@
+import json
+import os
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.courses.models import Curso, CursoAnalisis, GrupoEquivalencia
+from apps.courses.services import (
+    extraer_datos_inteligente, generar_embedding, get_transformer_model, leer_pdf_agnostico,
+    limpiar_texto_para_tokens, procesar_y_agrupar_curso,
+)
+from apps.courses.sinteticos import DISCIPLINAS, contenido_tematico, escribir_pdf, generar_silabo, nuevo_faker
+from apps.users.models import Area, Escuela, Facultad, User
+
+TAMANOS_DEFAULT = '100,1000,10000'
+CURSOS_POR_GRUPO = 5
+
+
+class Rollback(Exception):
+    pass
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def _medir(funcion, entradas):
+    tiempos = []
+    for entrada in entradas:
+        inicio = time.perf_counter()
+        funcion(entrada)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {
+        'muestras': len(tiempos),
+        'mediana_ms': statistics.median(tiempos),
+        'p95_ms': _percentil(tiempos, 95),
+    }
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ("Micro-benchmarks del pipeline de sílabos sobre un corpus sintético (Faker): lectura de PDF, extracción, "
+            "tokens, embedding y agrupación contra catálogos de distintos tamaños. Emite JSON y falla si hay "
+            "regresiones frente a un baseline.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', default=TAMANOS_DEFAULT, help="Tamaños de catálogo para procesar_y_agrupar_curso")
+        parser.add_argument('--muestras', type=int, default=20, help="Llamadas medidas por función")
+        parser.add_argument('--semilla', type=int, default=0)
+        parser.add_argument('--json', dest='salida_json', help="Archivo de resultados")
+        parser.add_argument('--baseline', help="JSON de una corrida anterior para detectar regresiones")
+        parser.add_argument('--umbral', type=float, default=0.20,
+                            help="Regresión tolerada sobre la mediana del baseline (0.20 = 20%%)")
+        parser.add_argument('--guardar-pdfs', help="Directorio donde dejar los PDFs sintéticos generados")
+
+    def handle(self, *args, **options):
+        if not get_transformer_model():
+            raise CommandError("No se pudo cargar el modelo de embeddings.")
+
+        fake = nuevo_faker(options['semilla'])
+        muestras = options['muestras']
+        directorio = options['guardar_pdfs'] or tempfile.mkdtemp(prefix='benchmark-silabos-')
+        os.makedirs(directorio, exist_ok=True)
+
+        silabos = [generar_silabo(fake) for _ in range(muestras)]
+        rutas = [escribir_pdf(s['lineas'], os.path.join(directorio, f'silabo_{i:04d}.pdf')) for i, s in enumerate(silabos)]
+        contenidos = [contenido_tematico(s) for s in silabos]
+
+        # Calentamiento: carga perezosa de spaCy y primer encode fuera de lo medido
+        limpiar_texto_para_tokens(contenidos[0])
+        generar_embedding(contenidos[0])
+
+        resultados = {
+            'leer_pdf_agnostico': _medir(leer_pdf_agnostico, rutas),
+            'extraer_datos_inteligente': _medir(extraer_datos_inteligente, rutas),
+            'limpiar_texto_para_tokens': _medir(limpiar_texto_para_tokens, contenidos),
+            'generar_embedding': _medir(generar_embedding, contenidos),
+        }
+        for nombre, r in resultados.items():
+            self._imprimir(nombre, r)
+
+        for tamano in [int(t) for t in options['tamanos'].split(',') if t.strip()]:
+            nombre = f'procesar_y_agrupar_curso@{tamano}'
+            resultados[nombre] = self._medir_agrupacion(tamano, silabos, fake)
+            self._imprimir(nombre, resultados[nombre])
+
+        salida = {
+            'commit': _commit_actual(),
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'muestras': muestras,
+            'resultados': resultados,
+        }
+        if options['salida_json']:
+            with open(options['salida_json'], 'w', encoding='utf-8') as f:
+                json.dump(salida, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Resultados en {options['salida_json']}")
+
+        if options['baseline']:
+            self._comparar(resultados, options['baseline'], options['umbral'])
+
+    def _medir_agrupacion(self, tamano, silabos, fake):
+        """
+        Siembra un catálogo de `tamano` cursos ya analizados y mide procesar_y_agrupar_curso de los sílabos
+        de muestra contra él. Todo corre en una transacción que se revierte al final.
+        """
+        try:
+            with transaction.atomic():
+                escuela, creador = self._sembrar_catalogo(tamano, fake)
+                cursos = []
+                for s in silabos:
+                    curso = Curso.objects.create(
+                        nombre=s['nombre'], creditos=s['creditos'], escuela=escuela, creador=creador,
+                        syllabus='syllabus/benchmark.pdf'
+                    )
+                    CursoAnalisis.objects.create(curso=curso, contenido_cache=contenido_tematico(s))
+                    cursos.append(curso)
+                resultado = _medir(procesar_y_agrupar_curso, cursos)
+                raise Rollback
+        except Rollback:
+            pass
+        return resultado
+
+    def _sembrar_catalogo(self, tamano, fake):
+        area = Area.objects.create(nombre=f'Benchmark {time.time_ns()}')
+        facultad = Facultad.objects.create(nombre=f'Benchmark {time.time_ns()}', area=area)
+        escuela = Escuela.objects.create(nombre=f'Benchmark {time.time_ns()}', facultad=facultad)
+        creador = User.objects.create_user(email=f'benchmark-{time.time_ns()}@unsa.edu.pe', password=None)
+
+        dimension = get_transformer_model().get_sentence_embedding_dimension()
+        rng = np.random.default_rng(tamano)
+        disciplinas = list(DISCIPLINAS)
+        # Un centro por disciplina; cada grupo es una variación del centro y sus cursos una variación del grupo
+        centros = {d: rng.normal(size=dimension) for d in disciplinas}
+
+        grupos, cursos, analisis, miembros = [], [], [], []
+        for g in range((tamano + CURSOS_POR_GRUPO - 1) // CURSOS_POR_GRUPO):
+            disciplina = disciplinas[g % len(disciplinas)]
+            creditos = random.randint(2, 5)
+            centro_grupo = centros[disciplina] + rng.normal(scale=0.3, size=dimension)
+            grupo = GrupoEquivalencia(nombre=f'{disciplina} {g}')
+            grupos.append(grupo)
+            for _ in range(min(CURSOS_POR_GRUPO, tamano - len(cursos))):
+                silabo = generar_silabo(fake, disciplina, creditos)
+                curso = Curso(nombre=silabo['nombre'], creditos=creditos, escuela=escuela, creador=creador,
+                              syllabus='syllabus/benchmark.pdf')
+                miembros.append((curso, grupo))
+                cursos.append(curso)
+                contenido = contenido_tematico(silabo)
+                analisis.append(CursoAnalisis(
+                    curso=curso,
+                    contenido_cache=contenido,
+                    tokens=sorted({p.lower() for p in contenido.split() if len(p) > 3}),
+                    embedding_vector=(centro_grupo + rng.normal(scale=0.1, size=dimension)).tolist(),
+                ))
+
+        GrupoEquivalencia.objects.bulk_create(grupos)
+        for curso, grupo in miembros:
+            curso.grupo_equivalencia = grupo
+        Curso.objects.bulk_create(cursos, batch_size=2000)
+        CursoAnalisis.objects.bulk_create(analisis, batch_size=1000)
+        GrupoEquivalencia.escuelas.through.objects.bulk_create(
+            [GrupoEquivalencia.escuelas.through(grupoequivalencia_id=g.id, escuela_id=escuela.id) for g in grupos],
+            batch_size=2000
+        )
+        return escuela, creador
+
+    def _imprimir(self, nombre, r):
+        self.stdout.write(f"{nombre:<38}{r['mediana_ms']:>10.1f} ms (mediana){r['p95_ms']:>10.1f} ms (p95)")
+
+    def _comparar(self, resultados, ruta_baseline, umbral):
+        with open(ruta_baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['resultados']
+
+        regresiones = []
+        for nombre, actual in resultados.items():
+            previo = baseline.get(nombre)
+            if not previo:
+                continue
+            cambio = actual['mediana_ms'] / previo['mediana_ms'] - 1 if previo['mediana_ms'] else 0.0
+            self.stdout.write(f"{nombre:<38}{cambio:>+10.1%} vs baseline")
+            if cambio > umbral:
+                regresiones.append(f"{nombre} ({cambio:+.1%})")
+
+        if regresiones:
+            raise CommandError(f"Regresiones sobre el {umbral:.0%} tolerado: {', '.join(regresiones)}")
+        self.stdout.write(self.style.SUCCESS("Sin regresiones frente al baseline."))
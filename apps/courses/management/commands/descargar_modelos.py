@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.courses.modelos import vendorizar_transformer, exportar_onnx
+
+
+class Command(BaseCommand):
+    help = "Descarga el modelo de embeddings al directorio local (MODELOS_DIR) en formato safetensors."
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--destino', default=settings.MODELOS_DIR)
+        parser.add_argument('--onnx', action='store_true', help="Exporta también el grafo ONNX (EMBEDDING_BACKEND=onnx)")
+
+    def handle(self, *args, **options):
+        destino = vendorizar_transformer(options['destino'])
+        if options['onnx']:
+            exportar_onnx(options['destino'])
+        self.stdout.write(self.style.SUCCESS(f"Modelo guardado en {destino}"))
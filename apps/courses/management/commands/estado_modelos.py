@@ -0,0 +1,32 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.courses.services import precargar_modelos
+from apps.courses.tasks import task_estado_modelos
+
+
+class Command(BaseCommand):
+    help = "Readiness de los modelos IA: si están cargados y cuánto tardó cada carga."
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--worker', action='store_true',
+                            help="Consulta a un worker de Celery en vez de cargar los modelos en este proceso")
+        parser.add_argument('--cola', default='interactivo', help="Cola del worker a consultar con --worker")
+        parser.add_argument('--timeout', type=float, default=10)
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            try:
+                estado = task_estado_modelos.apply_async(queue=options['cola']).get(timeout=options['timeout'])
+            except Exception as e:
+                raise CommandError(f"Ningún worker respondió: {e}")
+        else:
+            estado = precargar_modelos()
+
+        self.stdout.write(json.dumps(estado, indent=2))
+
+        faltantes = [nombre for nombre, e in estado.items() if not e['cargado']]
+        if faltantes:
+            raise CommandError(f"Modelos no cargados: {', '.join(faltantes)}")
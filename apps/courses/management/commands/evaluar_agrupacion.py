@@ -0,0 +1,218 @@
+import csv
+import json
+import os
+import re
+import resource
+import subprocess
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from apps.courses.models import CursoAnalisis
+from apps.courses.services import (
+    BACKENDS_EMBEDDING, UMBRAL_MATCH, calcular_jaccard, cargar_transformer, extraer_datos_inteligente,
+    limpiar_texto_para_tokens, preparar_texto_embedding, puntuar_hibrido,
+)
+
+UUID = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.I)
+
+# Parámetros de una configuración y su valor por defecto (= pipeline de producción)
+PARAMETROS = {
+    'backend': 'torch',   # backend de embeddings (ver EMBEDDING_BACKEND)
+    'truncar': 0,         # caracteres del contenido temático a usar (0 = todo); simula PDFs truncados
+    'tokens': 'spacy',    # 'spacy' (lemas) o 'rapido' (palabras sin lematizar)
+}
+
+
+def _tokens_rapidos(texto):
+    from spacy.lang.es.stop_words import STOP_WORDS
+    palabras = re.findall(r'[a-záéíóúüñ]{3,}', (texto or '').lower())
+    return {p for p in palabras if p not in STOP_WORDS}
+
+
+def _rss_actual_kb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def _evaluar_config(config, textos, pares):
+    """
+    Corre en un proceso nuevo por configuración: el pico de RSS es solo suyo y los modelos no se comparten.
+    Replica el scoring de procesar_y_agrupar_curso para un grupo de un solo curso (el otro del par).
+    """
+    inicio_carga = time.perf_counter()
+    modelo, _ = cargar_transformer(config['backend'])
+    if config['tokens'] == 'spacy':
+        limpiar_texto_para_tokens('calentamiento')
+    carga = time.perf_counter() - inicio_carga
+
+    rss_inicial = _rss_actual_kb()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+
+    claves = list(textos)
+    contenidos = [textos[c][:config['truncar']] if config['truncar'] else textos[c] for c in claves]
+    vectores = np.asarray(modelo.encode([preparar_texto_embedding(t) for t in contenidos], batch_size=32), dtype=np.float32)
+    vectores /= np.maximum(np.linalg.norm(vectores, axis=1, keepdims=True), 1e-9)
+    tokenizar = limpiar_texto_para_tokens if config['tokens'] == 'spacy' else _tokens_rapidos
+    tokens = [tokenizar(t) for t in contenidos]
+    posicion = {c: i for i, c in enumerate(claves)}
+
+    predicciones = []
+    for a, b, _ in pares:
+        i, j = posicion[a], posicion[b]
+        score_ia = float(vectores[i] @ vectores[j])
+        jaccard = calcular_jaccard(tokens[i], tokens[j])
+        hibrido = puntuar_hibrido(score_ia, jaccard)
+        predicciones.append(hibrido is not None and hibrido > UMBRAL_MATCH)
+
+    segundos = time.perf_counter() - inicio
+    _, pico_python = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    pico_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return {
+        'carga_s': carga,
+        'segundos': segundos,
+        'textos_s': len(claves) / segundos if segundos else 0.0,
+        'pico_rss_mb': max(pico_rss - rss_inicial, 0) / 1024,
+        'pico_python_mb': pico_python / (1024 * 1024),
+        'predicciones': predicciones,
+    }
+
+
+def _metricas(predicciones, etiquetas):
+    vp = sum(1 for p, e in zip(predicciones, etiquetas) if p and e)
+    fp = sum(1 for p, e in zip(predicciones, etiquetas) if p and not e)
+    fn = sum(1 for p, e in zip(predicciones, etiquetas) if not p and e)
+    precision = vp / (vp + fp) if vp + fp else 0.0
+    recall = vp / (vp + fn) if vp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {'vp': vp, 'fp': fp, 'fn': fn, 'precision': precision, 'recall': recall, 'f1': f1}
+
+
+def _parsear_config(texto):
+    nombre, _, resto = texto.partition(':')
+    config = dict(PARAMETROS)
+    for par in filter(None, resto.split(',')):
+        clave, _, valor = par.partition('=')
+        if clave not in PARAMETROS:
+            raise CommandError(f"Parámetro desconocido en '{texto}': {clave}")
+        config[clave] = int(valor) if isinstance(PARAMETROS[clave], int) else valor
+    if config['backend'] not in BACKENDS_EMBEDDING:
+        raise CommandError(f"Backend desconocido: {config['backend']}")
+    if config['tokens'] not in ('spacy', 'rapido'):
+        raise CommandError(f"Tokenizador desconocido: {config['tokens']}")
+    return nombre, config
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ("Evalúa la calidad de la agrupación sobre pares etiquetados (precisión, recall, F1) junto con "
+            "tiempo y memoria, para una o más configuraciones del pipeline.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('pares', help="CSV o JSONL con columnas a, b, equivalente. a/b: ruta a PDF o id de Curso")
+        parser.add_argument('--config', action='append', dest='configs',
+                            help="nombre[:clave=valor,...] con claves " + ', '.join(PARAMETROS) +
+                                 ". Repetible; la primera es la referencia para contar cambios.")
+        parser.add_argument('--json', dest='salida_json', help="Escribe los resultados en este archivo")
+
+    def handle(self, *args, **options):
+        configs = [_parsear_config(c) for c in (options['configs'] or ['base'])]
+        pares = self._leer_pares(options['pares'])
+        textos = self._resolver_textos(pares, os.path.dirname(os.path.abspath(options['pares'])))
+        etiquetas = [e for _, _, e in pares]
+
+        self.stdout.write(f"Pares: {len(pares)} ({sum(etiquetas)} equivalentes) | textos: {len(textos)}")
+        self.stdout.write(f"{'config':<14}{'P':>7}{'R':>7}{'F1':>7}{'cambios':>9}{'seg':>8}{'textos/s':>10}"
+                          f"{'carga s':>9}{'RSS MB':>9}{'heap MB':>9}")
+
+        resultados = []
+        referencia = None
+        connections.close_all()
+        for nombre, config in configs:
+            with ProcessPoolExecutor(max_workers=1) as proceso:
+                r = proceso.submit(_evaluar_config, config, textos, pares).result()
+
+            predicciones = r.pop('predicciones')
+            if referencia is None:
+                referencia = predicciones
+            cambios = sum(1 for p, q in zip(predicciones, referencia) if p != q)
+            metricas = _metricas(predicciones, etiquetas)
+            resultados.append({'config': nombre, 'parametros': config, 'cambios': cambios, **metricas, **r})
+
+            self.stdout.write(
+                f"{nombre:<14}{metricas['precision']:>7.3f}{metricas['recall']:>7.3f}{metricas['f1']:>7.3f}"
+                f"{cambios:>9}{r['segundos']:>8.2f}{r['textos_s']:>10.1f}{r['carga_s']:>9.1f}"
+                f"{r['pico_rss_mb']:>9.1f}{r['pico_python_mb']:>9.1f}"
+            )
+
+        if options['salida_json']:
+            with open(options['salida_json'], 'w', encoding='utf-8') as f:
+                json.dump({
+                    'commit': _commit_actual(),
+                    'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'pares': len(pares),
+                    'umbral_match': UMBRAL_MATCH,
+                    'resultados': resultados,
+                }, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Resultados en {options['salida_json']}")
+
+    def _leer_pares(self, ruta):
+        if not os.path.exists(ruta):
+            raise CommandError(f"No existe {ruta}")
+
+        with open(ruta, encoding='utf-8') as f:
+            if ruta.endswith('.jsonl'):
+                filas = [json.loads(linea) for linea in f if linea.strip()]
+            else:
+                filas = list(csv.DictReader(f))
+
+        pares = []
+        for n, fila in enumerate(filas, start=1):
+            try:
+                etiqueta = str(fila['equivalente']).strip().lower() in ('1', 'true', 'si', 'sí')
+                pares.append((str(fila['a']).strip(), str(fila['b']).strip(), etiqueta))
+            except KeyError as e:
+                raise CommandError(f"Fila {n} sin columna {e}")
+        if not pares:
+            raise CommandError("El archivo de pares está vacío.")
+        return pares
+
+    def _resolver_textos(self, pares, base):
+        """
+        Contenido temático de cada referencia: de la BD si es un id de Curso, o extrayéndolo del PDF
+        (una sola vez, fuera del tiempo medido: la extracción no depende de la configuración).
+        """
+        referencias = {r for a, b, _ in pares for r in (a, b)}
+        ids = [r for r in referencias if UUID.match(r)]
+        textos = dict(
+            (str(curso_id), contenido) for curso_id, contenido in
+            CursoAnalisis.objects.filter(curso_id__in=ids).values_list('curso_id', 'contenido_cache')
+            if contenido
+        )
+
+        for ref in referencias - set(ids):
+            ruta = ref if os.path.isabs(ref) else os.path.join(base, ref)
+            if not os.path.exists(ruta):
+                continue
+            datos = extraer_datos_inteligente(ruta)
+            if datos['contenido_raw']:
+                textos[ref] = datos['contenido_raw']
+
+        faltantes = referencias - set(textos)
+        if faltantes:
+            raise CommandError(f"Sin contenido para {len(faltantes)} referencias: {', '.join(sorted(faltantes)[:5])}")
+        return textos
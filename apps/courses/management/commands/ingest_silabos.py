@@ -0,0 +1,235 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from apps.courses.busqueda import indexar_cursos_en_lote
+from apps.courses.models import Curso, CursoAnalisis
+from apps.courses.services import (
+    extraer_datos_inteligente, limpiar_texto_para_tokens, get_transformer_model,
+    preparar_texto_embedding, calcular_hash_contenido, agrupar_cursos_en_lote,
+)
+from apps.users.models import Escuela, User
+from verunsa.metricas import INFERENCIA_BATCH
+
+MANIFEST = '.ingesta_manifest.json'
+LOG = '.ingesta.log'
+YA_PROCESADOS = ('creado', 'ok', 'duplicado')
+
+
+def _procesar_archivo(ruta):
+    """
+    Corre en el pool de procesos: lectura del PDF, validación y tokens (spaCy se carga una vez por proceso).
+    """
+    try:
+        datos = extraer_datos_inteligente(ruta)
+        if not datos['es_silabo']:
+            return {'ruta': ruta, 'error': datos['mensaje_error'] or "No es un sílabo"}
+        return {
+            'ruta': ruta,
+            'creditos': datos['creditos'],
+            'contenido': datos['contenido_raw'],
+            'tokens': sorted(limpiar_texto_para_tokens(datos['contenido_raw'])),
+        }
+    except Exception as e:
+        return {'ruta': ruta, 'error': str(e)}
+
+
+def _nombre_desde_archivo(ruta):
+    base = os.path.splitext(os.path.basename(ruta))[0]
+    return base.replace('_', ' ').replace('-', ' ').strip().title()[:200]
+
+
+class Command(BaseCommand):
+    help = ("Carga masiva de sílabos oficiales de un directorio: extracción en paralelo, embeddings por lotes, "
+            "bulk_create y una sola agrupación vectorizada al final. Reanudable vía manifest.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('directorio')
+        parser.add_argument('--escuela', required=True, help="Id o nombre exacto de la Escuela")
+        parser.add_argument('--creador', required=True, help="Email del usuario que figura como delegado")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+        parser.add_argument('--lote', type=int, default=64, help="Archivos por lote de embeddings/bulk_create")
+        parser.add_argument('--creditos-default', type=int, default=0,
+                            help="Créditos a usar si el sílabo no los declara (0 = marcar como fallo)")
+
+    def handle(self, *args, **options):
+        directorio = os.path.abspath(options['directorio'])
+        if not os.path.isdir(directorio):
+            raise CommandError(f"No existe el directorio {directorio}")
+
+        escuela_ref = options['escuela']
+        filtro = {'id': escuela_ref} if escuela_ref.isdigit() else {'nombre': escuela_ref}
+        try:
+            self.escuela = Escuela.objects.get(**filtro)
+            self.creador = User.objects.get(email=options['creador'])
+        except (Escuela.DoesNotExist, User.DoesNotExist) as e:
+            raise CommandError(str(e))
+
+        self.ruta_manifest = os.path.join(directorio, MANIFEST)
+        self.log = open(os.path.join(directorio, LOG), 'a', encoding='utf-8')
+        self.manifest = self._leer_manifest()
+        self.creditos_default = options['creditos_default']
+
+        pdfs = sorted(
+            os.path.join(raiz, n)
+            for raiz, _, nombres in os.walk(directorio)
+            for n in nombres if n.lower().endswith('.pdf')
+        )
+        pendientes = [p for p in pdfs if self.manifest.get(os.path.relpath(p, directorio), {}).get('estado') not in YA_PROCESADOS]
+        self._registrar(f"{len(pdfs)} PDFs, {len(pdfs) - len(pendientes)} ya procesados, {len(pendientes)} pendientes")
+
+        self.directorio = directorio
+        hechos = 0
+        # spawn: un fork después de iniciar torch (hilos del transformer) puede colgar a los hijos. Cada hijo
+        # arranca Django desde cero y no hereda conexiones a la BD
+        connections.close_all()
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=contexto, initializer=django.setup) as pool:
+            modelo = get_transformer_model()
+            if not modelo:
+                raise CommandError("No se pudo cargar el modelo de embeddings.")
+
+            for i in range(0, len(pendientes), options['lote']):
+                lote = pendientes[i:i + options['lote']]
+                resultados = list(pool.map(_procesar_archivo, lote))
+                self._guardar_lote(resultados, modelo)
+                hechos += len(lote)
+                self._registrar(f"Progreso: {hechos}/{len(pendientes)}")
+
+        self._agrupar()
+        self.log.close()
+
+    def _ya_creados(self, hashes):
+        """
+        Cursos de esta escuela y este creador con el mismo contenido: una corrida que se cortó entre el commit
+        y el manifest ya los insertó, y otro PDF idéntico del directorio no debe duplicarlos.
+        """
+        return {
+            contenido_hash: (curso_id, grupo_id) for contenido_hash, curso_id, grupo_id in
+            CursoAnalisis.objects
+            .filter(contenido_hash__in=hashes, curso__escuela=self.escuela, curso__creador=self.creador)
+            .values_list('contenido_hash', 'curso_id', 'curso__grupo_equivalencia_id')
+        }
+
+    def _guardar_lote(self, resultados, modelo):
+        validos = []
+        for r in resultados:
+            clave = os.path.relpath(r['ruta'], self.directorio)
+            if 'error' in r:
+                self._marcar(clave, 'error', error=r['error'])
+                continue
+            creditos = r['creditos'] or self.creditos_default
+            if not 1 <= creditos <= 11:
+                self._marcar(clave, 'error', error="No se detectaron créditos válidos")
+                continue
+            r['creditos'] = creditos
+            r['hash'] = calcular_hash_contenido(r['contenido'])
+            validos.append(r)
+
+        existentes = self._ya_creados([r['hash'] for r in validos])
+        primeros, nuevos = {}, []
+        for r in validos:
+            clave = os.path.relpath(r['ruta'], self.directorio)
+            if r['hash'] in existentes:
+                curso_id, grupo_id = existentes[r['hash']]
+                # Sin grupo todavía: la agrupación final lo toma como cualquier curso recién creado
+                self._marcar(clave, 'ok' if grupo_id else 'creado', curso_id=str(curso_id))
+                self._registrar(f"{clave} ya existe como curso {curso_id}: no se vuelve a crear")
+            elif r['hash'] in primeros:
+                self._marcar(clave, 'duplicado', de=primeros[r['hash']])
+            else:
+                primeros[r['hash']] = clave
+                nuevos.append(r)
+        validos = nuevos
+
+        if not validos:
+            self._escribir_manifest()
+            return
+
+        inicio = time.perf_counter()
+        vectores = modelo.encode([preparar_texto_embedding(r['contenido']) for r in validos], batch_size=32)
+        INFERENCIA_BATCH.observar(len(validos))
+        self._registrar(f"Embeddings de {len(validos)} sílabos en {time.perf_counter() - inicio:.1f}s")
+
+        cursos, analisis = [], []
+        for r, vector in zip(validos, vectores):
+            curso = Curso(
+                nombre=_nombre_desde_archivo(r['ruta']),
+                creditos=r['creditos'],
+                escuela=self.escuela,
+                creador=self.creador,
+            )
+            with open(r['ruta'], 'rb') as f:
+                curso.syllabus.save(os.path.basename(r['ruta']), File(f), save=False)
+            cursos.append(curso)
+            analisis.append(CursoAnalisis(
+                curso=curso,
+                contenido_cache=r['contenido'],
+                contenido_hash=r['hash'],
+                tokens=r['tokens'],
+                embedding_vector=vector.tolist(),
+            ))
+
+        try:
+            with transaction.atomic():
+                Curso.objects.bulk_create(cursos)
+                CursoAnalisis.objects.bulk_create(analisis)
+                indexar_cursos_en_lote(cursos, {a.curso_id: a.tokens for a in analisis})
+        except Exception:
+            # Sin filas que los referencien, los PDFs ya subidos quedarían huérfanos en el storage
+            for curso in cursos:
+                curso.syllabus.delete(save=False)
+            raise
+
+        for r, curso in zip(validos, cursos):
+            self._marcar(os.path.relpath(r['ruta'], self.directorio), 'creado', curso_id=str(curso.id))
+        self._escribir_manifest()
+
+    def _agrupar(self):
+        por_agrupar = {clave: e for clave, e in self.manifest.items() if e.get('estado') == 'creado'}
+        if not por_agrupar:
+            self._registrar("Nada que agrupar.")
+            return
+
+        cursos = list(Curso.objects.filter(id__in=[e['curso_id'] for e in por_agrupar.values()]))
+        with transaction.atomic():
+            agrupados, nuevos = agrupar_cursos_en_lote(cursos)
+
+        for clave in por_agrupar:
+            self.manifest[clave]['estado'] = 'ok'
+        self._escribir_manifest()
+        self._registrar(f"Agrupación: {agrupados} cursos en grupos existentes, {nuevos} grupos nuevos.")
+
+        errores = sum(1 for e in self.manifest.values() if e.get('estado') == 'error')
+        estilo = self.style.WARNING if errores else self.style.SUCCESS
+        self.stdout.write(estilo(f"Ingesta terminada: {len(cursos)} cursos, {errores} fallos (ver {MANIFEST})."))
+
+    def _leer_manifest(self):
+        if os.path.exists(self.ruta_manifest):
+            with open(self.ruta_manifest, encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def _escribir_manifest(self):
+        temporal = self.ruta_manifest + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=1)
+        os.replace(temporal, self.ruta_manifest)
+
+    def _marcar(self, clave, estado, **extra):
+        self.manifest[clave] = {'estado': estado, **extra}
+        if estado == 'error':
+            self._registrar(f"FALLO {clave}: {extra.get('error')}")
+
+    def _registrar(self, mensaje):
+        linea = f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {mensaje}"
+        self.stdout.write(linea)
+        self.log.write(linea + '\n')
+        self.log.flush()
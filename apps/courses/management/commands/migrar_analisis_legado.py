@@ -0,0 +1,127 @@
+import json
+import os
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from apps.courses.models import Curso, CursoAnalisis
+from apps.courses.services import calcular_hash_contenido
+
+COLUMNAS_LEGADO = ('contenido_cache', 'embedding_vector')
+LOTE = 500
+
+
+def _columnas_legado():
+    tabla = Curso._meta.db_table
+    with connection.cursor() as cursor:
+        if tabla not in connection.introspection.table_names(cursor):
+            return False
+        columnas = {c.name for c in connection.introspection.get_table_description(cursor, tabla)}
+    return set(COLUMNAS_LEGADO) <= columnas
+
+
+def _leer_legado():
+    # SQL directo: los campos ya no existen en el modelo Curso
+    tabla = connection.ops.quote_name(Curso._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT id, contenido_cache, embedding_vector FROM {tabla} "
+            f"WHERE contenido_cache IS NOT NULL OR embedding_vector IS NOT NULL"
+        )
+        while filas := cursor.fetchmany(LOTE):
+            for curso_id, contenido, embedding in filas:
+                if isinstance(embedding, str):
+                    embedding = json.loads(embedding)
+                yield {'curso_id': str(uuid.UUID(str(curso_id))), 'contenido_cache': contenido, 'embedding_vector': embedding}
+
+
+class Command(BaseCommand):
+    help = ("Copia contenido_cache y embedding_vector de las columnas antiguas de Curso a CursoAnalisis. "
+            "La migración que crea CursoAnalisis también borra esas columnas: en el despliegue se corre con "
+            "--exportar antes de migrate y con --importar después. Sin argumentos copia directo si la tabla "
+            "nueva y las columnas antiguas conviven. Solo completa campos vacíos: es seguro repetirlo.")
+
+    def add_arguments(self, parser):
+        grupo = parser.add_mutually_exclusive_group()
+        grupo.add_argument('--exportar', metavar='RUTA', help="Vuelca las columnas antiguas a un JSONL")
+        grupo.add_argument('--importar', metavar='RUTA', help="Carga en CursoAnalisis un JSONL de --exportar")
+
+    def handle(self, *args, **options):
+        if options['exportar']:
+            return self._exportar(options['exportar'])
+        if options['importar']:
+            return self._importar(options['importar'])
+        if not _columnas_legado():
+            self.stdout.write("Curso ya no tiene las columnas antiguas: nada que copiar.")
+            return
+        self._guardar(_leer_legado())
+
+    def _exportar(self, ruta):
+        if not _columnas_legado():
+            self.stdout.write("Curso ya no tiene las columnas antiguas: nada que exportar.")
+            return
+        total = 0
+        with open(ruta, 'w', encoding='utf-8') as salida:
+            for fila in _leer_legado():
+                salida.write(json.dumps(fila, ensure_ascii=False) + '\n')
+                total += 1
+        self.stdout.write(self.style.SUCCESS(f"{total} cursos exportados a {ruta}"))
+
+    def _importar(self, ruta):
+        if not os.path.exists(ruta):
+            self.stdout.write(f"No existe {ruta}: nada que importar.")
+            return
+        if _columnas_legado():
+            raise CommandError("Las columnas antiguas siguen en Curso: corre migrate antes de --importar.")
+        with open(ruta, encoding='utf-8') as entrada:
+            self._guardar(json.loads(linea) for linea in entrada if linea.strip())
+
+    def _guardar(self, filas):
+        existentes = {str(i) for i in Curso.objects.values_list('id', flat=True)}
+        creados = completados = 0
+        lote = []
+
+        def volcar():
+            nonlocal creados, completados
+            ids = [f['curso_id'] for f in lote]
+            with transaction.atomic():
+                analisis = {str(a.curso_id): a for a in CursoAnalisis.objects.select_for_update().filter(curso_id__in=ids)}
+                nuevos, cambiados = [], []
+                for fila in lote:
+                    contenido, embedding = fila['contenido_cache'], fila['embedding_vector']
+                    a = analisis.get(fila['curso_id'])
+                    if a is None:
+                        nuevos.append(CursoAnalisis(
+                            curso_id=fila['curso_id'],
+                            contenido_cache=contenido,
+                            contenido_hash=calcular_hash_contenido(contenido) if contenido else '',
+                            embedding_vector=embedding,
+                        ))
+                        continue
+                    # Lo que el análisis nuevo ya escribió manda sobre lo antiguo
+                    if not a.contenido_cache and contenido:
+                        a.contenido_cache = contenido
+                        a.contenido_hash = calcular_hash_contenido(contenido)
+                    if not a.embedding_vector and embedding:
+                        a.embedding_vector = embedding
+                    cambiados.append(a)
+                CursoAnalisis.objects.bulk_create(nuevos)
+                CursoAnalisis.objects.bulk_update(cambiados, ['contenido_cache', 'contenido_hash', 'embedding_vector'])
+            creados += len(nuevos)
+            completados += len(cambiados)
+            lote.clear()
+
+        for fila in filas:
+            if fila['curso_id'] not in existentes:
+                continue
+            lote.append(fila)
+            if len(lote) >= LOTE:
+                volcar()
+        if lote:
+            volcar()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Análisis copiados: {creados} creados, {completados} completados en filas existentes. "
+            f"Los tokens se calculan la primera vez que se usan."
+        ))
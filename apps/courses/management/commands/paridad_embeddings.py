@@ -0,0 +1,75 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.courses.models import CursoAnalisis
+from apps.courses.services import BACKENDS_EMBEDDING, cargar_transformer, preparar_texto_embedding
+
+UMBRALES_IA = (0.82, 0.92)  # los de procesar_y_agrupar_curso
+
+
+def _normalizar(matriz):
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1
+    return matriz / normas
+
+
+class Command(BaseCommand):
+    help = ("Compara cada backend de embeddings contra torch fp32: drift coseno por texto, "
+            "pares que cruzan los umbrales 0.82/0.92 y throughput de encode.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backends', default='int8,onnx')
+        parser.add_argument('--limite', type=int, default=200, help="Número de sílabos analizados a usar")
+        parser.add_argument('--batch', type=int, default=32)
+
+    def handle(self, *args, **options):
+        backends = [b.strip() for b in options['backends'].split(',') if b.strip()]
+        for backend in backends:
+            if backend not in BACKENDS_EMBEDDING:
+                raise CommandError(f"Backend desconocido: {backend}")
+
+        textos = [
+            preparar_texto_embedding(t) for t in
+            CursoAnalisis.objects.exclude(contenido_cache__isnull=True).exclude(contenido_cache='')
+            .values_list('contenido_cache', flat=True)[:options['limite']]
+        ]
+        if len(textos) < 2:
+            raise CommandError("Se necesitan al menos 2 sílabos analizados para comparar.")
+
+        referencia, seg_ref = self._encode('torch', textos, options['batch'])
+        sim_ref = referencia @ referencia.T
+        pares = np.triu_indices(len(textos), k=1)
+
+        self.stdout.write(f"Textos: {len(textos)}")
+        self.stdout.write(f"{'backend':<8}{'textos/s':>10}{'drift medio':>13}{'drift máx':>11}"
+                          + ''.join(f"{'cruces ' + str(u):>13}" for u in UMBRALES_IA))
+        self.stdout.write(f"{'torch':<8}{len(textos) / seg_ref:>10.1f}{0:>13.4f}{0:>11.4f}"
+                          + ''.join(f"{0:>13}" for _ in UMBRALES_IA))
+
+        for backend in backends:
+            try:
+                vectores, segundos = self._encode(backend, textos, options['batch'])
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"{backend:<8} no disponible: {e}"))
+                continue
+
+            drift = 1 - np.sum(referencia * vectores, axis=1)
+            sim = vectores @ vectores.T
+            cruces = [
+                int(np.sum((sim_ref[pares] > u) != (sim[pares] > u)))
+                for u in UMBRALES_IA
+            ]
+            self.stdout.write(
+                f"{backend:<8}{len(textos) / segundos:>10.1f}{drift.mean():>13.4f}{drift.max():>11.4f}"
+                + ''.join(f"{c:>13}" for c in cruces)
+            )
+
+    def _encode(self, backend, textos, batch):
+        modelo, _ = cargar_transformer(backend)
+        modelo.encode(textos[:2], batch_size=batch)  # calentamiento
+        inicio = time.perf_counter()
+        vectores = modelo.encode(textos, batch_size=batch)
+        segundos = time.perf_counter() - inicio
+        return _normalizar(np.asarray(vectores, dtype=np.float32)), segundos
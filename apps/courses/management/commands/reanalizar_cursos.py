@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.courses.admision import tareas_en_cola
+from apps.courses.models import Curso
+from apps.courses.tasks import task_analizar_curso_ia
+
+COLA = 'masivo'
+
+
+class Command(BaseCommand):
+    help = ("Re-analiza cursos en la cola 'masivo', en lotes con pausa y sin dejar que la cola crezca más de "
+            "--max-en-cola. Los sílabos recién subidos van por 'interactivo' y no esperan detrás de esto.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', action='store_true',
+                            help="Todos los cursos; por defecto solo los que no tienen embedding")
+        parser.add_argument('--recalcular-embedding', action='store_true',
+                            help="El análisis vuelve a calcular el embedding y reemplaza el guardado")
+        parser.add_argument('--escuela', type=int, help="Solo cursos de esta escuela")
+        parser.add_argument('--lote', type=int, default=100)
+        parser.add_argument('--pausa', type=float, default=5, help="Segundos entre lotes")
+        parser.add_argument('--max-en-cola', type=int, default=500,
+                            help="Espera a que la cola masivo baje de este número antes de cada lote")
+
+    def handle(self, *args, **options):
+        cursos = Curso.objects.order_by('created_at')
+        if not options['todos']:
+            cursos = cursos.filter(analisis__embedding_vector__isnull=True)
+        if options['escuela']:
+            cursos = cursos.filter(escuela_id=options['escuela'])
+        ids = list(cursos.values_list('id', flat=True))
+        self.stdout.write(f"{len(ids)} cursos a re-analizar en la cola '{COLA}'")
+
+        for i in range(0, len(ids), options['lote']):
+            self._esperar_cola(options['max_en_cola'], options['pausa'])
+            bloque = ids[i:i + options['lote']]
+            # El embedding viejo sigue en los centroides y en el índice semántico hasta que la tarea lo reemplaza
+            for curso_id in bloque:
+                task_analizar_curso_ia.apply_async(
+                    (curso_id,), {'recalcular_embedding': options['recalcular_embedding']}, queue=COLA
+                )
+            self.stdout.write(f"{min(i + options['lote'], len(ids))}/{len(ids)} encolados")
+            time.sleep(options['pausa'])
+
+        self.stdout.write(self.style.SUCCESS("Re-análisis encolado."))
+
+    def _esperar_cola(self, maximo, pausa):
+        while True:
+            en_cola = tareas_en_cola(COLA)
+            if en_cola is None or en_cola < maximo:
+                return
+            self.stdout.write(f"Cola '{COLA}' con {en_cola} tareas, esperando...")
+            time.sleep(pausa)
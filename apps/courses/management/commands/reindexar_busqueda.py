@@ -0,0 +1,31 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from apps.courses.busqueda import CLAVE_ESTADISTICAS, indexar_cursos_en_lote
+from apps.courses.models import Curso, CursoAnalisis
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice invertido de búsqueda (TerminoCurso) a partir de los tokens ya guardados."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500)
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        ids = list(Curso.objects.order_by('created_at').values_list('id', flat=True))
+        total_postings = 0
+
+        for i in range(0, len(ids), options['lote']):
+            bloque = ids[i:i + options['lote']]
+            cursos = list(Curso.objects.filter(id__in=bloque).only('id', 'nombre', 'codigo_curso'))
+            tokens = dict(CursoAnalisis.objects.filter(curso_id__in=bloque).values_list('curso_id', 'tokens'))
+            total_postings += indexar_cursos_en_lote(cursos, tokens)
+            self.stdout.write(f"{min(i + options['lote'], len(ids))}/{len(ids)} cursos")
+
+        cache.delete(CLAVE_ESTADISTICAS)
+        self.stdout.write(self.style.SUCCESS(
+            f"Índice reconstruido: {len(ids)} cursos, {total_postings} postings en {time.perf_counter() - inicio:.1f}s"
+        ))
@@ -0,0 +1,175 @@
+import random
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.courses.models import Curso, CursoAnalisis, GrupoEquivalencia, Inscripcion
+from apps.courses.services import calcular_hash_contenido
+from apps.courses.sinteticos import DISCIPLINAS, NOMBRES
+from apps.users.models import Area, Escuela, Facultad, User
+from apps.users.taxonomia import invalidar_taxonomia
+
+DOMINIO = 'seed.unsa.edu.pe'
+DIMENSION = 384
+MAX_CURSOS_POR_ALUMNO = 2  # mismas reglas que create/join
+MAX_CREDITOS = 11
+
+
+class Command(BaseCommand):
+    help = ("Genera datos a escala con bulk_create para pruebas de carga: áreas, facultades, escuelas, alumnos, "
+            "cursos con embeddings sintéticos, grupos de equivalencia e inscripciones.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--areas', type=int, default=4)
+        parser.add_argument('--facultades', type=int, default=16)
+        parser.add_argument('--escuelas', type=int, default=50)
+        parser.add_argument('--usuarios', type=int, default=30000)
+        parser.add_argument('--cursos', type=int, default=5000)
+        parser.add_argument('--grupos', type=int, default=800)
+        parser.add_argument('--inscritos', type=float, default=0.6, help="Fracción de alumnos inscritos en algún curso")
+        parser.add_argument('--prefijo', default='seed', help="Prefijo de nombres y emails (permite varias corridas)")
+        parser.add_argument('--password', default='carga-local', help="Password común de los alumnos generados")
+        parser.add_argument('--lote', type=int, default=5000)
+        parser.add_argument('--semilla', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if User.objects.filter(email__endswith=f"@{options['prefijo']}.{DOMINIO}").exists():
+            raise CommandError(f"Ya existen datos con el prefijo '{options['prefijo']}'. Usa otro --prefijo.")
+
+        random.seed(options['semilla'])
+        self.rng = np.random.default_rng(options['semilla'])
+        self.lote = options['lote']
+        self.prefijo = options['prefijo']
+        inicio = time.perf_counter()
+
+        with transaction.atomic():
+            escuelas = self._taxonomia(options['areas'], options['facultades'], options['escuelas'])
+            alumnos = self._usuarios(options['usuarios'], escuelas, options['password'])
+            grupos, grupos_por_escuela = self._grupos(options['grupos'], escuelas)
+            cursos = self._cursos(options['cursos'], alumnos, grupos_por_escuela)
+            inscripciones = self._inscripciones(cursos, alumnos, grupos_por_escuela, options['inscritos'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Sembrado en {time.perf_counter() - inicio:.1f}s: {len(escuelas)} escuelas, {len(alumnos)} alumnos, "
+            f"{len(grupos)} grupos, {len(cursos)} cursos, {inscripciones} inscripciones. "
+            f"Corre reindexar_busqueda para el índice de búsqueda."
+        ))
+
+    def _taxonomia(self, n_areas, n_facultades, n_escuelas):
+        areas = Area.objects.bulk_create([Area(nombre=f'Área {self.prefijo} {i}') for i in range(n_areas)])
+        facultades = Facultad.objects.bulk_create([
+            Facultad(nombre=f'Facultad {self.prefijo} {i}', area=areas[i % n_areas]) for i in range(n_facultades)
+        ])
+        escuelas = Escuela.objects.bulk_create([
+            Escuela(nombre=f'Escuela {self.prefijo} {i}', facultad=facultades[i % n_facultades]) for i in range(n_escuelas)
+        ])
+        invalidar_taxonomia()  # bulk_create no dispara post_save
+        self.stdout.write(f"Taxonomía: {n_areas} áreas, {n_facultades} facultades, {n_escuelas} escuelas")
+        return escuelas
+
+    def _usuarios(self, n, escuelas, password):
+        # Un solo hash para todos: hashear 30k passwords tomaría minutos
+        hash_password = make_password(password)
+        base = User.objects.count()
+        User.objects.bulk_create((
+            User(
+                email=f'{self.prefijo}{i}@{self.prefijo}.{DOMINIO}',
+                password=hash_password,
+                first_name=f'Alumno{i}',
+                last_name='Carga',
+                escuela=escuelas[i % len(escuelas)],
+                codigo_alumno=f'7{base + i:07d}',
+                celular=f'8{base + i:08d}',
+            ) for i in range(n)
+        ), batch_size=self.lote)
+        alumnos = list(
+            User.objects.filter(email__endswith=f'@{self.prefijo}.{DOMINIO}').values_list('id', 'escuela_id')
+        )
+        self.stdout.write(f"Alumnos: {len(alumnos)}")
+        return alumnos
+
+    def _grupos(self, n, escuelas):
+        grupos = GrupoEquivalencia.objects.bulk_create([
+            GrupoEquivalencia(nombre=f'{random.choice(sum(NOMBRES.values(), []))} ({self.prefijo} {i})')
+            for i in range(n)
+        ])
+        Through = GrupoEquivalencia.escuelas.through
+        filas, grupos_por_escuela = [], defaultdict(list)
+        for grupo in grupos:
+            for escuela in random.sample(escuelas, k=min(len(escuelas), random.randint(2, 4))):
+                filas.append(Through(grupoequivalencia_id=grupo.id, escuela_id=escuela.id))
+                grupos_por_escuela[escuela.id].append(grupo.id)
+        Through.objects.bulk_create(filas, batch_size=self.lote)
+        self.stdout.write(f"Grupos: {n} con {len(filas)} membresías de escuela")
+        return grupos, grupos_por_escuela
+
+    def _cursos(self, n, alumnos, grupos_por_escuela):
+        disciplinas = list(DISCIPLINAS)
+        centros = {g: self.rng.normal(size=DIMENSION) for grupos in grupos_por_escuela.values() for g in grupos}
+        delegados = random.sample(alumnos, k=min(n, len(alumnos)))
+
+        cursos, analisis = [], []
+        for i, (creador_id, escuela_id) in enumerate(delegados):
+            disciplina = disciplinas[i % len(disciplinas)]
+            grupos = grupos_por_escuela.get(escuela_id)
+            grupo_id = random.choice(grupos) if grupos and random.random() < 0.6 else None
+            curso = Curso(
+                nombre=f'{random.choice(NOMBRES[disciplina])} {i}',
+                creditos=random.randint(2, 5),
+                escuela_id=escuela_id,
+                creador_id=creador_id,
+                grupo_equivalencia_id=grupo_id,
+                syllabus=f'syllabus/{self.prefijo}-{i}.pdf',
+                minimo_alumnos=random.choice((10, 15, 20)),
+            )
+            centro = centros[grupo_id] if grupo_id else self.rng.normal(size=DIMENSION)
+            temas = random.sample(DISCIPLINAS[disciplina], k=8)
+            analisis.append(CursoAnalisis(
+                curso=curso,
+                contenido_hash=calcular_hash_contenido(f'{self.prefijo}-{i}'),
+                tokens=sorted(temas),
+                embedding_vector=(centro + self.rng.normal(scale=0.2, size=DIMENSION)).round(5).tolist(),
+            ))
+            cursos.append(curso)
+
+        Curso.objects.bulk_create(cursos, batch_size=self.lote)
+        CursoAnalisis.objects.bulk_create(analisis, batch_size=1000)
+        self.stdout.write(f"Cursos: {len(cursos)} ({sum(1 for c in cursos if c.grupo_equivalencia_id)} en grupos)")
+        return cursos
+
+    def _inscripciones(self, cursos, alumnos, grupos_por_escuela, fraccion):
+        # Cursos visibles por escuela: los propios + los de sus grupos (como el muro)
+        por_escuela, por_grupo = defaultdict(list), defaultdict(list)
+        for curso in cursos:
+            por_escuela[curso.escuela_id].append(curso)
+            if curso.grupo_equivalencia_id:
+                por_grupo[curso.grupo_equivalencia_id].append(curso)
+
+        cargas = defaultdict(lambda: [0, 0])  # usuario -> [cursos, créditos]
+        filas = []
+
+        def inscribir(usuario_id, curso):
+            carga = cargas[usuario_id]
+            if carga[0] >= MAX_CURSOS_POR_ALUMNO or carga[1] + curso.creditos > MAX_CREDITOS:
+                return
+            carga[0] += 1
+            carga[1] += curso.creditos
+            filas.append(Inscripcion(usuario_id=usuario_id, curso_id=curso.id))
+
+        for curso in cursos:
+            inscribir(curso.creador_id, curso)
+
+        for usuario_id, escuela_id in alumnos:
+            if random.random() >= fraccion:
+                continue
+            visibles = por_escuela[escuela_id] + [c for g in grupos_por_escuela.get(escuela_id, ()) for c in por_grupo[g]]
+            for curso in random.sample(visibles, k=min(len(visibles), random.randint(1, MAX_CURSOS_POR_ALUMNO))):
+                if curso.creador_id != usuario_id:
+                    inscribir(usuario_id, curso)
+
+        Inscripcion.objects.bulk_create(filas, batch_size=self.lote, ignore_conflicts=True)
+        return len(filas)
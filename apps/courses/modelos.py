@@ -0,0 +1,42 @@
+"""
+Empaquetado offline del modelo de embeddings.
+
+No depende de Django para poder ejecutarse en el build de Docker antes de copiar el código:
+    python modelos.py /app/modelos
+"""
+import os
+import sys
+
+MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
+
+
+def ruta_modelo(directorio):
+    return os.path.join(str(directorio), MODEL_NAME)
+
+
+def vendorizar_transformer(directorio):
+    # Pesos en safetensors: al cargarlos se mapean con mmap en vez de deserializar un pickle
+    from sentence_transformers import SentenceTransformer
+
+    destino = ruta_modelo(directorio)
+    modelo = SentenceTransformer(MODEL_NAME, device='cpu')
+    modelo.save(destino, safe_serialization=True)
+
+    pesos = [f for _, _, archivos in os.walk(destino) for f in archivos if f.endswith('.safetensors')]
+    if not pesos:
+        raise RuntimeError(f"No se generaron pesos .safetensors en {destino}")
+    return destino
+
+
+def exportar_onnx(directorio):
+    # Requiere optimum[onnxruntime]. Deja onnx/model.onnx junto al bundle para cargarlo offline
+    from sentence_transformers import SentenceTransformer
+
+    destino = ruta_modelo(directorio)
+    modelo = SentenceTransformer(destino, device='cpu', backend='onnx')
+    modelo.save(destino)
+    return destino
+
+
+if __name__ == '__main__':
+    print(vendorizar_transformer(sys.argv[1] if len(sys.argv) > 1 else 'modelos'))
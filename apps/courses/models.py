@@ -6,6 +6,8 @@ from django.conf import settings
 import uuid
 import os
 
+from apps.users.taxonomia import nombre_escuela
+
 
 class GrupoEquivalencia(models.Model):
     nombre = models.CharField(max_length=200)
@@ -29,10 +31,10 @@ def syllabus_upload_path(instance, filename):
     extension = os.path.splitext(filename)[1]
 
     nombre_curso = slugify(instance.nombre)
-    nombre_escuela = slugify(instance.escuela.nombre)
+    escuela = slugify(nombre_escuela(instance.escuela_id))
     uid = str(instance.id)[:6]
 
-    return f"syllabus/{nombre_curso}-{nombre_escuela}-{uid}{extension}"
+    return f"syllabus/{nombre_curso}-{escuela}-{uid}{extension}"
 
 
 class Curso(models.Model):
@@ -54,6 +56,14 @@ class Curso(models.Model):
     escuela = models.ForeignKey('users.Escuela', on_delete=models.CASCADE, related_name='cursos_solicitados')
     grupo_equivalencia = models.ForeignKey(GrupoEquivalencia, on_delete=models.SET_NULL, null=True, blank=True,
                                            related_name='instancias_curso')
+    agrupacion_provisional = models.BooleanField(
+        default=False,
+        help_text="Agrupado por nombre mientras el análisis IA del sílabo está pendiente"
+    )
+    escuela_agregada_provisional = models.BooleanField(
+        default=False,
+        help_text="La agrupación provisional sumó la escuela al grupo; se quita si el análisis mueve el curso"
+    )
     creador = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='cursos_creados')
 
     syllabus = models.FileField(
@@ -76,9 +86,6 @@ class Curso(models.Model):
         help_text="Usuario nominado para ser el nuevo delegado"
     )
 
-    contenido_cache = models.TextField(blank=True, null=True, editable=False)
-    embedding_vector = models.JSONField(blank=True, null=True, editable=False)
-
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -86,10 +93,26 @@ class Curso(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"{self.nombre} - {self.escuela.nombre}"
+        return f"{self.nombre} - {nombre_escuela(self.escuela_id)}"
+
+    # Lo que el progreso en vivo muestra del curso; el resto de sus cambios no se publica
+    CAMPOS_PROGRESO = ('estado', 'minimo_alumnos')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        curso = super().from_db(db, field_names, values)
+        curso.progreso_guardado = curso.valores_progreso()
+        return curso
+
+    def valores_progreso(self):
+        # __dict__ y no getattr: un campo diferido no se carga (ni cambia: save() no lo escribe)
+        return tuple(self.__dict__.get(campo) for campo in self.CAMPOS_PROGRESO)
 
     @property
     def total_inscritos(self):
+        # Las vistas de listado anotan inscritos_count para evitar un COUNT por curso
+        if hasattr(self, 'inscritos_count'):
+            return self.inscritos_count
         return self.inscripciones.count()
 
     @property
@@ -107,6 +130,113 @@ class Curso(models.Model):
             })
 
 
+class CursoAnalisis(models.Model):
+    # Artefactos pesados del análisis IA, separados de Curso para que los listados no los carguen
+    curso = models.OneToOneField(Curso, on_delete=models.CASCADE, primary_key=True, related_name='analisis')
+
+    contenido_cache = models.TextField(blank=True, null=True, editable=False)
+    contenido_hash = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
+    tokens = models.JSONField(blank=True, null=True, editable=False)
+    embedding_vector = models.JSONField(blank=True, null=True, editable=False)
+    terminos_indexados = models.PositiveIntegerField(default=0, editable=False,
+                                                     help_text="Longitud del documento en el índice de búsqueda")
+    analisis_diferido = models.BooleanField(default=False, db_index=True, editable=False,
+                                            help_text="Aceptado con la cola saturada; se encola cuando baje")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Análisis de curso"
+        verbose_name_plural = "Análisis de cursos"
+
+    def __str__(self):
+        return f"Análisis de {self.curso_id}"
+
+
+class AnalisisRun(models.Model):
+    # Una fila por ejecución de procesar_y_agrupar_curso, para auditar agrupaciones raras y sílabos lentos
+    RESULTADOS = [
+        ('MATCH', 'Agrupado en grupo existente'),
+        ('GRUPO_NUEVO', 'Grupo nuevo'),
+        ('SIN_MODELO', 'Modelo IA no disponible'),
+        ('PDF_INVALIDO', 'Sílabo ilegible'),
+        ('ERROR', 'Error'),
+    ]
+
+    curso = models.ForeignKey(Curso, on_delete=models.CASCADE, related_name='analisis_runs')
+    resultado = models.CharField(max_length=20, choices=RESULTADOS)
+    grupo = models.ForeignKey(GrupoEquivalencia, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    segundos_lectura_pdf = models.FloatField(default=0)
+    segundos_embedding = models.FloatField(default=0)
+    segundos_tokens = models.FloatField(default=0)
+    segundos_candidatos = models.FloatField(default=0, help_text="Centroides y tokens de los grupos candidatos")
+    segundos_scoring = models.FloatField(default=0, help_text="Coseno y Jaccard contra cada grupo")
+    segundos_total = models.FloatField(default=0)
+
+    grupos_candidatos = models.PositiveIntegerField(default=0)
+    cursos_comparados = models.PositiveIntegerField(default=0)
+    score_ia = models.FloatField(null=True, blank=True, help_text="Del mejor grupo compatible")
+    max_jaccard = models.FloatField(null=True, blank=True)
+    score_hibrido = models.FloatField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Ejecución de análisis"
+        verbose_name_plural = "Ejecuciones de análisis"
+        indexes = [
+            models.Index(fields=['-segundos_total'], name='analisis_run_lentos'),
+            models.Index(fields=['curso', '-created_at'], name='analisis_run_curso'),
+        ]
+
+    def __str__(self):
+        return f"{self.curso_id} {self.resultado} ({self.segundos_total:.2f}s)"
+
+
+class CursoSimilar(models.Model):
+    # Grafo k-NN precalculado: los TOP_K cursos más parecidos con los mismos créditos
+    curso = models.ForeignKey(Curso, on_delete=models.CASCADE, related_name='similares')
+    similar = models.ForeignKey(Curso, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField(help_text="Score híbrido (70% coseno, 30% Jaccard)")
+    score_ia = models.FloatField()
+    jaccard = models.FloatField()
+
+    class Meta:
+        verbose_name = "Curso similar"
+        verbose_name_plural = "Cursos similares"
+        constraints = [
+            models.UniqueConstraint(fields=['curso', 'similar'], name='curso_similar_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['curso', '-score'], name='curso_similar_ranking'),
+        ]
+
+    def __str__(self):
+        return f"{self.curso_id} ~ {self.similar_id} ({self.score:.2f})"
+
+
+class TerminoCurso(models.Model):
+    # Índice invertido para la búsqueda: un posting por (lema, curso)
+    termino = models.CharField(max_length=64)
+    curso = models.ForeignKey(Curso, on_delete=models.CASCADE, related_name='terminos')
+    frecuencia = models.PositiveIntegerField(default=1)
+    longitud = models.PositiveIntegerField(default=1, help_text="Copia de la longitud del documento, evita un join")
+
+    class Meta:
+        verbose_name = "Término de búsqueda"
+        verbose_name_plural = "Términos de búsqueda"
+        constraints = [
+            # El índice (termino, curso) es el que recorre la búsqueda
+            models.UniqueConstraint(fields=['termino', 'curso'], name='termino_curso_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.termino} -> {self.curso_id}"
+
+
 class Inscripcion(models.Model):
     usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='inscripciones')
     curso = models.ForeignKey(Curso, on_delete=models.CASCADE, related_name='inscripciones')
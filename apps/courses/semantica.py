@@ -0,0 +1,194 @@
+import logging
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .busqueda import grupos_visibles
+from .models import Curso, CursoAnalisis
+from .services import get_transformer_model
+
+logger = logging.getLogger(__name__)
+
+UMBRAL_APROXIMADO = 20000
+MINIMO_IVF = 256
+SONDAS = 8
+ITERACIONES_KMEANS = 10
+SCORE_MINIMO = 0.30
+BLOQUE = 8192
+
+
+def embedding_consulta(consulta):
+    """
+    Embedding normalizado de la consulta, o None si el modelo no cargó. El modelo se revisa fuera del LRU
+    para no cachear el fallo: la siguiente consulta vuelve a intentar la carga.
+    """
+    if not get_transformer_model():
+        return None
+    return _embedding_en_cache(consulta)
+
+
+@lru_cache(maxsize=settings.BUSQUEDA_CACHE_CONSULTAS)
+def _embedding_en_cache(consulta):
+    # Las consultas populares se repiten mucho: el LRU evita la inferencia
+    vector = np.asarray(get_transformer_model().encode(consulta), dtype=np.float32)
+    vector /= np.linalg.norm(vector) or 1.0
+    vector.setflags(write=False)
+    return vector
+
+
+def _normalizar_filas(matriz):
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    matriz /= normas
+
+
+class IndiceSemantico:
+    """
+    Matriz float32 (n x d) con los embedding_vector normalizados, más la escuela y el grupo de cada fila
+    para filtrar por visibilidad sin ir a la BD. En modo aproximado agrega un IVF (k-means esférico):
+    solo se recorren las listas de los SONDAS centroides más cercanos a la consulta.
+    """
+
+    def __init__(self, firma, entrenar_ivf):
+        self.firma = firma
+        self.centroides = None
+        self.listas = None
+
+        filas = (
+            CursoAnalisis.objects
+            .filter(embedding_vector__isnull=False)
+            .values_list('curso_id', 'curso__escuela_id', 'curso__grupo_equivalencia_id', 'embedding_vector')
+        )
+        total = filas.count()
+        self.ids = []
+        self.escuelas = np.empty(total, dtype=np.int64)
+        self.grupos = np.full(total, -1, dtype=np.int64)
+        self.matriz = None
+
+        # Se llena fila a fila: materializar las listas de floats primero costaría ~6x la matriz final
+        i = 0
+        for curso_id, escuela_id, grupo_id, vector in filas.iterator(chunk_size=2000):
+            if i >= total or not vector:
+                continue
+            if self.matriz is None:
+                self.matriz = np.empty((total, len(vector)), dtype=np.float32)
+            self.ids.append(curso_id)
+            self.escuelas[i] = escuela_id
+            self.grupos[i] = grupo_id or -1
+            self.matriz[i] = vector
+            i += 1
+
+        self.escuelas = self.escuelas[:i]
+        self.grupos = self.grupos[:i]
+        self.matriz = self.matriz[:i] if self.matriz is not None else np.empty((0, 0), dtype=np.float32)
+        _normalizar_filas(self.matriz)
+
+        if entrenar_ivf and i >= MINIMO_IVF:
+            self._entrenar_ivf()
+
+    @property
+    def tiene_ivf(self):
+        return self.listas is not None
+
+    def _entrenar_ivf(self):
+        rng = np.random.default_rng(0)
+        n = len(self.ids)
+        k = max(1, int(np.sqrt(n)))
+        muestra = self.matriz[rng.choice(n, size=min(n, k * 40), replace=False)]
+        centroides = muestra[rng.choice(len(muestra), size=k, replace=False)].copy()
+
+        for _ in range(ITERACIONES_KMEANS):
+            asignacion = np.argmax(muestra @ centroides.T, axis=1)
+            for c in range(k):
+                miembros = muestra[asignacion == c]
+                if len(miembros):
+                    suma = miembros.sum(axis=0)
+                    centroides[c] = suma / (np.linalg.norm(suma) or 1.0)
+
+        asignacion = np.concatenate([
+            np.argmax(self.matriz[i:i + BLOQUE] @ centroides.T, axis=1) for i in range(0, n, BLOQUE)
+        ])
+        self.centroides = centroides
+        self.listas = [np.flatnonzero(asignacion == c) for c in range(k)]
+
+    def buscar(self, vector, escuela_id, grupos, limite, aproximado=False):
+        if not self.ids:
+            return []
+
+        if aproximado and self.tiene_ivf:
+            sondas = np.argsort(self.centroides @ vector)[-SONDAS:]
+            candidatos = np.concatenate([self.listas[c] for c in sondas])
+        else:
+            candidatos = np.arange(len(self.ids))
+
+        visibles = (self.escuelas[candidatos] == escuela_id) | np.isin(self.grupos[candidatos], grupos)
+        candidatos = candidatos[visibles]
+        if not len(candidatos):
+            return []
+
+        scores = self.matriz[candidatos] @ vector
+        if len(candidatos) > limite:
+            top = np.argpartition(-scores, limite)[:limite]
+        else:
+            top = np.arange(len(candidatos))
+        top = top[np.argsort(-scores[top])]
+
+        return [(self.ids[candidatos[j]], float(scores[j])) for j in top if scores[j] >= SCORE_MINIMO]
+
+
+_INDICE = None
+_VERIFICADO = 0.0
+_LOCK = threading.Lock()
+
+
+def _firma():
+    # Cambia si se agrega/re-analiza un curso (embedding) o si un curso cambia de grupo o escuela
+    analisis = CursoAnalisis.objects.filter(embedding_vector__isnull=False).aggregate(n=Count('pk'), ultimo=Max('updated_at'))
+    cursos = Curso.objects.aggregate(ultimo=Max('updated_at'))
+    return analisis['n'], analisis['ultimo'], cursos['ultimo']
+
+
+def get_indice():
+    """
+    Índice en memoria del proceso. Cada BUSQUEDA_SEMANTICA_TTL segundos se compara la firma y solo se reconstruye si cambió.
+    """
+    global _INDICE, _VERIFICADO
+    if _INDICE is not None and time.monotonic() - _VERIFICADO < settings.BUSQUEDA_SEMANTICA_TTL:
+        return _INDICE
+
+    with _LOCK:
+        if _INDICE is None or time.monotonic() - _VERIFICADO >= settings.BUSQUEDA_SEMANTICA_TTL:
+            firma = _firma()
+            if _INDICE is None or _INDICE.firma != firma:
+                inicio = time.perf_counter()
+                modo = settings.BUSQUEDA_SEMANTICA_MODO
+                entrenar = modo == 'aproximado' or (modo == 'auto' and firma[0] >= UMBRAL_APROXIMADO)
+                _INDICE = IndiceSemantico(firma, entrenar_ivf=entrenar)
+                logger.info(
+                    f"Índice semántico: {len(_INDICE.ids)} cursos, IVF={'sí' if _INDICE.tiene_ivf else 'no'} "
+                    f"en {time.perf_counter() - inicio:.2f}s"
+                )
+            _VERIFICADO = time.monotonic()
+    return _INDICE
+
+
+def buscar_semantico(usuario, consulta, limite=20, modo=None):
+    """
+    Devuelve [(curso_id, coseno)] de los cursos visibles más cercanos en significado a la consulta.
+    """
+    consulta = ' '.join(consulta.lower().split())
+    if not consulta or not usuario.escuela_id:
+        return []
+
+    vector = embedding_consulta(consulta)
+    if vector is None:
+        return []
+
+    indice = get_indice()
+    modo = modo or settings.BUSQUEDA_SEMANTICA_MODO
+    aproximado = modo == 'aproximado' or (modo == 'auto' and indice.tiene_ivf)
+    return indice.buscar(vector, usuario.escuela_id, grupos_visibles(usuario.escuela_id), limite, aproximado)
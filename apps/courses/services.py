@@ -1,32 +1,102 @@
 import re
 import os
 import io
+import mmap
+import time
+import hashlib
 import logging
+import unicodedata
+from collections import defaultdict
+from contextlib import contextmanager
 import numpy as np
 import spacy
 from pypdf import PdfReader
+from rapidfuzz import fuzz, process
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
+from django.conf import settings
 from django.db.models.fields.files import FieldFile
-from .models import GrupoEquivalencia, Curso
+from verunsa.metricas import ETAPA_DURACION, INFERENCIA_BATCH, MODELO_CARGA, PDF_PAGINAS, PDF_SEGUNDOS, lote
+from .blobcache import get_cache_silabos
+from .models import AnalisisRun, GrupoEquivalencia, Curso, CursoAnalisis
+from .modelos import MODEL_NAME, ruta_modelo
 
 logger = logging.getLogger(__name__)
 
 
-MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
-
 _TRANSFORMER_MODEL = None
 _NLP_MODEL = None
 
+_ESTADO_MODELOS = {
+    'transformer': {'cargado': False, 'segundos': None, 'origen': None, 'backend': None, 'error': None},
+    'spacy': {'cargado': False, 'segundos': None, 'origen': 'es_core_news_sm', 'error': None},
+}
+
+
+def estado_modelos():
+    return {nombre: dict(estado) for nombre, estado in _ESTADO_MODELOS.items()}
+
+
+def _registrar_carga(nombre, inicio, error=None):
+    estado = _ESTADO_MODELOS[nombre]
+    estado['cargado'] = error is None
+    estado['segundos'] = round(time.perf_counter() - inicio, 3)
+    estado['error'] = str(error) if error else None
+    if error is None:
+        MODELO_CARGA.observar(estado['segundos'], modelo=nombre)
+
+
+BACKENDS_EMBEDDING = ('torch', 'int8', 'onnx')
+
+
+def cargar_transformer(backend='torch'):
+    """
+    Carga el modelo con el backend pedido: torch fp32, int8 dinámico (torch) u ONNX Runtime en CPU.
+    """
+    ruta_local = ruta_modelo(settings.MODELOS_DIR)
+    kwargs = {'device': 'cpu'}
+    if settings.MODELOS_OFFLINE:
+        # Producción: solo el bundle local, nunca el hub
+        origen = ruta_local
+        kwargs['local_files_only'] = True
+    elif os.path.isdir(ruta_local):
+        origen = ruta_local
+    else:
+        origen = MODEL_NAME
+
+    if backend == 'onnx':
+        # Requiere optimum[onnxruntime]; usa onnx/model.onnx del bundle o lo exporta al vuelo
+        return SentenceTransformer(origen, backend='onnx', **kwargs), origen
+
+    modelo = SentenceTransformer(origen, **kwargs)
+    if backend == 'int8':
+        import torch
+        modelo = torch.ao.quantization.quantize_dynamic(modelo, {torch.nn.Linear}, dtype=torch.qint8)
+    return modelo, origen
+
 
 def get_transformer_model():
     global _TRANSFORMER_MODEL
     if _TRANSFORMER_MODEL is None:
-        logger.info(f"Cargando modelo IA {MODEL_NAME} en memoria...")
+        backend = settings.EMBEDDING_BACKEND
+        logger.info(f"Cargando modelo IA {MODEL_NAME} ({backend}) en memoria...")
+        inicio = time.perf_counter()
         try:
-            _TRANSFORMER_MODEL = SentenceTransformer(MODEL_NAME)
-            logger.info("Modelo IA cargado correctamente.")
+            try:
+                _TRANSFORMER_MODEL, origen = cargar_transformer(backend)
+            except Exception as e:
+                if backend == 'torch':
+                    raise
+                logger.error(f"Backend {backend} no disponible ({e}). Usando torch fp32.")
+                backend = 'torch'
+                _TRANSFORMER_MODEL, origen = cargar_transformer(backend)
+
+            _ESTADO_MODELOS['transformer']['origen'] = origen
+            _ESTADO_MODELOS['transformer']['backend'] = backend
+            _registrar_carga('transformer', inicio)
+            logger.info(f"Modelo IA cargado correctamente en {_ESTADO_MODELOS['transformer']['segundos']}s.")
         except Exception as e:
+            _registrar_carga('transformer', inicio, error=e)
             logger.error(f"Error cargando modelo IA: {e}")
             return None
     return _TRANSFORMER_MODEL
@@ -36,51 +106,91 @@ def get_nlp_model():
     global _NLP_MODEL
     if _NLP_MODEL is None:
         logger.info("Cargando modelo Spacy...")
+        inicio = time.perf_counter()
         try:
             _NLP_MODEL = spacy.load("es_core_news_sm", disable=["parser", "ner"])
+            _registrar_carga('spacy', inicio)
             logger.info("Modelo Spacy cargado.")
         except Exception as e:
+            _registrar_carga('spacy', inicio, error=e)
             logger.error(f"Error cargando Spacy: {e}")
             return None
     return _NLP_MODEL
 
 
+def precargar_modelos():
+    get_nlp_model()
+    get_transformer_model()
+    return estado_modelos()
+
+
+@contextmanager
+def abrir_stream_pdf(archivo_o_ruta):
+    """
+    Entrega a PdfReader un stream sin copiar el PDF en memoria cuando es posible:
+    rutas y TemporaryUploadedFile se mapean con mmap, y los file-like seekables se pasan tal cual.
+    """
+    ruta = None
+    if isinstance(archivo_o_ruta, (str, os.PathLike)):
+        ruta = archivo_o_ruta
+    elif hasattr(archivo_o_ruta, 'temporary_file_path'):
+        ruta = archivo_o_ruta.temporary_file_path()
+
+    if ruta is not None:
+        with open(ruta, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            yield m
+        return
+
+    # InMemoryUploadedFile y similares: usamos el buffer subyacente
+    base = getattr(archivo_o_ruta, 'file', archivo_o_ruta)
+    if hasattr(base, 'seekable') and base.seekable():
+        base.seek(0)
+        try:
+            yield base
+        finally:
+            base.seek(0)
+        return
+
+    # Último recurso para streams no seekables
+    yield io.BytesIO(archivo_o_ruta.read())
+
+
+def abrir_field_file(field_file):
+    if settings.SYLLABUS_CACHE_ENABLED:
+        try:
+            return get_cache_silabos().abrir(field_file.name)
+        except Exception as e:
+            logger.warning(f"Cache de sílabos no disponible, leyendo del storage: {e}")
+    return field_file.open('rb')
+
+
+def extraer_texto_reader(reader):
+    texto = ""
+    inicio = time.perf_counter()
+    for page in reader.pages:
+        t = page.extract_text()
+        if t: texto += t + "\n"
+    # pages/segundo = rate(pdf_pages_parsed_total) / rate(pdf_parse_seconds_total)
+    with lote() as pipe:
+        PDF_PAGINAS.inc(len(reader.pages), pipe=pipe)
+        PDF_SEGUNDOS.inc(time.perf_counter() - inicio, pipe=pipe)
+    return texto
+
+
 def leer_pdf_agnostico(archivo_o_ruta):
     texto = ""
     try:
-        reader = None
-
         # archivo ya guardado en S3
         if isinstance(archivo_o_ruta, FieldFile):
             try:
-                with archivo_o_ruta.open('rb') as f:
-                    reader = PdfReader(f)
-                    for page in reader.pages:
-                        t = page.extract_text()
-                        if t: texto += t + "\n"
+                with abrir_field_file(archivo_o_ruta) as f:
+                    texto = extraer_texto_reader(PdfReader(f))
             except Exception as e:
                 logger.error(f"Error abriendo FieldFile: {e}")
                 return ""
-        else:
-            stream_trabajo = None
-            if hasattr(archivo_o_ruta, 'read'):
-
-                if hasattr(archivo_o_ruta, 'seek'):
-                    archivo_o_ruta.seek(0)
-                content = archivo_o_ruta.read()
-                if hasattr(archivo_o_ruta, 'seek'):
-                    archivo_o_ruta.seek(0)
-
-                stream_trabajo = io.BytesIO(content)
-
-            elif isinstance(archivo_o_ruta, str):
-                stream_trabajo = archivo_o_ruta
-
-            if stream_trabajo:
-                reader = PdfReader(stream_trabajo)
-                for page in reader.pages:
-                    t = page.extract_text()
-                    if t: texto += t + "\n"
+        elif hasattr(archivo_o_ruta, 'read') or isinstance(archivo_o_ruta, (str, os.PathLike)):
+            with abrir_stream_pdf(archivo_o_ruta) as stream_trabajo:
+                texto = extraer_texto_reader(PdfReader(stream_trabajo))
 
     except Exception as e:
         logger.error(f"Error general leyendo PDF: {e}")
@@ -200,19 +310,42 @@ def extraer_datos_inteligente(path_o_archivo):
     return resultado
 
 
+def preparar_texto_embedding(texto):
+    t = re.sub(r'\s+', ' ', texto.lower().replace('\n', ' ')).strip()
+    return t[:2000]
+
+
 def generar_embedding(texto):
     model = get_transformer_model()
     if not model or not texto: return []
 
-    t = re.sub(r'\s+', ' ', texto.lower().replace('\n', ' ')).strip()
-    return model.encode(t[:2000]).tolist()
+    INFERENCIA_BATCH.observar(1)
+    return model.encode(preparar_texto_embedding(texto)).tolist()
 
 
-def calcular_centroide_grupo(grupo):
-    cursos = grupo.instancias_curso.filter(embedding_vector__isnull=False)
-    if not cursos.exists(): return None
-    vectores = [np.array(c.embedding_vector) for c in cursos]
-    return np.mean(vectores, axis=0)
+def calcular_hash_contenido(texto):
+    return hashlib.sha256((texto or '').encode('utf-8')).hexdigest()
+
+
+def obtener_tokens_curso(curso_id):
+    """
+    Tokens de un curso ya analizado. Si el análisis es anterior a guardar tokens, se calculan una vez y se persisten.
+    """
+    analisis = CursoAnalisis.objects.only('contenido_cache').get(curso_id=curso_id)
+    tokens = limpiar_texto_para_tokens(analisis.contenido_cache)
+    CursoAnalisis.objects.filter(curso_id=curso_id).update(tokens=sorted(tokens))
+    return tokens
+
+
+def calcular_centroide_grupo(grupo, excluir_id=None):
+    vectores = list(
+        CursoAnalisis.objects
+        .filter(curso__grupo_equivalencia=grupo, embedding_vector__isnull=False)
+        .exclude(curso_id=excluir_id)
+        .values_list('embedding_vector', flat=True)
+    )
+    if not vectores: return None
+    return np.mean([np.array(v) for v in vectores], axis=0)
 
 
 def calcular_jaccard(tokens1, tokens2):
@@ -222,37 +355,111 @@ def calcular_jaccard(tokens1, tokens2):
     return interseccion / union
 
 
-def procesar_y_agrupar_curso(curso):
+UMBRAL_MATCH = 0.65
+
+
+def puntuar_hibrido(score_ia, max_jaccard):
+    """
+    Score híbrido (70% semántico, 30% léxico) si el par es compatible; None si no lo es.
+    """
+    es_compatible = False
+    if score_ia > 0.82 and max_jaccard > 0.35:
+        es_compatible = True
+    elif score_ia > 0.92 and max_jaccard > 0.20:
+        es_compatible = True
+
+    if not es_compatible:
+        return None
+    return (score_ia * 0.70) + (max_jaccard * 0.30)
+
+
+class RegistroAnalisis:
+    """
+    Tiempos y resultado de una ejecución de procesar_y_agrupar_curso. Se acumula en memoria y se
+    guarda con un solo INSERT al final, para no sumar escrituras al pipeline.
+    """
+    ETAPAS = ('lectura_pdf', 'embedding', 'tokens', 'candidatos', 'scoring')
+
+    def __init__(self, curso):
+        self.run = AnalisisRun(curso=curso)
+        self.inicio = time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            campo = f'segundos_{nombre}'
+            setattr(self.run, campo, getattr(self.run, campo) + time.perf_counter() - inicio)
+
+    def guardar(self, resultado, grupo=None, error=''):
+        self.run.resultado = resultado
+        self.run.grupo = grupo
+        self.run.error = error
+        self.run.segundos_total = time.perf_counter() - self.inicio
+        with lote() as pipe:
+            for nombre in self.ETAPAS:
+                segundos = getattr(self.run, f'segundos_{nombre}')
+                if segundos:
+                    ETAPA_DURACION.observar(segundos, pipe=pipe, etapa=nombre)
+        self.run.save()
+
+
+def procesar_y_agrupar_curso(curso, recalcular_embedding=False):
+    registro = RegistroAnalisis(curso)
+    try:
+        return _procesar_y_agrupar_curso(curso, registro, recalcular_embedding)
+    except Exception as e:
+        registro.guardar('ERROR', error=str(e))
+        raise
+
+
+def _procesar_y_agrupar_curso(curso, registro, recalcular_embedding=False):
     logger.info(f"--- [CELERY] Iniciando análisis para curso: {curso.nombre} ---")
 
-    texto_a_procesar = curso.contenido_cache
+    analisis, _ = CursoAnalisis.objects.get_or_create(curso=curso)
+    texto_a_procesar = analisis.contenido_cache
+    grupo_provisional_id = curso.grupo_equivalencia_id if curso.agrupacion_provisional else None
+    grupo_confirmado_id = None if curso.agrupacion_provisional else curso.grupo_equivalencia_id
 
     if not texto_a_procesar:
         logger.info(f"Cache vacío para curso {curso.nombre}. Intentando leer fuente...")
         try:
-            datos = extraer_datos_inteligente(curso.syllabus)
+            with registro.etapa('lectura_pdf'):
+                datos = extraer_datos_inteligente(curso.syllabus)
 
             if datos['es_silabo']:
                 texto_a_procesar = datos['contenido_raw']
                 if datos['creditos'] > 0:
                     curso.creditos = datos['creditos']
-                curso.contenido_cache = texto_a_procesar
+                analisis.contenido_cache = texto_a_procesar
+                analisis.contenido_hash = calcular_hash_contenido(texto_a_procesar)
             else:
                 logger.warning(f"Fallo al re-procesar PDF: {datos.get('mensaje_error')}")
+                registro.guardar('PDF_INVALIDO', error=datos.get('mensaje_error') or '')
                 return False
 
         except Exception as e:
             logger.error(f"Error crítico leyendo PDF: {e}")
+            registro.guardar('PDF_INVALIDO', error=str(e))
             return False
 
-    if not curso.embedding_vector:
-        curso.embedding_vector = generar_embedding(texto_a_procesar)
+    if recalcular_embedding or not analisis.embedding_vector:
+        with registro.etapa('embedding'):
+            analisis.embedding_vector = generar_embedding(texto_a_procesar)
 
-    tokens_curso_nuevo = limpiar_texto_para_tokens(curso.contenido_cache)
+    with registro.etapa('tokens'):
+        tokens_curso_nuevo = limpiar_texto_para_tokens(analisis.contenido_cache)
+    analisis.tokens = sorted(tokens_curso_nuevo)
+    analisis.save()
     curso.save()
 
     if not get_transformer_model():
-        crear_grupo_nuevo(curso)
+        if not _es_unico_en_su_grupo(curso, grupo_confirmado_id):
+            crear_grupo_nuevo(curso)
+        liberar_grupo_provisional(curso, grupo_provisional_id)
+        registro.guardar('SIN_MODELO', grupo=curso.grupo_equivalencia)
         return False
 
     posibles_grupos = GrupoEquivalencia.objects.filter(
@@ -261,56 +468,246 @@ def procesar_y_agrupar_curso(curso):
 
     mejor_grupo = None
     mejor_score_hibrido = 0.0
+    run = registro.run
 
-    vec_nuevo = np.array(curso.embedding_vector).reshape(1, -1)
+    vec_nuevo = np.array(analisis.embedding_vector).reshape(1, -1)
 
     logger.info(f"Analizando curso: {curso.nombre} contra {posibles_grupos.count()} grupos.")
 
     for grupo in posibles_grupos:
-        centroide = calcular_centroide_grupo(grupo)
-        if centroide is None: continue
-
-        vec_grupo = centroide.reshape(1, -1)
-        score_ia = cosine_similarity(vec_nuevo, vec_grupo)[0][0]
-
-        max_jaccard = 0.0
-        cursos_grupo = grupo.instancias_curso.exclude(id=curso.id).only('contenido_cache')
-
-        for c_existente in cursos_grupo:
-            tokens_existente = limpiar_texto_para_tokens(c_existente.contenido_cache)
-            j = calcular_jaccard(tokens_curso_nuevo, tokens_existente)
-            if j > max_jaccard:
-                max_jaccard = j
-
-        es_compatible = False
-        if score_ia > 0.82 and max_jaccard > 0.35:
-            es_compatible = True
-        elif score_ia > 0.92 and max_jaccard > 0.20:
-            es_compatible = True
-
-        if es_compatible:
-            score_final = (score_ia * 0.70) + (max_jaccard * 0.30)
-            if score_final > mejor_score_hibrido:
+        with registro.etapa('candidatos'):
+            # Solo la ubicación provisional se deja fuera: un grupo confirmado incluye al curso, como siempre
+            centroide = calcular_centroide_grupo(grupo, excluir_id=curso.id if curso.agrupacion_provisional else None)
+            if centroide is None: continue
+            tokens_grupo = list(
+                CursoAnalisis.objects
+                .filter(curso__grupo_equivalencia=grupo)
+                .exclude(curso_id=curso.id)
+                .values_list('curso_id', 'tokens')
+            )
+            tokens_grupo = [
+                (curso_id, tokens if tokens is not None else obtener_tokens_curso(curso_id))
+                for curso_id, tokens in tokens_grupo
+            ]
+        run.grupos_candidatos += 1
+        run.cursos_comparados += len(tokens_grupo)
+
+        with registro.etapa('scoring'):
+            vec_grupo = centroide.reshape(1, -1)
+            score_ia = cosine_similarity(vec_nuevo, vec_grupo)[0][0]
+
+            max_jaccard = 0.0
+            for _, tokens_existente in tokens_grupo:
+                j = calcular_jaccard(tokens_curso_nuevo, set(tokens_existente))
+                if j > max_jaccard:
+                    max_jaccard = j
+
+            score_final = puntuar_hibrido(score_ia, max_jaccard)
+            if score_final is not None and score_final > mejor_score_hibrido:
                 mejor_score_hibrido = score_final
                 mejor_grupo = grupo
+                run.score_ia, run.max_jaccard, run.score_hibrido = float(score_ia), max_jaccard, float(score_final)
 
-    if mejor_grupo and mejor_score_hibrido > 0.65:
+    if mejor_grupo and mejor_score_hibrido > UMBRAL_MATCH:
         logger.info(f"MATCH: Asignado a '{mejor_grupo.nombre}' (Score: {mejor_score_hibrido:.2f})")
         curso.grupo_equivalencia = mejor_grupo
-        mejor_grupo.escuelas.add(curso.escuela)
+        curso.agrupacion_provisional = False
+        mejor_grupo.escuelas.add(curso.escuela_id)
         curso.save()
+        liberar_grupo_provisional(curso, grupo_provisional_id)
+        registro.guardar('MATCH', grupo=mejor_grupo)
         return True
+    elif _es_unico_en_su_grupo(curso, grupo_confirmado_id):
+        logger.info(f"SIN MATCH SUFICIENTE. El curso sigue solo en su grupo {grupo_confirmado_id}.")
+        registro.guardar('GRUPO_NUEVO', grupo=curso.grupo_equivalencia)
+        return False
     else:
         logger.info(f"SIN MATCH SUFICIENTE. Creando nuevo grupo.")
         crear_grupo_nuevo(curso)
+        liberar_grupo_provisional(curso, grupo_provisional_id)
+        registro.guardar('GRUPO_NUEVO', grupo=curso.grupo_equivalencia)
         return False
 
 
+def _es_unico_en_su_grupo(curso, grupo_id):
+    """
+    Re-análisis (reintento de la tarea, reanalizar_cursos) de un curso que está solo en su grupo: ese grupo ya
+    es el "grupo nuevo" que se crearía, así que se conserva en vez de dejarlo vacío y crear otro.
+    """
+    return bool(grupo_id) and not Curso.objects.filter(grupo_equivalencia_id=grupo_id).exclude(id=curso.id).exists()
+
+
 def crear_grupo_nuevo(curso):
     g = GrupoEquivalencia.objects.create(
         nombre=curso.nombre,
         descripcion=f"Grupo base generado por {curso.codigo_curso or 'sistema'}"
     )
-    g.escuelas.add(curso.escuela)
+    g.escuelas.add(curso.escuela_id)
     curso.grupo_equivalencia = g
+    curso.agrupacion_provisional = False
     curso.save()
+
+
+UMBRAL_PROVISIONAL = 90
+
+
+def normalizar_nombre_curso(nombre):
+    sin_tildes = unicodedata.normalize('NFD', nombre.lower())
+    sin_tildes = ''.join(c for c in sin_tildes if unicodedata.category(c) != 'Mn')
+    return re.sub(r'[^a-z0-9ñ\s]', ' ', sin_tildes).strip()
+
+
+def asignar_grupo_provisional(curso):
+    """
+    Tier rápido mientras corre el análisis completo: compara el nombre del curso contra los nombres de los grupos
+    con sus mismos créditos (RapidFuzz) y lo adjunta tentativamente. procesar_y_agrupar_curso confirma o lo mueve.
+    """
+    if curso.grupo_equivalencia_id:
+        return None
+
+    nombres = {
+        grupo_id: normalizar_nombre_curso(nombre)
+        for grupo_id, nombre in
+        GrupoEquivalencia.objects.filter(instancias_curso__creditos=curso.creditos).distinct().values_list('id', 'nombre')
+    }
+    if not nombres:
+        return None
+
+    mejor = process.extractOne(
+        normalizar_nombre_curso(curso.nombre), nombres,
+        scorer=fuzz.token_sort_ratio, score_cutoff=UMBRAL_PROVISIONAL
+    )
+    if not mejor:
+        return None
+
+    _, score, grupo_id = mejor
+    # Solo se deshace una membresía que esta agrupación creó, nunca una que ya existía (admin, otro curso)
+    _, agregada = GrupoEquivalencia.escuelas.through.objects.get_or_create(
+        grupoequivalencia_id=grupo_id, escuela_id=curso.escuela_id
+    )
+    curso.grupo_equivalencia_id = grupo_id
+    curso.agrupacion_provisional = True
+    curso.escuela_agregada_provisional = agregada
+    curso.save(update_fields=['grupo_equivalencia', 'agrupacion_provisional', 'escuela_agregada_provisional',
+                              'updated_at'])
+
+    logger.info(f"Agrupación provisional de '{curso.nombre}' en grupo {grupo_id} (similitud nombre {score:.0f}).")
+    return grupo_id
+
+
+def liberar_grupo_provisional(curso, grupo_provisional_id):
+    """
+    Si el análisis completo movió el curso y la agrupación provisional había sumado su escuela al grupo, la escuela
+    deja de verlo, salvo que tenga otros cursos allí.
+    """
+    agregada = curso.escuela_agregada_provisional
+    if agregada:
+        curso.escuela_agregada_provisional = False
+        Curso.objects.filter(id=curso.id).update(escuela_agregada_provisional=False)
+    if not grupo_provisional_id or grupo_provisional_id == curso.grupo_equivalencia_id:
+        return
+
+    if agregada and not Curso.objects.filter(grupo_equivalencia_id=grupo_provisional_id,
+                                             escuela_id=curso.escuela_id).exists():
+        GrupoEquivalencia.escuelas.through.objects.filter(
+            grupoequivalencia_id=grupo_provisional_id, escuela_id=curso.escuela_id
+        ).delete()
+    logger.info(f"Curso '{curso.nombre}' movido de su grupo provisional {grupo_provisional_id}.")
+
+
+def agrupar_cursos_en_lote(cursos):
+    """
+    Agrupa de una vez muchos cursos nuevos (ingesta masiva) con las mismas reglas que procesar_y_agrupar_curso.
+
+    Cada grupo se representa por la suma de sus embeddings (mismo coseno que el centroide), así cada curso se
+    compara contra todos los grupos candidatos con un solo producto matriz-vector. Los grupos creados dentro del
+    lote entran a la matriz y pueden recibir a los cursos siguientes.
+    """
+    analisis = {
+        a.curso_id: a for a in
+        CursoAnalisis.objects.filter(curso__in=cursos).only('curso_id', 'tokens', 'embedding_vector')
+    }
+    por_creditos = defaultdict(list)
+    for curso in cursos:
+        por_creditos[curso.creditos].append(curso)
+
+    Through = GrupoEquivalencia.escuelas.through
+    fundadores = []  # cursos que crean grupo nuevo
+    asignaciones = []  # (curso, grupo_id o índice en fundadores)
+    agrupados = 0
+
+    for creditos, lote in por_creditos.items():
+        claves, sumas, tokens_grupos = [], [], []
+
+        existentes = (
+            CursoAnalisis.objects
+            .filter(
+                curso__grupo_equivalencia__in=GrupoEquivalencia.objects.filter(instancias_curso__creditos=creditos),
+                embedding_vector__isnull=False
+            )
+            .exclude(curso__in=lote)
+            .values_list('curso__grupo_equivalencia_id', 'embedding_vector', 'tokens')
+        )
+        indice = {}
+        for grupo_id, vector, tokens in existentes:
+            if not vector: continue
+            if grupo_id not in indice:
+                indice[grupo_id] = len(claves)
+                claves.append(grupo_id)
+                sumas.append(np.zeros(len(vector), dtype=np.float32))
+                tokens_grupos.append([])
+            g = indice[grupo_id]
+            sumas[g] += np.asarray(vector, dtype=np.float32)
+            tokens_grupos[g].append(set(tokens or []))
+
+        for curso in lote:
+            a = analisis.get(curso.id)
+            vector = np.asarray(a.embedding_vector if a and a.embedding_vector else [], dtype=np.float32)
+            tokens_nuevo = set(a.tokens or []) if a else set()
+
+            mejor, mejor_score = None, 0.0
+            if vector.size and sumas:
+                matriz = np.vstack(sumas)
+                normas = np.linalg.norm(matriz, axis=1) * np.linalg.norm(vector)
+                normas[normas == 0] = 1
+                scores_ia = (matriz @ vector) / normas
+
+                for g in np.nonzero(scores_ia > 0.82)[0]:
+                    max_jaccard = max((calcular_jaccard(tokens_nuevo, t) for t in tokens_grupos[g]), default=0.0)
+                    score = puntuar_hibrido(float(scores_ia[g]), max_jaccard)
+                    if score is not None and score > mejor_score:
+                        mejor, mejor_score = g, score
+
+            if mejor is not None and mejor_score > UMBRAL_MATCH:
+                sumas[mejor] += vector
+                tokens_grupos[mejor].append(tokens_nuevo)
+                asignaciones.append((curso, claves[mejor]))
+                agrupados += 1
+            else:
+                fundadores.append(curso)
+                clave = ('nuevo', len(fundadores) - 1)
+                asignaciones.append((curso, clave))
+                if vector.size:
+                    claves.append(clave)
+                    sumas.append(vector.copy())
+                    tokens_grupos.append([tokens_nuevo])
+
+    grupos_nuevos = GrupoEquivalencia.objects.bulk_create([
+        GrupoEquivalencia(nombre=c.nombre, descripcion=f"Grupo base generado por {c.codigo_curso or 'sistema'}")
+        for c in fundadores
+    ])
+
+    relaciones = set()
+    for curso, clave in asignaciones:
+        grupo_id = grupos_nuevos[clave[1]].id if isinstance(clave, tuple) else clave
+        curso.grupo_equivalencia_id = grupo_id
+        relaciones.add((grupo_id, curso.escuela_id))
+
+    Curso.objects.bulk_update([c for c, _ in asignaciones], ['grupo_equivalencia'], batch_size=500)
+    Through.objects.bulk_create(
+        [Through(grupoequivalencia_id=g, escuela_id=e) for g, e in relaciones],
+        ignore_conflicts=True
+    )
+
+    logger.info(f"Agrupación en lote: {agrupados} cursos a grupos existentes, {len(grupos_nuevos)} grupos nuevos.")
+    return agrupados, len(grupos_nuevos)
@@ -2,7 +2,8 @@ from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.core.mail import send_mail
 from django.conf import settings
-from .models import Inscripcion
+from .eventos import publicar_progreso_al_confirmar
+from .models import Curso, Inscripcion
 
 
 @receiver(post_save, sender=Inscripcion)
@@ -39,3 +40,23 @@ def notificar_nueva_inscripcion(sender, instance, created, **kwargs):
                 emails_inscritos,
                 fail_silently=True
             )
+
+
+@receiver(post_save, sender=Inscripcion)
+@receiver(post_delete, sender=Inscripcion)
+def publicar_progreso_inscripcion(sender, instance, created=True, **kwargs):
+    if created:
+        publicar_progreso_al_confirmar(instance.curso_id)
+
+
+@receiver(post_save, sender=Curso)
+def publicar_progreso_curso(sender, instance, created, update_fields=None, **kwargs):
+    # Solo cambios de estado o de meta: el análisis y la agrupación guardan el curso varias veces sin tocarlos.
+    # Los cursos nuevos aún no están en el muro de nadie más
+    if update_fields is not None and not set(update_fields) & set(Curso.CAMPOS_PROGRESO):
+        return
+    valores = instance.valores_progreso()
+    anteriores = getattr(instance, 'progreso_guardado', None)
+    instance.progreso_guardado = valores
+    if not created and valores != anteriores:
+        publicar_progreso_al_confirmar(instance.id)
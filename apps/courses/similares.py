@@ -0,0 +1,154 @@
+import logging
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Curso, CursoAnalisis, CursoSimilar
+from .services import calcular_jaccard
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 5
+# Jaccard solo se calcula para los más cercanos por coseno; el resto no puede entrar al top-k
+CANDIDATOS_JACCARD = 50
+LOTE_COMPACTACION = 500
+
+
+def puntuar_similitud(score_ia, jaccard):
+    # Mismo peso que puntuar_hibrido, pero sin umbral de compatibilidad: aquí solo se ordena
+    return (score_ia * 0.70) + (jaccard * 0.30)
+
+
+def _vecinos(curso_id, creditos, vector, tokens):
+    """
+    Los CANDIDATOS_JACCARD cursos con los mismos créditos más cercanos por coseno, con su score híbrido.
+    """
+    filas = list(
+        CursoAnalisis.objects
+        .filter(curso__creditos=creditos, embedding_vector__isnull=False)
+        .exclude(curso_id=curso_id)
+        .values_list('curso_id', 'embedding_vector')
+    )
+    if not filas:
+        return []
+
+    ids = [curso_id for curso_id, _ in filas]
+    matriz = np.asarray([v for _, v in filas], dtype=np.float32)
+    matriz /= np.maximum(np.linalg.norm(matriz, axis=1, keepdims=True), 1e-9)
+    vector = np.asarray(vector, dtype=np.float32)
+    vector /= max(np.linalg.norm(vector), 1e-9)
+
+    cosenos = matriz @ vector
+    cercanos = np.argsort(-cosenos)[:CANDIDATOS_JACCARD]
+    ids_cercanos = [ids[i] for i in cercanos]
+    tokens_cercanos = dict(CursoAnalisis.objects.filter(curso_id__in=ids_cercanos).values_list('curso_id', 'tokens'))
+
+    tokens = set(tokens or ())
+    vecinos = []
+    for i in cercanos:
+        jaccard = calcular_jaccard(tokens, set(tokens_cercanos.get(ids[i]) or ()))
+        score_ia = float(cosenos[i])
+        vecinos.append((ids[i], puntuar_similitud(score_ia, jaccard), score_ia, jaccard))
+    return vecinos
+
+
+def actualizar_similares(curso):
+    """
+    Inserta el curso en el grafo sin reconstruirlo: calcula su lista top-k y lo agrega a las listas de los
+    vecinos donde entra (scores simétricos), recortándolas a TOP_K. Si el curso ya estaba en el grafo
+    (re-análisis) se retira primero de todas las listas; las que quedan cortas las completa la compactación.
+    """
+    analisis = CursoAnalisis.objects.filter(curso_id=curso.id).values_list('embedding_vector', 'tokens').first()
+    if not analisis or not analisis[0]:
+        return 0
+
+    vector, tokens = analisis
+    vecinos = sorted(_vecinos(curso.id, curso.creditos, vector, tokens), key=lambda v: -v[1])
+
+    nuevas = [
+        CursoSimilar(curso_id=curso.id, similar_id=vid, score=score, score_ia=ia, jaccard=j)
+        for vid, score, ia, j in vecinos[:TOP_K]
+    ]
+
+    # Listas actuales de los candidatos, en una sola query
+    listas = defaultdict(list)
+    for cid, sid, score in (
+        CursoSimilar.objects
+        .filter(curso_id__in=[v[0] for v in vecinos])
+        .exclude(similar_id=curso.id)
+        .values_list('curso_id', 'similar_id', 'score')
+    ):
+        listas[cid].append((score, sid))
+
+    desplazados = []
+    for vid, score, ia, j in vecinos:
+        lista = listas[vid]
+        if len(lista) >= TOP_K and score <= min(lista)[0]:
+            continue
+        nuevas.append(CursoSimilar(curso_id=vid, similar_id=curso.id, score=score, score_ia=ia, jaccard=j))
+        if len(lista) >= TOP_K:
+            desplazados.append((vid, min(lista)[1]))
+
+    with transaction.atomic():
+        CursoSimilar.objects.filter(curso_id=curso.id).delete()
+        CursoSimilar.objects.filter(similar_id=curso.id).delete()
+        for cid, sid in desplazados:
+            CursoSimilar.objects.filter(curso_id=cid, similar_id=sid).delete()
+        CursoSimilar.objects.bulk_create(nuevas)
+
+    logger.info(f"Grafo de similares: '{curso.nombre}' con {min(len(vecinos), TOP_K)} vecinos, "
+                f"entra en {len(nuevas) - min(len(vecinos), TOP_K)} listas.")
+    return len(nuevas)
+
+
+def recalcular_lista(curso):
+    """
+    Recalcula solo la lista propia del curso (compactación), sin propagar a los vecinos.
+    """
+    analisis = CursoAnalisis.objects.filter(curso_id=curso.id).values_list('embedding_vector', 'tokens').first()
+    if not analisis or not analisis[0]:
+        return 0
+
+    vecinos = sorted(_vecinos(curso.id, curso.creditos, *analisis), key=lambda v: -v[1])[:TOP_K]
+    with transaction.atomic():
+        CursoSimilar.objects.filter(curso_id=curso.id).delete()
+        CursoSimilar.objects.bulk_create([
+            CursoSimilar(curso_id=curso.id, similar_id=vid, score=score, score_ia=ia, jaccard=j)
+            for vid, score, ia, j in vecinos
+        ])
+    return len(vecinos)
+
+
+def compactar_similares(lote=LOTE_COMPACTACION):
+    """
+    Mantenimiento periódico. Los borrados de cursos se llevan sus aristas por CASCADE y dejan listas cortas;
+    un cambio de créditos deja aristas inválidas. Se eliminan las inválidas y se recalculan hasta `lote` listas cortas.
+    """
+    invalidas, _ = CursoSimilar.objects.exclude(similar__creditos=F('curso__creditos')).delete()
+
+    # Una lista es corta si tiene menos vecinos de los que sus créditos permiten (no solo menos que TOP_K)
+    analizados = (
+        Curso.objects.filter(analisis__embedding_vector__isnull=False)
+        .values_list('creditos').annotate(total=Count('id'))
+    )
+    cortas = []
+    for creditos, total in analizados:
+        if len(cortas) >= lote:
+            break
+        cortas.extend(
+            Curso.objects
+            .filter(creditos=creditos, analisis__embedding_vector__isnull=False)
+            .annotate(n_similares=Count('similares'))
+            .filter(n_similares__lt=min(TOP_K, total - 1))
+            .only('id', 'nombre', 'creditos')[:lote - len(cortas)]
+        )
+    recalculadas = 0
+    for curso in cortas:
+        antes = curso.n_similares
+        if recalcular_lista(curso) != antes:
+            recalculadas += 1
+
+    logger.info(f"Compactación de similares: {invalidas} aristas inválidas, {recalculadas}/{len(cortas)} listas completadas.")
+    return invalidas, recalculadas
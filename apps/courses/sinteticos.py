@@ -0,0 +1,173 @@
+"""
+Sílabos sintéticos con el formato UNSA para benchmarks y pruebas de carga.
+
+Cada sílabo pertenece a una disciplina: los de la misma disciplina comparten vocabulario en el
+CONTENIDO TEMÁTICO (como los cursos equivalentes reales) y los de disciplinas distintas casi no.
+"""
+import random
+import zlib
+
+from faker import Faker
+
+DISCIPLINAS = {
+    'calculo': ['límites', 'derivadas', 'integrales', 'series', 'sucesiones', 'continuidad', 'teorema del valor medio',
+                'regla de la cadena', 'integración por partes', 'coordenadas polares', 'funciones de varias variables',
+                'derivadas parciales', 'integrales dobles', 'optimización', 'multiplicadores de lagrange'],
+    'programacion': ['algoritmos', 'variables', 'estructuras de control', 'funciones', 'recursividad', 'arreglos',
+                     'punteros', 'clases', 'objetos', 'herencia', 'polimorfismo', 'excepciones', 'archivos',
+                     'pruebas unitarias', 'complejidad algorítmica'],
+    'fisica': ['cinemática', 'dinámica', 'leyes de newton', 'trabajo', 'energía', 'momento lineal', 'rotación',
+               'gravitación', 'oscilaciones', 'ondas', 'termodinámica', 'electrostática', 'campo eléctrico',
+               'corriente eléctrica', 'magnetismo'],
+    'estadistica': ['estadística descriptiva', 'probabilidad', 'variables aleatorias', 'distribución normal',
+                    'distribución binomial', 'muestreo', 'estimación', 'intervalos de confianza',
+                    'prueba de hipótesis', 'regresión lineal', 'correlación', 'análisis de varianza', 'chi cuadrado',
+                    'series de tiempo', 'inferencia'],
+    'base_datos': ['modelo entidad relación', 'modelo relacional', 'normalización', 'álgebra relacional', 'sql',
+                   'consultas', 'índices', 'transacciones', 'concurrencia', 'recuperación', 'procedimientos almacenados',
+                   'disparadores', 'vistas', 'bases de datos distribuidas', 'nosql'],
+    'economia': ['oferta', 'demanda', 'elasticidad', 'teoría del consumidor', 'costos de producción', 'mercados',
+                 'competencia perfecta', 'monopolio', 'oligopolio', 'producto bruto interno', 'inflación',
+                 'política monetaria', 'política fiscal', 'comercio internacional', 'tipo de cambio'],
+    'quimica': ['estructura atómica', 'tabla periódica', 'enlace químico', 'estequiometría', 'gases', 'soluciones',
+                'equilibrio químico', 'ácidos y bases', 'cinética química', 'termoquímica', 'electroquímica',
+                'química orgánica', 'hidrocarburos', 'grupos funcionales', 'polímeros'],
+}
+
+NOMBRES = {
+    'calculo': ['Cálculo Diferencial', 'Cálculo Integral', 'Cálculo en Varias Variables', 'Matemática I'],
+    'programacion': ['Fundamentos de Programación', 'Programación Orientada a Objetos', 'Algoritmos y Programación'],
+    'fisica': ['Física General', 'Física I', 'Mecánica y Ondas', 'Física Básica'],
+    'estadistica': ['Estadística Aplicada', 'Probabilidad y Estadística', 'Estadística General'],
+    'base_datos': ['Base de Datos I', 'Sistemas de Bases de Datos', 'Diseño de Bases de Datos'],
+    'economia': ['Economía General', 'Microeconomía', 'Introducción a la Economía'],
+    'quimica': ['Química General', 'Química I', 'Fundamentos de Química'],
+}
+
+UNIDADES = ('PRIMERA', 'SEGUNDA', 'TERCERA')
+
+
+def generar_silabo(fake, disciplina=None, creditos=None):
+    """
+    Devuelve {'nombre', 'disciplina', 'creditos', 'lineas'} con las secciones que valida validar_es_silabo_unsa
+    y un CONTENIDO TEMÁTICO delimitado como lo espera extraer_solo_contenido_tematico.
+    """
+    disciplina = disciplina or random.choice(list(DISCIPLINAS))
+    creditos = creditos or random.randint(2, 5)
+    nombre = random.choice(NOMBRES[disciplina])
+    temas = DISCIPLINAS[disciplina]
+
+    lineas = [
+        'UNIVERSIDAD NACIONAL DE SAN AGUSTÍN DE AREQUIPA',
+        f'ESCUELA PROFESIONAL DE {fake.job().upper()[:60]}',
+        f'SÍLABO {fake.year()} - SEMESTRE {random.choice(("A", "B"))}',
+        '1. INFORMACIÓN ACADÉMICA',
+        f'Asignatura: {nombre}',
+        f'Código: {random.randint(1000000, 9999999)}',
+        f'Créditos: {creditos}',
+        f'Prerrequisitos: {fake.word().capitalize()}',
+        f'Docente: {fake.name()}',
+        '2. FUNDAMENTACIÓN',
+        fake.paragraph(nb_sentences=4),
+        '3. COMPETENCIAS',
+        fake.paragraph(nb_sentences=3),
+        '4. CONTENIDO TEMÁTICO',
+    ]
+
+    semana = 1
+    for unidad in UNIDADES:
+        lineas.append(f'{unidad} UNIDAD: {random.choice(temas).upper()}')
+        for _ in range(5):
+            tema = random.choice(temas)
+            relacionado = random.choice(temas)
+            lineas.append(f'Semana {semana}: {tema.capitalize()} y {relacionado}. {fake.sentence(nb_words=8)}')
+            semana += 1
+
+    lineas += [
+        '5. ESTRATEGIAS DE ENSEÑANZA APRENDIZAJE',
+        fake.paragraph(nb_sentences=3),
+        '6. PROGRAMACIÓN DE ACTIVIDADES DE INVESTIG. FORMATIVA Y RESPONSABILIDAD SOCIAL',
+        fake.paragraph(nb_sentences=2),
+        '7. CRONOGRAMA ACADÉMICO',
+        fake.paragraph(nb_sentences=2),
+        '8. ESTRATEGIAS DE EVALUACIÓN',
+        fake.paragraph(nb_sentences=2),
+        '9. BIBLIOGRAFÍA',
+    ] + [f'{fake.name()}. {fake.catch_phrase()}. {fake.year()}.' for _ in range(4)]
+
+    return {'nombre': nombre, 'disciplina': disciplina, 'creditos': creditos, 'lineas': lineas}
+
+
+def contenido_tematico(silabo):
+    """
+    El texto que extraer_solo_contenido_tematico devolvería, sin pasar por un PDF.
+    """
+    lineas = silabo['lineas']
+    inicio = lineas.index('4. CONTENIDO TEMÁTICO') + 1
+    fin = lineas.index('5. ESTRATEGIAS DE ENSEÑANZA APRENDIZAJE')
+    return '\n'.join(lineas[inicio:fin])
+
+
+def _escapar(texto):
+    datos = texto.encode('cp1252', errors='replace')
+    return datos.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def _partir(linea, ancho=95):
+    palabras, actual = linea.split(), ''
+    for palabra in palabras:
+        if actual and len(actual) + len(palabra) + 1 > ancho:
+            yield actual
+            actual = palabra
+        else:
+            actual = f'{actual} {palabra}'.strip()
+    if actual:
+        yield actual
+
+
+def escribir_pdf(lineas, ruta, lineas_por_pagina=52):
+    """
+    PDF mínimo (Helvetica, WinAnsi) sin dependencias extra; pypdf lo lee igual que un sílabo exportado.
+    """
+    renglones = [r for linea in lineas for r in _partir(linea)]
+    paginas = [renglones[i:i + lineas_por_pagina] for i in range(0, len(renglones), lineas_por_pagina)] or [[]]
+
+    objetos = []  # contenido de cada objeto; el número es su índice + 1
+    objetos.append(b'<< /Type /Catalog /Pages 2 0 R >>')
+    objetos.append(None)  # /Pages, se completa al final
+    objetos.append(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+
+    hijos = []
+    for pagina in paginas:
+        flujo = b'BT /F1 10 Tf 14 TL 50 800 Td ' + b' '.join(b'(' + _escapar(r) + b') Tj T*' for r in pagina) + b' ET'
+        comprimido = zlib.compress(flujo)
+        objetos.append(b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(comprimido) + comprimido + b'\nendstream')
+        contenido_id = len(objetos)
+        objetos.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+            b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % contenido_id
+        )
+        hijos.append(len(objetos))
+
+    objetos[1] = b'<< /Type /Pages /Kids [' + b' '.join(b'%d 0 R' % h for h in hijos) + b'] /Count %d >>' % len(hijos)
+
+    salida = bytearray(b'%PDF-1.4\n')
+    posiciones = []
+    for numero, contenido in enumerate(objetos, start=1):
+        posiciones.append(len(salida))
+        salida += b'%d 0 obj\n' % numero + contenido + b'\nendobj\n'
+
+    xref = len(salida)
+    salida += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objetos) + 1)
+    salida += b''.join(b'%010d 00000 n \n' % p for p in posiciones)
+    salida += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objetos) + 1, xref)
+
+    with open(ruta, 'wb') as f:
+        f.write(salida)
+    return ruta
+
+
+def nuevo_faker(semilla=0):
+    random.seed(semilla)
+    Faker.seed(semilla)
+    return Faker('es_ES')
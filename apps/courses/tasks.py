@@ -1,20 +1,31 @@
+import logging
+
 from celery import shared_task
 from django.core.exceptions import ObjectDoesNotExist
-from .models import Curso
-from .services import procesar_y_agrupar_curso
+from .admision import NORMAL, evaluar_admision
+from .busqueda import indexar_curso
+from .models import Curso, CursoAnalisis
+from .services import procesar_y_agrupar_curso, estado_modelos
+from .similares import actualizar_similares, compactar_similares
+
+logger = logging.getLogger(__name__)
 
 
 @shared_task(bind=True, max_retries=2)
-def task_analizar_curso_ia(self, curso_id):
+def task_analizar_curso_ia(self, curso_id, recalcular_embedding=False):
     """
     Tarea asíncrona para recuperar el curso y ejecuta lógica de IA.
+    recalcular_embedding reemplaza el embedding guardado (reanalizar_cursos --recalcular-embedding).
     """
     try:
-        print(f"[CELERY] Iniciando análisis para curso ID: {curso_id}")
         curso = Curso.objects.get(id=curso_id)
 
         # Ejecutamos lógica core
-        match_encontrado = procesar_y_agrupar_curso(curso)
+        match_encontrado = procesar_y_agrupar_curso(curso, recalcular_embedding=recalcular_embedding)
+
+        # Con los tokens ya calculados, el contenido del sílabo entra al índice de búsqueda
+        indexar_curso(curso)
+        actualizar_similares(curso)
 
         if match_encontrado:
             return f"Curso {curso.nombre} AGRUPADO en {curso.grupo_equivalencia.nombre}"
@@ -24,6 +35,41 @@ def task_analizar_curso_ia(self, curso_id):
     except ObjectDoesNotExist:
         return f"Error: El curso {curso_id} no existe."
     except Exception as e:
-        print(f"[CELERY ERROR] {e}")
-
+        logger.warning(f"Análisis del curso {curso_id} falló, reintentando: {e}")
         raise self.retry(exc=e, countdown=10 * (self.request.retries + 1))
+
+
+@shared_task
+def task_estado_modelos():
+    """
+    Reporta qué modelos tiene cargados el worker que la ejecuta (readiness del contenedor celery).
+    """
+    return estado_modelos()
+
+
+@shared_task
+def task_compactar_similares():
+    """
+    Mantenimiento periódico del grafo de cursos similares (celery beat).
+    """
+    invalidas, recalculadas = compactar_similares()
+    return f"{invalidas} aristas inválidas eliminadas, {recalculadas} listas recalculadas"
+
+
+@shared_task
+def task_encolar_diferidos(lote=20):
+    """
+    Encola los análisis diferidos por admisión mientras la cola esté en nivel normal (celery beat).
+    """
+    if evaluar_admision().decision != NORMAL:
+        return "Cola aún cargada, nada encolado"
+
+    ids = list(
+        CursoAnalisis.objects.filter(analisis_diferido=True)
+        .order_by('created_at')
+        .values_list('curso_id', flat=True)[:lote]
+    )
+    CursoAnalisis.objects.filter(curso_id__in=ids).update(analisis_diferido=False)
+    for curso_id in ids:
+        task_analizar_curso_ia.delay(curso_id)
+    return f"{len(ids)} análisis diferidos encolados"
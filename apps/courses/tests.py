@@ -1,3 +1,288 @@
-from django.test import TestCase
+import os
+import shutil
+import io
+import json
+import tempfile
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from apps.users.models import Area, Facultad, Escuela, User
+
+from .admision import DEMORADO, DIFERIDO, NORMAL, RECHAZADO, decidir
+from .blobcache import CacheBlobsLocal
+from .management.commands.ingest_silabos import Command as IngestSilabos
+from .models import AnalisisRun, Curso, CursoAnalisis, CursoSimilar, GrupoEquivalencia
+from .services import (
+    asignar_grupo_provisional, calcular_hash_contenido, liberar_grupo_provisional, procesar_y_agrupar_curso,
+)
+from .similares import TOP_K, actualizar_similares, compactar_similares
+
+
+class CacheBlobsLocalTests(SimpleTestCase):
+
+    def setUp(self):
+        self.origen_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.origen_dir)
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.origen = FileSystemStorage(location=self.origen_dir)
+
+    def crear_cache(self, max_bytes=10 * 1024):
+        return CacheBlobsLocal(self.cache_dir, max_bytes, storage=self.origen)
+
+    def test_segunda_lectura_no_va_al_origen(self):
+        self.origen.save('syllabus/a.pdf', ContentFile(b'%PDF-a'))
+        cache = self.crear_cache()
+
+        with cache.abrir('syllabus/a.pdf') as f:
+            self.assertEqual(f.read(), b'%PDF-a')
+        with cache.abrir('syllabus/a.pdf') as f:
+            self.assertEqual(f.read(), b'%PDF-a')
+
+        self.assertEqual((cache.fallos, cache.aciertos), (1, 1))
+
+    def test_cambio_en_origen_invalida(self):
+        self.origen.save('syllabus/a.pdf', ContentFile(b'%PDF-a'))
+        cache = self.crear_cache()
+        cache.abrir('syllabus/a.pdf').close()
+
+        ruta = self.origen.path('syllabus/a.pdf')
+        with open(ruta, 'wb') as f:
+            f.write(b'%PDF-nuevo')
+        os.utime(ruta, (0, 0))
+
+        with cache.abrir('syllabus/a.pdf') as f:
+            self.assertEqual(f.read(), b'%PDF-nuevo')
+        self.assertEqual(cache.fallos, 2)
+
+    def test_desalojo_lru_por_bytes(self):
+        cache = self.crear_cache(max_bytes=2500)
+        for nombre in ('a', 'b', 'c'):
+            self.origen.save(f'syllabus/{nombre}.pdf', ContentFile(b'x' * 1000))
+
+        cache.abrir('syllabus/a.pdf').close()
+        cache.abrir('syllabus/b.pdf').close()
+        ruta_a = cache.ruta_local('syllabus/a.pdf', cache._etag('syllabus/a.pdf'))
+        ruta_b = cache.ruta_local('syllabus/b.pdf', cache._etag('syllabus/b.pdf'))
+        os.utime(ruta_a, (1, 1))
+        os.utime(ruta_b, (2, 2))
+
+        # "a" es el menos usado recientemente y debe salir al entrar "c"
+        cache.abrir('syllabus/c.pdf').close()
+
+        self.assertFalse(os.path.exists(ruta_a))
+        self.assertTrue(os.path.exists(ruta_b))
+
+
+class AgrupacionProvisionalTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        area = Area.objects.create(nombre='Ingenierías')
+        facultad = Facultad.objects.create(nombre='Producción y Servicios', area=area)
+        cls.sistemas = Escuela.objects.create(nombre='Ingeniería de Sistemas', facultad=facultad)
+        cls.industrial = Escuela.objects.create(nombre='Ingeniería Industrial', facultad=facultad)
+        cls.creador = User.objects.create_user(email='delegado@unsa.edu.pe', password='x')
+
+        cls.grupo = GrupoEquivalencia.objects.create(nombre='Cálculo Diferencial')
+        cls.grupo.escuelas.add(cls.sistemas)
+        cls.crear_curso('Cálculo Diferencial', cls.sistemas, grupo=cls.grupo)
+
+    @classmethod
+    def crear_curso(cls, nombre, escuela, creditos=4, grupo=None):
+        return Curso.objects.create(
+            nombre=nombre, creditos=creditos, escuela=escuela, creador=cls.creador,
+            syllabus='syllabus/prueba.pdf', grupo_equivalencia=grupo
+        )
+
+    def test_nombre_similar_queda_provisional(self):
+        curso = self.crear_curso('CALCULO  diferencial', self.industrial)
+
+        self.assertEqual(asignar_grupo_provisional(curso), self.grupo.id)
+        curso.refresh_from_db()
+        self.assertTrue(curso.agrupacion_provisional)
+        self.assertIn(self.industrial, self.grupo.escuelas.all())
+
+    def test_otros_creditos_o_nombre_distinto_no_agrupan(self):
+        self.assertIsNone(asignar_grupo_provisional(self.crear_curso('Cálculo Diferencial', self.industrial, creditos=3)))
+        self.assertIsNone(asignar_grupo_provisional(self.crear_curso('Física General', self.industrial)))
+
+    def test_mover_curso_libera_escuela_del_grupo_provisional(self):
+        curso = self.crear_curso('Calculo Diferencial', self.industrial)
+        asignar_grupo_provisional(curso)
+
+        otro = GrupoEquivalencia.objects.create(nombre='Cálculo Aplicado')
+        curso.grupo_equivalencia = otro
+        curso.agrupacion_provisional = False
+        curso.save()
+        liberar_grupo_provisional(curso, self.grupo.id)
+
+        self.assertNotIn(self.industrial, self.grupo.escuelas.all())
+        self.assertIn(self.sistemas, self.grupo.escuelas.all())
+        curso.refresh_from_db()
+        self.assertFalse(curso.escuela_agregada_provisional)
+
+    def test_mover_curso_respeta_membresia_previa(self):
+        # La escuela ya veía el grupo (asignada en el admin): la agrupación provisional no la agregó
+        self.grupo.escuelas.add(self.industrial)
+        curso = self.crear_curso('Calculo Diferencial', self.industrial)
+        asignar_grupo_provisional(curso)
+        self.assertFalse(curso.escuela_agregada_provisional)
+
+        curso.grupo_equivalencia = GrupoEquivalencia.objects.create(nombre='Cálculo Aplicado')
+        curso.agrupacion_provisional = False
+        curso.save()
+        liberar_grupo_provisional(curso, self.grupo.id)
+
+        self.assertIn(self.industrial, self.grupo.escuelas.all())
+
+    def test_reanalizar_curso_unico_conserva_su_grupo(self):
+        grupo = GrupoEquivalencia.objects.create(nombre='Termodinámica')
+        grupo.escuelas.add(self.industrial)
+        curso = self.crear_curso('Termodinámica', self.industrial, creditos=5, grupo=grupo)
+        CursoAnalisis.objects.create(curso=curso, contenido_cache='primera ley entropía ciclos de carnot',
+                                     embedding_vector=[0.6, 0.8])
+        grupos = GrupoEquivalencia.objects.count()
+
+        # Reintento de la tarea o reanalizar_cursos: el curso ya está solo en su grupo
+        procesar_y_agrupar_curso(curso)
+        procesar_y_agrupar_curso(Curso.objects.get(id=curso.id))
+
+        curso.refresh_from_db()
+        self.assertEqual(curso.grupo_equivalencia_id, grupo.id)
+        self.assertEqual(GrupoEquivalencia.objects.count(), grupos)
+
+    def test_silabo_ilegible_deja_registro_de_ejecucion(self):
+        curso = self.crear_curso('Cálculo Diferencial', self.industrial)
+
+        self.assertFalse(procesar_y_agrupar_curso(curso))
+
+        run = AnalisisRun.objects.get(curso=curso)
+        self.assertEqual(run.resultado, 'PDF_INVALIDO')
+        self.assertTrue(run.error)
+        self.assertGreater(run.segundos_total, 0)
+        self.assertEqual(run.grupos_candidatos, 0)
+
+
+class GrafoSimilaresTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        area = Area.objects.create(nombre='Ingenierías')
+        facultad = Facultad.objects.create(nombre='Producción y Servicios', area=area)
+        cls.escuela = Escuela.objects.create(nombre='Ingeniería de Sistemas', facultad=facultad)
+        cls.creador = User.objects.create_user(email='delegado@unsa.edu.pe', password='x')
+
+    def crear_curso(self, n, angulo, creditos=4):
+        curso = Curso.objects.create(
+            nombre=f'Curso {n}', creditos=creditos, escuela=self.escuela, creador=self.creador,
+            syllabus='syllabus/prueba.pdf'
+        )
+        vector = [0.0] * 384
+        vector[0], vector[1] = 1.0, angulo
+        CursoAnalisis.objects.create(curso=curso, embedding_vector=vector, tokens=['algebra', f'tema{n}'])
+        actualizar_similares(curso)
+        return curso
+
+    def vecinos(self, curso):
+        return list(CursoSimilar.objects.filter(curso=curso).order_by('-score').values_list('similar_id', flat=True))
+
+    def test_insercion_incremental_mantiene_top_k(self):
+        cursos = [self.crear_curso(n, n * 0.1) for n in range(TOP_K + 3)]
+
+        for curso in cursos:
+            self.assertLessEqual(len(self.vecinos(curso)), TOP_K)
+        # El primero tiene como vecino más cercano al segundo aunque este llegó después
+        self.assertEqual(self.vecinos(cursos[0])[0], cursos[1].id)
+        self.assertEqual(self.vecinos(cursos[-1])[0], cursos[-2].id)
+
+    def test_otros_creditos_no_son_vecinos(self):
+        a = self.crear_curso(1, 0.0)
+        b = self.crear_curso(2, 0.0, creditos=3)
+        self.assertEqual(self.vecinos(a), [])
+        self.assertEqual(self.vecinos(b), [])
+
+    def test_compactacion_completa_listas_tras_borrado(self):
+        cursos = [self.crear_curso(n, n * 0.1) for n in range(TOP_K + 2)]
+        cursos[1].delete()
+        self.assertEqual(len(self.vecinos(cursos[0])), TOP_K - 1)
+
+        compactar_similares()
+
+        self.assertEqual(len(self.vecinos(cursos[0])), TOP_K)
+        self.assertNotIn(cursos[1].id, self.vecinos(cursos[0]))
+
+
+@override_settings(ADMISION_ESPERA_AVISO=120, ADMISION_ESPERA_DIFERIR=1800, ADMISION_COLA_MAXIMA=1000)
+class AdmisionTests(SimpleTestCase):
+
+    def test_decision_segun_espera_estimada(self):
+        self.assertEqual(decidir(0, 20, 2).decision, NORMAL)
+        self.assertEqual(decidir(30, 20, 2).decision, DEMORADO)
+        self.assertEqual(decidir(400, 20, 2).decision, DIFERIDO)
+        self.assertEqual(decidir(1000, 1, 2).decision, RECHAZADO)
+
+    def test_espera_honesta(self):
+        admision = decidir(29, 20, 2)
+        self.assertEqual(admision.espera_segundos, 300)
+        self.assertEqual(admision.espera_minutos, 5)
+
+
+class MigrarAnalisisLegadoTests(TestCase):
+    def test_importa_sin_pisar_analisis_nuevos(self):
+        area = Area.objects.create(nombre='Ingenierías')
+        facultad = Facultad.objects.create(nombre='Producción y Servicios', area=area)
+        escuela = Escuela.objects.create(nombre='Ingeniería de Sistemas', facultad=facultad)
+        creador = User.objects.create_user(email='delegado@unsa.edu.pe', password='x')
+        antiguo, analizado = [
+            Curso.objects.create(nombre=n, creditos=4, escuela=escuela, creador=creador, syllabus='syllabus/prueba.pdf')
+            for n in ('Cálculo', 'Física')
+        ]
+        CursoAnalisis.objects.create(curso=analizado, contenido_cache='nuevo', embedding_vector=[0.5])
+
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False, encoding='utf-8') as f:
+            for curso in (antiguo, analizado):
+                f.write(json.dumps({'curso_id': str(curso.id), 'contenido_cache': 'viejo', 'embedding_vector': [0.1]}) + '\n')
+        self.addCleanup(os.remove, f.name)
+
+        call_command('migrar_analisis_legado', importar=f.name, stdout=io.StringIO())
+
+        self.assertEqual(antiguo.analisis.contenido_cache, 'viejo')
+        self.assertEqual(antiguo.analisis.embedding_vector, [0.1])
+        self.assertTrue(antiguo.analisis.contenido_hash)
+        analizado.analisis.refresh_from_db()
+        self.assertEqual(analizado.analisis.contenido_cache, 'nuevo')
+
+
+class IngestaSilabosTests(TestCase):
+    def test_reanudar_no_duplica_cursos_ya_insertados(self):
+        area = Area.objects.create(nombre='Ingenierías')
+        facultad = Facultad.objects.create(nombre='Producción y Servicios', area=area)
+        escuela = Escuela.objects.create(nombre='Ingeniería de Sistemas', facultad=facultad)
+        creador = User.objects.create_user(email='delegado@unsa.edu.pe', password='x')
+        curso = Curso.objects.create(nombre='Cálculo', creditos=4, escuela=escuela, creador=creador,
+                                     syllabus='syllabus/prueba.pdf')
+        CursoAnalisis.objects.create(curso=curso, contenido_cache='límites y derivadas',
+                                     contenido_hash=calcular_hash_contenido('límites y derivadas'))
+
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        comando = IngestSilabos(stdout=io.StringIO())
+        comando.escuela, comando.creador, comando.directorio = escuela, creador, directorio
+        comando.ruta_manifest = os.path.join(directorio, '.ingesta_manifest.json')
+        comando.manifest = {}
+        comando.log = io.StringIO()
+
+        # El corte anterior insertó el curso pero no llegó a escribir el manifest; la copia repite el contenido
+        resultados = [
+            {'ruta': os.path.join(directorio, nombre), 'creditos': 4, 'contenido': 'límites y derivadas', 'tokens': []}
+            for nombre in ('calculo.pdf', 'calculo-copia.pdf')
+        ]
+        comando._guardar_lote(resultados, modelo=None)
+
+        self.assertEqual(Curso.objects.count(), 1)
+        self.assertEqual(comando.manifest['calculo.pdf'], {'estado': 'creado', 'curso_id': str(curso.id)})
+        self.assertEqual(comando.manifest['calculo-copia.pdf']['estado'], 'creado')
@@ -0,0 +1,66 @@
+"""
+GET condicional (ETag / Last-Modified) para las vistas de lectura más visitadas.
+
+La vista calcula primero un validador barato (una query agregada sobre lo que muestra) y, si el navegador
+ya tiene esa versión, responde 304 sin correr las queries principales ni renderizar. Además de los datos,
+el ETag mezcla lo que cambia la página para cada usuario: su id, nombre y escuela (barra de navegación),
+la cookie CSRF (los formularios llevan el token), la versión de la taxonomía y la del despliegue (plantillas).
+Los navegadores envían If-None-Match junto a If-Modified-Since y el ETag tiene precedencia; Last-Modified
+solo no detecta borrados.
+"""
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from apps.users.taxonomia import get_taxonomia
+
+
+@dataclass(frozen=True)
+class Validador:
+    etag: str
+    ultima_modificacion: datetime | None
+
+
+def _estado_request(request):
+    user = request.user
+    partes = [
+        settings.VERSION_DESPLIEGUE, user.id, user.email, user.first_name, user.escuela_id,
+        request.META.get('CSRF_COOKIE', ''), get_taxonomia().version,
+    ]
+    # len() no marca los mensajes como leídos: siguen ahí para el render completo
+    return partes, len(get_messages(request)) > 0
+
+
+async def validar(request, datos, fechas):
+    """
+    Devuelve (validador, respuesta 304 o None). `datos` resume el contenido de la página y `fechas`
+    son los updated_at que lo componen (pueden ser None si no hay filas).
+    """
+    partes, hay_mensajes = await sync_to_async(_estado_request)(request)
+    etag = '"%s"' % hashlib.md5('|'.join(map(str, partes + list(datos))).encode(), usedforsecurity=False).hexdigest()
+    fechas = [f for f in fechas if f is not None]
+    validador = Validador(etag=etag, ultima_modificacion=max(fechas) if fechas else None)
+
+    # Un mensaje pendiente cambia la página y tiene que consumirse con el render
+    if hay_mensajes:
+        return validador, None
+
+    ultima = int(validador.ultima_modificacion.timestamp()) if validador.ultima_modificacion else None
+    respuesta = get_conditional_response(request, etag=validador.etag, last_modified=ultima)
+    return validador, (con_validador(respuesta, validador) if respuesta is not None else None)
+
+
+def con_validador(response, validador):
+    if response.status_code in (200, 304):
+        response.headers['ETag'] = validador.etag
+        if validador.ultima_modificacion:
+            response.headers['Last-Modified'] = http_date(validador.ultima_modificacion.timestamp())
+        # El navegador guarda la página pero revalida siempre; ningún proxy la comparte entre usuarios
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,214 @@
+import json
+import random
+import secrets
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from apps.courses.models import Curso
+from apps.users.models import User
+
+# Mezcla de tráfico de una "hora punta" de inscripciones: casi todo es leer el muro y los detalles
+MEZCLA_DEFAULT = 'dashboard=45,course_detail=30,join_course=20,search=5'
+BUSQUEDAS = ('calculo', 'programacion', 'fisica', 'estadistica', 'base de datos', 'economia', 'quimica')
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+class Command(BaseCommand):
+    help = ("Prueba de carga contra un servidor local con la mezcla de tráfico de una hora punta de inscripciones. "
+            "Reporta p50/p95/p99 y tasa de error por vista. Usar con datos de seed_scale. Con --comparar corre "
+            "la misma carga contra un segundo servidor (p. ej. WSGI vs ASGI) para varias concurrencias.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--comparar', help="URL de un segundo servidor con la misma BD (p. ej. el modo ASGI)")
+        parser.add_argument('--concurrencia', default='32',
+                            help="Usuarios virtuales simultáneos; varios separados por comas para un barrido")
+        parser.add_argument('--duracion', type=int, default=60, help="Segundos de carga")
+        parser.add_argument('--sesiones', type=int, default=500, help="Alumnos distintos con sesión propia")
+        parser.add_argument('--mezcla', default=MEZCLA_DEFAULT, help="vista=peso separados por comas")
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--json', dest='salida_json')
+
+    def handle(self, *args, **options):
+        self.timeout = options['timeout']
+        mezcla = {}
+        for par in options['mezcla'].split(','):
+            vista, _, peso = par.partition('=')
+            if vista not in ('dashboard', 'course_detail', 'join_course', 'search'):
+                raise CommandError(f"Vista desconocida en la mezcla: {vista}")
+            mezcla[vista] = float(peso)
+        concurrencias = [int(c) for c in options['concurrencia'].split(',') if c.strip()]
+        urls = [options['url'].rstrip('/')] + ([options['comparar'].rstrip('/')] if options['comparar'] else [])
+
+        self.actores = self._preparar_sesiones(options['sesiones'])
+        self.vistas, self.pesos = list(mezcla), list(mezcla.values())
+
+        corridas = []
+        for concurrencia in concurrencias:
+            for url in urls:
+                corridas.append(self._correr(url, concurrencia, options['duracion']))
+
+        if len(corridas) > 1:
+            self._comparar(corridas)
+
+        salida_json = options['salida_json']
+        if salida_json:
+            with open(salida_json, 'w', encoding='utf-8') as f:
+                json.dump({'corridas': corridas}, f, indent=2)
+            self.stdout.write(f"Resultados en {salida_json}")
+
+    def _correr(self, url, concurrencia, duracion):
+        self.base = url
+        self.muestras = defaultdict(list)
+        self.errores = defaultdict(int)
+        self.lock = threading.Lock()
+
+        self.stdout.write(
+            f"\n{len(self.actores)} sesiones, {concurrencia} usuarios virtuales, {duracion}s contra {self.base}"
+        )
+        fin = time.monotonic() + duracion
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+            for _ in range(concurrencia):
+                pool.submit(self._usuario_virtual, fin)
+        total = time.perf_counter() - inicio
+
+        return self._reportar(total, concurrencia)
+
+    def _preparar_sesiones(self, n):
+        """
+        El login real es Google OAuth: se crean sesiones directamente en el SessionStore para alumnos sembrados.
+        """
+        alumnos = list(
+            User.objects.filter(escuela__isnull=False, codigo_alumno__isnull=False, celular__isnull=False)
+            .order_by('?')[:n]
+        )
+        if not alumnos:
+            raise CommandError("No hay alumnos con perfil completo. Corre primero seed_scale.")
+
+        escuelas = {a.escuela_id for a in alumnos}
+        visibles = defaultdict(list)
+        # Como el muro: cursos de la escuela + cursos de grupos que incluyen a la escuela
+        propios = Curso.objects.filter(escuela_id__in=escuelas).values_list('id', 'escuela_id')
+        equivalentes = (
+            Curso.objects.filter(grupo_equivalencia__escuelas__in=escuelas)
+            .values_list('id', 'grupo_equivalencia__escuelas')
+        )
+        for curso_id, escuela_id in list(propios[:50000]) + list(equivalentes[:50000]):
+            if escuela_id in escuelas:
+                visibles[escuela_id].append(curso_id)
+
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        actores = []
+        for alumno in alumnos:
+            sesion = store()
+            sesion[SESSION_KEY] = str(alumno.pk)
+            sesion[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+            sesion[HASH_SESSION_KEY] = alumno.get_session_auth_hash()
+            sesion.create()
+            actores.append({
+                'sessionid': sesion.session_key,
+                'csrf': secrets.token_hex(16),  # 32 caracteres: Django acepta el secreto sin enmascarar
+                'cursos': visibles.get(alumno.escuela_id) or [],
+            })
+        return actores
+
+    def _cabeceras(self, actor):
+        host = urlparse(self.base).netloc
+        return {
+            # Las cookies son Secure: se envían a mano porque el servidor local habla HTTP
+            'Cookie': f"{settings.SESSION_COOKIE_NAME}={actor['sessionid']}; {settings.CSRF_COOKIE_NAME}={actor['csrf']}",
+            'X-Forwarded-Proto': 'https',
+            'X-CSRFToken': actor['csrf'],
+            'Origin': f'https://{host}',
+            'Referer': f'https://{host}/',
+        }
+
+    def _usuario_virtual(self, fin):
+        http = requests.Session()
+        while time.monotonic() < fin:
+            actor = random.choice(self.actores)
+            vista = random.choices(self.vistas, weights=self.pesos)[0]
+            metodo, ruta = self._peticion(vista, actor)
+            if ruta is None:
+                continue
+
+            inicio = time.perf_counter()
+            try:
+                respuesta = http.request(metodo, self.base + ruta, headers=self._cabeceras(actor),
+                                         allow_redirects=False, timeout=self.timeout)
+                error = respuesta.status_code >= 400
+            except requests.RequestException:
+                error = True
+            duracion = (time.perf_counter() - inicio) * 1000
+
+            with self.lock:
+                self.muestras[vista].append(duracion)
+                if error:
+                    self.errores[vista] += 1
+
+    def _peticion(self, vista, actor):
+        if vista == 'dashboard':
+            return 'GET', reverse('frontend:dashboard')
+        if vista == 'search':
+            return 'GET', reverse('frontend:search') + f"?q={random.choice(BUSQUEDAS)}"
+        if not actor['cursos']:
+            return None, None
+        curso_id = random.choice(actor['cursos'])
+        if vista == 'course_detail':
+            return 'GET', reverse('frontend:course_detail', args=[curso_id])
+        return 'POST', reverse('frontend:join_course', args=[curso_id])
+
+    def _reportar(self, total, concurrencia):
+        filas = []
+        self.stdout.write(f"{'vista':<16}{'n':>8}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'error %':>9}")
+        for vista in self.vistas:
+            tiempos = self.muestras[vista]
+            fila = {
+                'vista': vista,
+                'n': len(tiempos),
+                'rps': len(tiempos) / total if total else 0.0,
+                'p50_ms': _percentil(tiempos, 50),
+                'p95_ms': _percentil(tiempos, 95),
+                'p99_ms': _percentil(tiempos, 99),
+                'error_pct': 100 * self.errores[vista] / len(tiempos) if tiempos else 0.0,
+            }
+            filas.append(fila)
+            self.stdout.write(
+                f"{vista:<16}{fila['n']:>8}{fila['rps']:>8.1f}{fila['p50_ms']:>9.1f}{fila['p95_ms']:>9.1f}"
+                f"{fila['p99_ms']:>9.1f}{fila['error_pct']:>9.2f}"
+            )
+
+        todos = [t for tiempos in self.muestras.values() for t in tiempos]
+        return {
+            'url': self.base,
+            'concurrencia': concurrencia,
+            'segundos': total,
+            'rps': len(todos) / total if total else 0.0,
+            'p95_ms': _percentil(todos, 95),
+            'error_pct': 100 * sum(self.errores.values()) / len(todos) if todos else 0.0,
+            'vistas': filas,
+        }
+
+    def _comparar(self, corridas):
+        self.stdout.write(f"\n{'url':<32}{'usuarios':>10}{'rps':>10}{'p95 ms':>10}{'error %':>10}")
+        for c in corridas:
+            self.stdout.write(
+                f"{c['url']:<32}{c['concurrencia']:>10}{c['rps']:>10.1f}{c['p95_ms']:>10.1f}{c['error_pct']:>10.2f}"
+            )
@@ -0,0 +1,80 @@
+import logging
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+def query_budget(maximo):
+    """
+    Declara el número máximo de queries SQL que una vista puede ejecutar por request.
+    """
+    def decorator(view_func):
+        view_func.query_budget = maximo
+        return view_func
+
+    return decorator
+
+
+class RegistroQueries:
+    def __init__(self):
+        self.total = 0
+        self.tiempo = 0.0
+        self.por_sql = Counter()
+        self.por_sql_params = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tiempo += time.perf_counter() - inicio
+            self.total += 1
+            self.por_sql[sql] += 1
+            self.por_sql_params[(sql, repr(params))] += 1
+
+    @property
+    def duplicadas(self):
+        return sum(n - 1 for n in self.por_sql_params.values() if n > 1)
+
+    def peores(self, n=3):
+        return [(sql, veces) for sql, veces in self.por_sql.most_common(n) if veces > 1]
+
+
+class QueryBudgetMiddleware:
+    """
+    Solo para desarrollo/staging: cuenta queries, tiempo de BD y duplicados por request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.budget_default = getattr(settings, 'QUERY_BUDGET_DEFAULT', 30)
+
+    def __call__(self, request):
+        registro = RegistroQueries()
+        request.query_budget = self.budget_default
+
+        with connection.execute_wrapper(registro):
+            response = self.get_response(request)
+
+        tiempo_ms = registro.tiempo * 1000
+        response['X-DB-Query-Count'] = str(registro.total)
+        response['X-DB-Time-Ms'] = f"{tiempo_ms:.1f}"
+        response['X-DB-Duplicates'] = str(registro.duplicadas)
+        response['X-DB-Query-Budget'] = str(request.query_budget)
+
+        if registro.total > request.query_budget or registro.duplicadas:
+            logger.warning(
+                f"[QUERIES] {request.method} {request.path}: {registro.total} queries "
+                f"(budget {request.query_budget}), {tiempo_ms:.1f} ms, {registro.duplicadas} duplicadas"
+            )
+            for sql, veces in registro.peores():
+                logger.warning(f"[QUERIES]   x{veces}: {sql[:300]}")
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, 'query_budget', self.budget_default)
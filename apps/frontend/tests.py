@@ -1,3 +1,576 @@
-from django.test import TestCase
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from urllib.parse import urlparse
 
-# Create your tests here.
+import numpy as np
+from allauth.socialaccount.models import SocialApp
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse, resolve
+
+from apps.courses.busqueda import buscar_cursos, indexar_curso
+from apps.courses.eventos import Difusor, canal_escuela
+from apps.courses.models import Curso, CursoAnalisis, GrupoEquivalencia, Inscripcion
+from apps.courses.semantica import IndiceSemantico
+from apps.users.models import Area, Facultad, Escuela, User
+from apps.users.taxonomia import get_taxonomia, nombre_escuela, olvidar_taxonomia
+from verunsa import metricas, perfilado
+
+COLUMNAS_PESADAS = ('contenido_cache', 'embedding_vector', 'tokens', 'contenido_hash')
+
+
+def crear_escuela(nombre='Ingeniería de Sistemas'):
+    area, _ = Area.objects.get_or_create(nombre='Ingenierías')
+    facultad, _ = Facultad.objects.get_or_create(nombre='Producción y Servicios', area=area)
+    escuela = Escuela.objects.create(nombre=nombre, facultad=facultad)
+    # La invalidación real corre en on_commit, que TestCase nunca dispara; y los ids se reutilizan entre tests
+    olvidar_taxonomia()
+    return escuela
+
+
+def crear_alumno(escuela, n):
+    return User.objects.create_user(
+        email=f'alumno{n}@unsa.edu.pe',
+        password='x',
+        first_name=f'Alumno{n}',
+        last_name='Apellido',
+        escuela=escuela,
+        codigo_alumno=f'{n:08d}',
+        celular=f'9{n:08d}',
+    )
+
+
+def crear_curso(escuela, creador, nombre, contenido=''):
+    curso = Curso.objects.create(
+        nombre=nombre,
+        creditos=4,
+        escuela=escuela,
+        creador=creador,
+        syllabus='syllabus/prueba.pdf',
+    )
+    CursoAnalisis.objects.create(
+        curso=curso,
+        contenido_cache=contenido,
+        tokens=contenido.split()[:500],
+        embedding_vector=[0.1] * 384,
+    )
+    Inscripcion.objects.create(usuario=creador, curso=curso)
+    return curso
+
+
+def bytes_leidos(queries):
+    """
+    Re-ejecuta los SELECT capturados y suma el tamaño de los valores devueltos.
+    """
+    total = 0
+    with connection.cursor() as cursor:
+        for q in queries:
+            if not q['sql'].lstrip().upper().startswith('SELECT'):
+                continue
+            cursor.execute(q['sql'])
+            for fila in cursor.fetchall():
+                total += sum(len(str(v)) for v in fila if v is not None)
+    return total
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class AdminInscritosTests(TestCase):
+    def test_paginas_de_inscritos_conservan_filtros_del_listado(self):
+        escuela = crear_escuela()
+        curso = crear_curso(escuela, crear_alumno(escuela, 1), 'Cálculo')
+        for n in range(2, 53):
+            Inscripcion.objects.create(usuario=crear_alumno(escuela, n), curso=curso)
+        self.client.force_login(User.objects.create_superuser(email='admin@unsa.edu.pe', password='x'))
+
+        url = reverse('admin:courses_curso_change', args=[curso.id])
+        response = self.client.get(url, {'_changelist_filters': 'estado=PROPUESTO', 'p_inscritos': 1})
+        self.assertContains(response, 'href="?_changelist_filters=estado%3DPROPUESTO&amp;p_inscritos=2"')
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ColumnasPesadasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.escuela = crear_escuela()
+        cls.alumno = crear_alumno(cls.escuela, 1)
+        cls.contenido = 'derivadas integrales series ' * 8000
+        cls.curso = crear_curso(cls.escuela, cls.alumno, 'Cálculo', cls.contenido)
+
+    def setUp(self):
+        self.client.force_login(self.alumno)
+
+    def assertSinColumnasPesadas(self, queries):
+        for q in queries:
+            for columna in COLUMNAS_PESADAS:
+                self.assertNotIn(columna, q['sql'])
+
+    def test_dashboard_no_selecciona_analisis(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('frontend:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertSinColumnasPesadas(ctx.captured_queries)
+
+    def test_detalle_no_selecciona_analisis(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('frontend:course_detail', args=[self.curso.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertSinColumnasPesadas(ctx.captured_queries)
+
+    def test_changelist_admin_no_selecciona_analisis(self):
+        admin = User.objects.create_superuser(email='admin@unsa.edu.pe', password='x')
+        self.client.force_login(admin)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('admin:courses_curso_changelist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertSinColumnasPesadas(ctx.captured_queries)
+
+    def test_bytes_por_render_del_dashboard(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('frontend:dashboard'))
+        leidos = bytes_leidos(ctx.captured_queries)
+        # El contenido del sílabo (~220 KB) no debe viajar con el listado
+        self.assertLess(leidos, len(self.contenido) // 10)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class QueryBudgetTests(TestCase):
+    """
+    Cada vista declara su budget con @query_budget. El número de queries debe respetarlo y no crecer con los datos.
+    """
+    TAMANOS = (1, 5, 25)
+    _semilla = 0
+
+    @classmethod
+    def setUpTestData(cls):
+        # landing.html y base.html llaman a {% provider_login_url 'google' %}, que necesita la app configurada
+        app = SocialApp.objects.create(provider='google', name='Google', client_id='prueba', secret='prueba')
+        app.sites.add(Site.objects.get_current())
+
+    def sembrar(self, n):
+        QueryBudgetTests._semilla += 1
+        base = self._semilla * 1000
+        escuela = crear_escuela(f'Escuela {base}')
+        otra_escuela = crear_escuela(f'Otra Escuela {base}')
+        delegado = crear_alumno(escuela, base)
+        cursos = [crear_curso(escuela, delegado, f'Curso {base}-{i}') for i in range(n)]
+        curso = cursos[0]
+        for i in range(1, n + 1):
+            alumno = crear_alumno(otra_escuela if i % 2 else escuela, base + i)
+            Inscripcion.objects.create(usuario=alumno, curso=curso)
+        return delegado, curso
+
+    def contar(self, usuario, url, method='get'):
+        self.client.force_login(usuario)
+        with CaptureQueriesContext(connection) as ctx:
+            getattr(self.client, method)(url)
+        return len(ctx.captured_queries), resolve(urlparse(url).path).func.query_budget
+
+    def assertBudget(self, preparar):
+        conteos = []
+        for n in self.TAMANOS:
+            usuario, url, method = preparar(*self.sembrar(n))
+            total, budget = self.contar(usuario, url, method)
+            self.assertLessEqual(total, budget, f"{url} con {n} cursos: {total} queries (budget {budget})")
+            conteos.append(total)
+        self.assertEqual(len(set(conteos)), 1, f"Las queries crecen con los datos: {conteos}")
+
+    def test_landing(self):
+        self.assertBudget(lambda delegado, curso: (delegado, reverse('frontend:landing'), 'get'))
+
+    def test_onboarding(self):
+        def preparar(delegado, curso):
+            nuevo = User.objects.create_user(email=f'nuevo{curso.id}@unsa.edu.pe', password='x')
+            return nuevo, reverse('frontend:onboarding'), 'get'
+
+        self.assertBudget(preparar)
+
+    def test_dashboard(self):
+        self.assertBudget(lambda delegado, curso: (delegado, reverse('frontend:dashboard'), 'get'))
+
+    def test_create_course_get(self):
+        self.assertBudget(lambda delegado, curso: (delegado, reverse('frontend:create_course'), 'get'))
+
+    def test_course_detail(self):
+        self.assertBudget(lambda delegado, curso: (delegado, reverse('frontend:course_detail', args=[curso.id]), 'get'))
+
+    def test_join_course(self):
+        def preparar(delegado, curso):
+            nuevo = crear_alumno(curso.escuela, self._semilla * 1000 + 999)
+            return nuevo, reverse('frontend:join_course', args=[curso.id]), 'post'
+
+        self.assertBudget(preparar)
+
+    def test_leave_course(self):
+        def preparar(delegado, curso):
+            alumno = curso.inscripciones.exclude(usuario=delegado).first().usuario
+            return alumno, reverse('frontend:leave_course', args=[curso.id]), 'post'
+
+        self.assertBudget(preparar)
+
+    def test_nominate_delegado(self):
+        self.assertBudget(lambda delegado, curso: (delegado, reverse('frontend:nominate_delegado', args=[curso.id]), 'get'))
+
+    def test_respond_nomination(self):
+        def preparar(delegado, curso):
+            sucesor = curso.inscripciones.exclude(usuario=delegado).first().usuario
+            curso.delegado_pendiente = sucesor
+            curso.save()
+            return sucesor, reverse('frontend:respond_nomination', args=[curso.id, 'rechazar']), 'get'
+
+        self.assertBudget(preparar)
+
+    def test_upload_y_delete_document(self):
+        def preparar_upload(delegado, curso):
+            insc = curso.inscripciones.get(usuario=delegado)
+            return delegado, reverse('frontend:upload_doc', args=[insc.id]), 'post'
+
+        def preparar_delete(delegado, curso):
+            insc = curso.inscripciones.get(usuario=delegado)
+            return delegado, reverse('frontend:delete_doc', args=[insc.id]), 'post'
+
+        self.assertBudget(preparar_upload)
+        self.assertBudget(preparar_delete)
+
+    def test_export_roster(self):
+        self.assertBudget(lambda delegado, curso: (delegado, reverse('frontend:export_roster', args=[curso.id, 'csv']), 'get'))
+
+    def test_search(self):
+        def preparar(delegado, curso):
+            for c in Curso.objects.filter(escuela=curso.escuela):
+                indexar_curso(c)
+            cache.clear()
+            return delegado, reverse('frontend:search') + '?q=curso', 'get'
+
+        self.assertBudget(preparar)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ExportRosterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.escuela = crear_escuela()
+        cls.delegado = crear_alumno(cls.escuela, 1)
+        cls.curso = crear_curso(cls.escuela, cls.delegado, 'Cálculo')
+        cls.curso.estado = 'META_ALCANZADA'
+        cls.curso.save()
+        for n in range(2, 12):
+            Inscripcion.objects.create(usuario=crear_alumno(cls.escuela, n), curso=cls.curso)
+
+    def test_csv_en_streaming(self):
+        self.client.force_login(self.delegado)
+        response = self.client.get(reverse('frontend:export_roster', args=[self.curso.id, 'csv']))
+        self.assertTrue(response.streaming)
+        lineas = b''.join(response.streaming_content).decode('utf-8-sig').strip().splitlines()
+        self.assertEqual(len(lineas), 1 + 11)
+        self.assertIn('alumno5@unsa.edu.pe', ''.join(lineas))
+
+    def test_csv_no_exporta_formulas(self):
+        User.objects.filter(pk=self.delegado.pk).update(first_name='=HYPERLINK("http://x.test","ver")')
+        self.client.force_login(self.delegado)
+        response = self.client.get(reverse('frontend:export_roster', args=[self.curso.id, 'csv']))
+        contenido = b''.join(response.streaming_content).decode('utf-8-sig')
+        self.assertIn('"\'=HYPERLINK(', contenido)
+
+    def test_xlsx_en_streaming(self):
+        self.client.force_login(self.delegado)
+        response = self.client.get(reverse('frontend:export_roster', args=[self.curso.id, 'xlsx']))
+        self.assertTrue(response.streaming)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'PK'))
+
+    async def test_csv_en_streaming_bajo_asgi(self):
+        # Un iterador sync bajo ASGI se consumiría entero con sync_to_async(list) antes de enviar nada
+        await self.async_client.aforce_login(self.delegado)
+        response = await self.async_client.get(reverse('frontend:export_roster', args=[self.curso.id, 'csv']))
+        self.assertTrue(response.is_async)
+        contenido = b''.join([parte async for parte in response.streaming_content])
+        self.assertEqual(len(contenido.decode('utf-8-sig').strip().splitlines()), 1 + 11)
+
+    def test_solo_con_meta_alcanzada(self):
+        Curso.objects.filter(pk=self.curso.pk).update(estado='PROPUESTO')
+        self.client.force_login(self.delegado)
+        response = self.client.get(reverse('frontend:export_roster', args=[self.curso.id, 'csv']))
+        self.assertRedirects(response, reverse('frontend:course_detail', args=[self.curso.id]))
+
+    def test_grupo_enmascara_inscritos_de_otros_cursos(self):
+        grupo = GrupoEquivalencia.objects.create(nombre='Cálculo')
+        otra_escuela = crear_escuela('Ingeniería Industrial')
+        ajeno = crear_alumno(otra_escuela, 50)
+        otro_curso = crear_curso(otra_escuela, ajeno, 'Cálculo I')
+        Curso.objects.filter(pk__in=[self.curso.pk, otro_curso.pk]).update(grupo_equivalencia=grupo)
+
+        self.client.force_login(self.delegado)
+        response = self.client.get(reverse('frontend:export_roster', args=[self.curso.id, 'csv']) + '?alcance=grupo')
+        contenido = b''.join(response.streaming_content).decode('utf-8-sig')
+
+        self.assertIn('alumno5@unsa.edu.pe', contenido)
+        self.assertIn('Alumno50,A****,,****0050,,', contenido)
+        self.assertNotIn('alumno50@unsa.edu.pe', contenido)
+        self.assertNotIn('900000050', contenido)
+
+    def test_solo_delegado(self):
+        alumno = self.curso.inscripciones.exclude(usuario=self.delegado).first().usuario
+        self.client.force_login(alumno)
+        response = self.client.get(reverse('frontend:export_roster', args=[self.curso.id, 'csv']))
+        self.assertRedirects(response, reverse('frontend:course_detail', args=[self.curso.id]))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class BusquedaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.escuela = crear_escuela()
+        cls.otra_escuela = crear_escuela('Ingeniería Industrial')
+        cls.alumno = crear_alumno(cls.escuela, 1)
+        cls.ajeno = crear_alumno(cls.otra_escuela, 2)
+
+        cls.calculo = crear_curso(cls.escuela, cls.alumno, 'Cálculo Integral', 'integral derivada serie limite')
+        cls.fisica = crear_curso(cls.escuela, cls.alumno, 'Física', 'fuerza energia integral trabajo')
+        cls.oculto = crear_curso(cls.otra_escuela, cls.ajeno, 'Cálculo Integral', 'integral derivada')
+        cls.fisica.codigo_curso = 'FIS-101'
+        cls.fisica.save()
+
+        for curso in (cls.calculo, cls.fisica, cls.oculto):
+            indexar_curso(curso)
+
+    def setUp(self):
+        cache.clear()
+
+    def ids(self, consulta):
+        return [curso_id for curso_id, _ in buscar_cursos(self.alumno, consulta)]
+
+    def test_nombre_pesa_mas_que_contenido(self):
+        self.assertEqual(self.ids('calculo integral'), [self.calculo.id, self.fisica.id])
+
+    def test_busqueda_por_codigo(self):
+        self.assertEqual(self.ids('fis101'), [self.fisica.id])
+
+    def test_cursos_de_grupo_equivalente_son_visibles(self):
+        grupo = GrupoEquivalencia.objects.create(nombre='Cálculo Integral')
+        grupo.escuelas.add(self.escuela, self.otra_escuela)
+        self.oculto.grupo_equivalencia = grupo
+        self.oculto.save()
+
+        self.assertIn(self.oculto.id, self.ids('derivada'))
+
+    def test_vista_no_muestra_cursos_de_otras_escuelas(self):
+        self.client.force_login(self.alumno)
+        response = self.client.get(reverse('frontend:search'), {'q': 'derivada'})
+        self.assertEqual([c.id for c in response.context['cursos']], [self.calculo.id])
+
+    @override_settings(BUSQUEDA_SEMANTICA_WEB=False)
+    def test_modo_semantico_desactivado_busca_por_palabras(self):
+        self.client.force_login(self.alumno)
+        response = self.client.get(reverse('frontend:search'), {'q': 'derivada', 'modo': 'semantico'})
+        self.assertFalse(response.context['semantico'])
+        self.assertEqual([c.id for c in response.context['cursos']], [self.calculo.id])
+
+    def test_indice_semantico_respeta_visibilidad(self):
+        base = [0.0] * 384
+        for curso, eje in ((self.calculo, 0), (self.fisica, 1), (self.oculto, 0)):
+            vector = list(base)
+            vector[eje] = 1.0
+            CursoAnalisis.objects.filter(curso=curso).update(embedding_vector=vector)
+
+        indice = IndiceSemantico(firma=None, entrenar_ivf=False)
+        consulta = np.zeros(384, dtype=np.float32)
+        consulta[0] = 1.0
+
+        resultados = indice.buscar(consulta, self.escuela.id, [], limite=10)
+        self.assertEqual([curso_id for curso_id, _ in resultados], [self.calculo.id])
+
+
+class MetricasTests(TestCase):
+    @override_settings(METRICAS_TOKEN='secreto')
+    def test_endpoint_exige_token(self):
+        # Una IP privada sin token no basta: detrás del proxy del host todo llega desde el gateway de Docker
+        response = self.client.get('/internal/metrics/', REMOTE_ADDR='172.17.0.1')
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get('/internal/metrics/', HTTP_AUTHORIZATION='Bearer otro')
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get('/internal/metrics/', HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertIn(response.status_code, (200, 503))  # 503 si no hay Redis
+
+    def test_sin_token_configurado_no_se_expone(self):
+        response = self.client.get('/internal/metrics/', HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(response.status_code, 404)
+
+    def test_histograma_acumula_buckets(self):
+        histograma = metricas.Histograma('prueba_segundos', "Prueba", buckets=(0.1, 1))
+        metricas._REGISTRO.remove(histograma)
+        datos = {'vista="a"|0.1': 2.0, 'vista="a"|+Inf': 1.0, 'vista="a"|sum': 5.1, 'vista="a"|count': 3.0}
+
+        self.assertEqual(histograma.lineas(datos), [
+            'verunsa_prueba_segundos_bucket{vista="a",le="0.1"} 2',
+            'verunsa_prueba_segundos_bucket{vista="a",le="1"} 2',
+            'verunsa_prueba_segundos_bucket{vista="a",le="+Inf"} 3',
+            'verunsa_prueba_segundos_sum{vista="a"} 5.1',
+            'verunsa_prueba_segundos_count{vista="a"} 3',
+        ])
+
+
+class PerfiladoTests(TestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+
+    def test_tarea_lenta_escribe_folded_y_rota(self):
+        with self.settings(PERFILADO_DIR=self.directorio, PERFILADO_MUESTREO=0, PERFILADO_UMBRAL_SEGUNDOS=0.05,
+                           PERFILADO_INTERVALO_MS=5, PERFILADO_MAX_ARCHIVOS=2):
+            self.assertIsNone(perfilado.Perfil('rapida').iniciar().terminar())
+
+            for _ in range(3):
+                perfil = perfilado.Perfil('apps.courses.tasks.task_analizar_curso_ia').iniciar()
+                time.sleep(0.1)
+                ruta = perfil.terminar(curso_id='abc')
+
+        archivos = [n for n in os.listdir(self.directorio) if n.endswith('.folded')]
+        self.assertEqual(len(archivos), 2)
+        with open(ruta, encoding='utf-8') as f:
+            pila, _, veces = f.readline().rpartition(' ')
+        self.assertTrue(pila.startswith('apps.courses.tasks.task_analizar_curso_ia[curso=abc];'))
+        self.assertIn('PerfiladoTests.test_tarea_lenta_escribe_folded_y_rota', pila)
+        self.assertGreater(int(veces), 0)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ProgresoEnVivoTests(TestCase):
+    def setUp(self):
+        self.escuela = crear_escuela()
+        self.delegado = crear_alumno(self.escuela, 1)
+        self.curso = crear_curso(self.escuela, self.delegado, 'Cálculo Integral')
+
+    def test_stream_fuera_de_asgi_responde_204(self):
+        self.client.force_login(self.delegado)
+        response = self.client.get(reverse('frontend:progress_stream'))
+        self.assertEqual(response.status_code, 204)
+
+    def test_curso_publica_solo_si_cambia_estado_o_meta(self):
+        curso = Curso.objects.get(pk=self.curso.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            curso.descripcion = 'Otro detalle'
+            curso.save()
+            curso.agrupacion_provisional = True
+            curso.save(update_fields=['agrupacion_provisional', 'updated_at'])
+        self.assertEqual(len(callbacks), 0)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            curso.estado = 'META_ALCANZADA'
+            curso.save()
+            curso.save()
+        self.assertEqual(len(callbacks), 1)
+
+    def test_paginas_bajo_wsgi_no_abren_el_stream(self):
+        self.client.force_login(self.delegado)
+        for url in (reverse('frontend:dashboard'), reverse('frontend:course_detail', args=[self.curso.id])):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotContains(response, reverse('frontend:progress_stream'))
+
+    async def test_paginas_bajo_asgi_abren_el_stream(self):
+        await self.async_client.aforce_login(self.delegado)
+        response = await self.async_client.get(reverse('frontend:dashboard'))
+        self.assertContains(response, reverse('frontend:progress_stream'))
+
+    def test_inscripcion_publica_progreso_al_confirmar(self):
+        alumno = crear_alumno(self.escuela, 2)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Inscripcion.objects.create(usuario=alumno, curso=self.curso)
+        self.assertEqual(len(callbacks), 1)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Inscripcion.objects.filter(usuario=alumno).delete()
+        self.assertEqual(len(callbacks), 1)
+
+    def test_difusor_reparte_por_escuela(self):
+        difusor = Difusor()
+        canal, otro = canal_escuela(self.escuela.id), canal_escuela(self.escuela.id + 1)
+        a, b, c = asyncio.Queue(), asyncio.Queue(), asyncio.Queue()
+        difusor._colas[canal].update({a, b})
+        difusor._colas[otro].add(c)
+
+        difusor._repartir(canal, '{"inscritos": 2}')
+        self.assertEqual(a.get_nowait(), '{"inscritos": 2}')
+        self.assertEqual(b.get_nowait(), '{"inscritos": 2}')
+        self.assertTrue(c.empty())
+
+    def test_difusor_descarta_lo_viejo_si_la_cola_esta_llena(self):
+        cola = asyncio.Queue(maxsize=2)
+        for datos in ('1', '2', '3'):
+            Difusor._encolar(cola, datos)
+        self.assertEqual([cola.get_nowait(), cola.get_nowait()], ['2', '3'])
+
+
+class TaxonomiaTests(TestCase):
+    def setUp(self):
+        self.escuela = crear_escuela()
+
+    def test_nombres_sin_queries_una_vez_cargada(self):
+        get_taxonomia()
+        with self.assertNumQueries(0):
+            self.assertEqual(nombre_escuela(self.escuela.id), 'Ingeniería de Sistemas')
+            self.assertEqual(
+                [e.nombre for f in get_taxonomia().arbol for e in f.escuelas], ['Ingeniería de Sistemas']
+            )
+
+    def test_guardar_desde_el_admin_invalida_al_confirmar(self):
+        get_taxonomia()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.escuela.nombre = 'Ciencia de la Computación'
+            self.escuela.save()
+            # Sin commit no se recarga: la transacción todavía puede revertirse
+            self.assertEqual(nombre_escuela(self.escuela.id), 'Ingeniería de Sistemas')
+
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()  # sube la versión en Redis para los demás procesos y olvida la copia local
+        self.assertEqual(nombre_escuela(self.escuela.id), 'Ciencia de la Computación')
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class GetCondicionalTests(TestCase):
+    def setUp(self):
+        self.escuela = crear_escuela()
+        self.alumno = crear_alumno(self.escuela, 1)
+        self.curso = crear_curso(self.escuela, self.alumno, 'Cálculo Integral')
+        self.client.force_login(self.alumno)
+
+    def etag(self, url):
+        self.client.get(url)  # el primer render deja la cookie CSRF, que entra en el ETag
+        return self.client.get(url)['ETag']
+
+    def assertNoModificadaSinQueriesPesadas(self, url):
+        etag = self.etag(url)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(response.templates)
+        # Sesión, usuario y el validador agregado: ni el listado, ni la lista de inscritos, ni similares
+        self.assertEqual(len(ctx.captured_queries), 3, [q['sql'] for q in ctx.captured_queries])
+        self.assertIn('MAX(', ctx.captured_queries[-1]['sql'])
+
+    def test_dashboard_304(self):
+        self.assertNoModificadaSinQueriesPesadas(reverse('frontend:dashboard'))
+
+    def test_detalle_304(self):
+        self.assertNoModificadaSinQueriesPesadas(reverse('frontend:course_detail', args=[self.curso.id]))
+
+    def test_nueva_inscripcion_invalida(self):
+        url = reverse('frontend:course_detail', args=[self.curso.id])
+        etag = self.etag(url)
+        Inscripcion.objects.create(usuario=crear_alumno(self.escuela, 2), curso=self.curso)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
@@ -8,11 +8,14 @@ urlpatterns = [
 
     path('bienvenido/', views.onboarding_view, name='onboarding'),
     path('muro/', views.dashboard_view, name='dashboard'),
+    path('muro/progreso/', views.progress_stream_view, name='progress_stream'),
+    path('buscar/', views.search_view, name='search'),
     path('crear-curso/', views.create_course_view, name='create_course'),
     path('unirse/<uuid:curso_id>/', views.join_course_view, name='join_course'),
     path('salir/<uuid:curso_id>/', views.leave_course_view, name='leave_course'),
 
     path('curso/<uuid:curso_id>/', views.course_detail_view, name='course_detail'),
+    path('curso/<uuid:curso_id>/exportar/<str:formato>/', views.export_roster_view, name='export_roster'),
 
     path('delegar/<uuid:curso_id>/', views.nominate_delegado_view, name='nominate_delegado'),
     path('responder-delegacion/<uuid:curso_id>/<str:accion>/', views.respond_nomination_view,
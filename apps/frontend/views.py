@@ -1,22 +1,63 @@
-from django.db.models import Sum, Q, Exists, OuterRef
+import asyncio
+import logging
+import time
+
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Sum, Q, Exists, OuterRef, Count, Max
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.utils.text import slugify
 from django.contrib.auth.decorators import login_required
 
+from apps.courses.admision import DEMORADO, DIFERIDO, RECHAZADO, evaluar_admision
+from apps.courses.busqueda import buscar_cursos, indexar_curso
+from apps.courses.eventos import canal_escuela, get_difusor
+from apps.courses.exports import (ESTADOS_EXPORTABLES, en_async, enmascarar_apellido, enmascarar_cui, filas_roster,
+                                  generar_csv, generar_xlsx)
 from apps.courses.forms import CursoForm, InscripcionDocForm
-from apps.courses.models import Curso, Inscripcion
-from apps.courses.services import extraer_datos_inteligente
-from apps.users.models import Escuela, Facultad, User
+from apps.courses.models import Curso, CursoAnalisis, CursoSimilar, Inscripcion
+from apps.courses.semantica import buscar_semantico
+from apps.courses.services import extraer_datos_inteligente, calcular_hash_contenido, asignar_grupo_provisional
+from apps.users.models import Escuela, User
+from apps.users.taxonomia import get_taxonomia
 from django.contrib import messages
 from apps.courses.tasks import task_analizar_curso_ia
+from verunsa.limites import LimiteTasa, limitar
+from .condicional import con_validador, validar
+from .middleware import query_budget
 
+logger = logging.getLogger(__name__)
 
-def landing_view(request):
-    return render(request, 'landing.html')
+LIMITE_SUBIDAS = LimiteTasa('subidas', settings.LIMITE_SUBIDAS_RAFAGA, settings.LIMITE_SUBIDAS_POR_HORA)
+LIMITE_INSCRIPCIONES = LimiteTasa('inscripciones', settings.LIMITE_INSCRIPCIONES_RAFAGA,
+                                  settings.LIMITE_INSCRIPCIONES_POR_HORA)
 
 
+# Vistas de solo lectura más visitadas: async para que bajo ASGI (uvicorn) una conexión lenta no ocupe un worker.
+# El ORM se usa con su API async; render() corre en el pool de hilos porque las plantillas tocan
+# relaciones perezosas, request.user y el storage (URLs de S3).
+arender = sync_to_async(render)
+
+
+async def ausuario(request):
+    # auser() y request.user cachean por separado: sin esto las plantillas volverían a cargar al usuario
+    user = await request.auser()
+    request.user = user
+    return user
+
+
+@query_budget(4)
+async def landing_view(request):
+    return await arender(request, 'landing.html')
+
+
+@query_budget(10)
 @login_required
 def onboarding_view(request):
-    if request.user.escuela and request.user.codigo_alumno and request.user.celular:
+    if request.user.escuela_id and request.user.codigo_alumno and request.user.celular:
         return redirect('frontend:dashboard')
 
     if request.method == 'POST':
@@ -48,20 +89,32 @@ def onboarding_view(request):
         else:
             messages.error(request, "Por favor completa todos los campos obligatorios.")
 
-    facultades = Facultad.objects.prefetch_related('escuelas').all()
-
-    return render(request, 'auth/onboarding.html', {'facultades': facultades})
+    return render(request, 'auth/onboarding.html', {'facultades': get_taxonomia().arbol})
 
 
+@query_budget(6)
 @login_required
-def dashboard_view(request):
-    user = request.user
-    if not user.escuela or not user.celular or not user.codigo_alumno:
+async def dashboard_view(request):
+    user = await ausuario(request)
+    if not user.escuela_id or not user.celular or not user.codigo_alumno:
         return redirect('frontend:onboarding')
 
-    filtro_mi_escuela = Q(escuela=user.escuela)
+    filtro_mi_escuela = Q(escuela_id=user.escuela_id)
+
+    filtro_equivalentes = Q(grupo_equivalencia__escuelas=user.escuela_id)
 
-    filtro_equivalentes = Q(grupo_equivalencia__escuelas=user.escuela)
+    # Validador barato antes de lo pesado: si el navegador ya tiene esta versión del muro, 304 sin listar ni renderizar
+    firma = await Curso.objects.filter(filtro_mi_escuela | filtro_equivalentes).aaggregate(
+        cursos=Count('id', distinct=True),
+        cambio=Max('updated_at'),
+        n_inscripciones=Count('inscripciones', distinct=True),
+        cambio_inscripciones=Max('inscripciones__updated_at'),
+    )
+    validador, no_modificada = await validar(
+        request, firma.values(), [firma['cambio'], firma['cambio_inscripciones']]
+    )
+    if no_modificada:
+        return no_modificada
 
     inscrito_subquery = Inscripcion.objects.filter(
         usuario=user,
@@ -72,30 +125,85 @@ def dashboard_view(request):
         Curso.objects
         .filter(filtro_mi_escuela | filtro_equivalentes)
         .annotate(is_inscrito_db=Exists(inscrito_subquery))  # 1 si inscrito, 0 si no
-        .select_related('escuela', 'creador')
+        .annotate(inscritos_count=Count('inscripciones', distinct=True))
+        .select_related('creador')
         .distinct()
         .order_by('-is_inscrito_db', '-created_at')
     )
 
-    mis_inscripciones_ids = Inscripcion.objects.filter(usuario=user).values_list('curso_id', flat=True)
-
-    for curso in cursos:
-        curso.is_inscrito = curso.id in mis_inscripciones_ids
+    lista_cursos = []
+    async for curso in cursos:
+        curso.is_inscrito = curso.is_inscrito_db
 
-        curso.is_equivalente = (curso.escuela != user.escuela)
+        curso.is_equivalente = (curso.escuela_id != user.escuela_id)
+        lista_cursos.append(curso)
 
     context = {
-        'cursos': cursos
+        'cursos': lista_cursos,
+        'progreso_en_vivo': isinstance(request, ASGIRequest),
     }
-    return render(request, 'muro/dashboard.html', context)
+    return con_validador(await arender(request, 'muro/dashboard.html', context), validador)
 
 
+@query_budget(9)
 @login_required
+def search_view(request):
+    """
+    Búsqueda limitada a lo que el usuario ve en su muro: por palabras (nombre, código y temas del sílabo
+    sobre el índice invertido) o por significado (?modo=semantico, embeddings).
+    """
+    user = request.user
+    if not user.escuela_id or not user.celular or not user.codigo_alumno:
+        return redirect('frontend:onboarding')
+
+    consulta = request.GET.get('q', '').strip()[:200]
+    semantico = settings.BUSQUEDA_SEMANTICA_WEB and request.GET.get('modo') == 'semantico'
+    cursos = []
+
+    if consulta:
+        ranking = buscar_semantico(user, consulta) if semantico else buscar_cursos(user, consulta)
+        posicion = {curso_id: i for i, (curso_id, _) in enumerate(ranking)}
+
+        inscrito_subquery = Inscripcion.objects.filter(usuario=user, curso=OuterRef('pk'))
+        cursos = sorted(
+            Curso.objects
+            # El índice semántico puede tener grupos de hace unos minutos: la BD tiene la última palabra
+            .filter(Q(escuela_id=user.escuela_id) | Q(grupo_equivalencia__escuelas=user.escuela_id), id__in=posicion)
+            .distinct()
+            .annotate(is_inscrito_db=Exists(inscrito_subquery))
+            .annotate(inscritos_count=Count('inscripciones', distinct=True))
+            .select_related('creador'),
+            key=lambda c: posicion[c.id]
+        )
+
+        for curso in cursos:
+            curso.is_inscrito = curso.is_inscrito_db
+            curso.is_equivalente = (curso.escuela_id != user.escuela_id)
+
+    return render(request, 'muro/buscar.html', {
+        'cursos': cursos,
+        'consulta': consulta,
+        'semantico': semantico,
+        'semantica_disponible': settings.BUSQUEDA_SEMANTICA_WEB,
+    })
+
+
+@query_budget(16)
+@login_required
+@limitar(LIMITE_SUBIDAS)
 def create_course_view(request):
     """
     Permite al estudiante proponer un nuevo curso y agenda el análisis IA en background.
     """
     if request.method == 'POST':
+        # Con la cola saturada se rechaza antes de gastar CPU leyendo el PDF
+        admision = evaluar_admision()
+        if admision.decision == RECHAZADO:
+            messages.error(request,
+                           f"Estamos recibiendo demasiados sílabos en este momento. Intenta de nuevo en "
+                           f"unos {admision.espera_minutos} minutos; tu curso no se ha creado.")
+            return redirect('frontend:dashboard')
+
         form = CursoForm(request.POST, request.FILES)
         if form.is_valid():
             syllabus_file = request.FILES.get('syllabus')
@@ -112,11 +220,12 @@ def create_course_view(request):
                 return render(request, 'courses/create.html', {'form': form})
 
             contenido_limpio = datos_pdf['contenido_raw']
+            contenido_hash = calcular_hash_contenido(contenido_limpio)
 
             if contenido_limpio:
-                duplicado = Curso.objects.filter(
-                    creador=request.user,
-                    contenido_cache=contenido_limpio
+                duplicado = CursoAnalisis.objects.filter(
+                    curso__creador=request.user,
+                    contenido_hash=contenido_hash
                 ).exists()
 
                 if duplicado:
@@ -143,18 +252,38 @@ def create_course_view(request):
                 return redirect('frontend:dashboard')
 
             curso.creador = request.user
-            curso.escuela = request.user.escuela
-            curso.contenido_cache = datos_pdf['contenido_raw']
+            curso.escuela_id = request.user.escuela_id
             curso.save()
+            request.curso_id = curso.id  # etiqueta del perfil (verunsa.perfilado)
+
+            CursoAnalisis.objects.create(
+                curso=curso,
+                contenido_cache=contenido_limpio,
+                contenido_hash=contenido_hash,
+                analisis_diferido=(admision.decision == DIFERIDO)
+            )
+
+            # Visible de inmediato para escuelas equivalentes; el análisis IA confirma o corrige
+            asignar_grupo_provisional(curso)
+            indexar_curso(curso, tokens=[])
 
             # Inscripción del delegado
             Inscripcion.objects.create(usuario=request.user, curso=curso)
 
-            # Tarea Asíncrona
-            task_analizar_curso_ia.delay(curso.id)
-
-            messages.success(request,
-                             "¡Curso creado exitosamente! Nuestra IA está analizando el sílabo en segundo plano para encontrar equivalencias. Se mostrará en el muro si se agrupa automáticamente.")
+            # Tarea Asíncrona (los diferidos los encola task_encolar_diferidos cuando baje la cola)
+            if admision.decision == DIFERIDO:
+                messages.success(request,
+                                 f"¡Curso creado exitosamente! Hay muchos sílabos en análisis: el tuyo empezará cuando baje la "
+                                 f"carga (aprox. {admision.espera_minutos} minutos). Mientras tanto ya es visible en el muro.")
+            else:
+                task_analizar_curso_ia.delay(curso.id)
+                if admision.decision == DEMORADO:
+                    messages.success(request,
+                                     f"¡Curso creado exitosamente! Hay {admision.en_cola} sílabos antes que el tuyo: el análisis "
+                                     f"de equivalencias tomará aprox. {admision.espera_minutos} minutos.")
+                else:
+                    messages.success(request,
+                                     "¡Curso creado exitosamente! Nuestra IA está analizando el sílabo en segundo plano para encontrar equivalencias. Se mostrará en el muro si se agrupa automáticamente.")
 
             return redirect('frontend:dashboard')
 
@@ -164,7 +293,9 @@ def create_course_view(request):
     return render(request, 'courses/create.html', {'form': form})
 
 
+@query_budget(16)
 @login_required
+@limitar(LIMITE_INSCRIPCIONES, metodos=('GET', 'POST'))
 def join_course_view(request, curso_id):
     curso = get_object_or_404(Curso, id=curso_id)
     user = request.user
@@ -222,42 +353,57 @@ def leave_course_view(request, curso_id):
     return redirect('frontend:dashboard')
 
 
+@query_budget(10)
 @login_required
-def course_detail_view(request, curso_id):
-    user = request.user
+async def course_detail_view(request, curso_id):
+    user = await ausuario(request)
 
-    if not user.escuela:
+    if not user.escuela_id:
         return redirect('frontend:onboarding')
 
-    curso = get_object_or_404(Curso, id=curso_id)
+    filtro_mi_escuela = Q(escuela_id=user.escuela_id)
+    filtro_equivalentes = Q(grupo_equivalencia__escuelas=user.escuela_id)
+
+    # Validador y chequeo de permiso en una sola query: sin filas, el curso no existe o no es visible
+    firma = await Curso.objects.filter((filtro_mi_escuela | filtro_equivalentes), id=curso_id).aaggregate(
+        cambio=Max('updated_at'),
+        n_inscripciones=Count('inscripciones', distinct=True),
+        cambio_inscripciones=Max('inscripciones__updated_at'),
+        n_similares=Count('similares', distinct=True),
+        ultimo_similar=Max('similares__id'),  # el grafo se reescribe con ids nuevos
+    )
+    tiene_permiso = firma['cambio'] is not None
 
-    filtro_mi_escuela = Q(escuela=user.escuela)
-    filtro_equivalentes = Q(grupo_equivalencia__escuelas=user.escuela)
+    if tiene_permiso:
+        validador, no_modificada = await validar(
+            request, firma.values(), [firma['cambio'], firma['cambio_inscripciones']]
+        )
+        if no_modificada:
+            return no_modificada
 
-    tiene_permiso = Curso.objects.filter(
-        (filtro_mi_escuela | filtro_equivalentes),
-        id=curso.id
-    ).exists()
+    try:
+        curso = await Curso.objects.select_related('creador', 'delegado_pendiente').aget(id=curso_id)
+    except Curso.DoesNotExist:
+        raise Http404
 
     if not tiene_permiso:
         messages.error(request, "No tienes permisos para ver ese curso (Pertenece a otra escuela).")
         return redirect('frontend:dashboard')
 
-    inscripciones = curso.inscripciones.select_related('usuario__escuela').order_by('created_at')
+    inscripciones = curso.inscripciones.select_related('usuario').order_by('created_at')
+    taxonomia = await sync_to_async(get_taxonomia)()
 
-    es_delegado_actual = (user == curso.creador)
+    es_delegado_actual = (user.id == curso.creador_id)
 
     lista_alumnos = []
-    for insc in inscripciones:
+    async for insc in inscripciones:
         u = insc.usuario
 
         # 1. Enmascarar apellido
-        apellido_safe = f"{u.last_name[0]}****" if u.last_name else "****"
+        apellido_safe = enmascarar_apellido(u.last_name)
 
         # 2. Enmascarar CUI
-        cui_safe = "****"
-        if u.codigo_alumno and len(u.codigo_alumno) >= 4:
-            cui_safe = "****" + u.codigo_alumno[-4:]
+        cui_safe = enmascarar_cui(u.codigo_alumno)
 
         wa_link = None
         if u.celular:
@@ -270,32 +416,88 @@ def course_detail_view(request, curso_id):
             'nombre': u.first_name,
             'apellido': apellido_safe,
             'cui': cui_safe,
-            'escuela_nombre': u.escuela.nombre if u.escuela else "Sin Escuela",
+            'escuela_nombre': taxonomia.nombre_escuela(u.escuela_id, "Sin Escuela"),
             'fecha': insc.created_at,
-            'es_delegado_rol': (u == curso.creador),
+            'es_delegado_rol': (u.id == curso.creador_id),
             'documento': insc.documento,
             'wa_link': wa_link,
-            'es_mi_fila': (u == request.user)
+            'es_mi_fila': (u.id == user.id)
         })
 
-    is_inscrito = Inscripcion.objects.filter(usuario=request.user, curso=curso).exists()
+    curso.inscritos_count = len(lista_alumnos)
+
+    is_inscrito = await Inscripcion.objects.filter(usuario=user, curso=curso).aexists()
+
+    # Grafo precalculado: una query sobre el índice (curso, -score), solo vecinos que el usuario puede abrir
+    similares = [
+        s async for s in
+        CursoSimilar.objects
+        .filter(curso=curso)
+        .filter(Q(similar__escuela_id=user.escuela_id) | Q(similar__grupo_equivalencia__escuelas=user.escuela_id))
+        .select_related('similar')
+        .distinct()
+        .order_by('-score')
+    ]
 
     context = {
         'curso': curso,
         'alumnos': lista_alumnos,
         'is_inscrito': is_inscrito,
         'es_delegado': es_delegado_actual,
-        'doc_form': InscripcionDocForm()
+        'puede_exportar': es_delegado_actual and curso.estado in ESTADOS_EXPORTABLES,
+        'doc_form': InscripcionDocForm(),
+        'similares': similares,
+        'progreso_en_vivo': isinstance(request, ASGIRequest),
     }
-    return render(request, 'courses/detail.html', context)
+    return con_validador(await arender(request, 'courses/detail.html', context), validador)
 
 
+async def eventos_progreso(escuela_id):
+    """
+    Stream SSE del canal de la escuela: un evento 'progreso' por mensaje y un comentario de latido para
+    que proxies y balanceadores no corten la conexión. Termina tras SSE_DURACION_MAXIMA; EventSource
+    reconecta solo y así las conexiones se reparten entre workers.
+    """
+    yield f"retry: {settings.SSE_REINTENTO_MS}\n\n"
+    try:
+        async with get_difusor().suscribir(canal_escuela(escuela_id)) as cola:
+            fin = time.monotonic() + settings.SSE_DURACION_MAXIMA
+            while time.monotonic() < fin:
+                try:
+                    datos = await asyncio.wait_for(cola.get(), timeout=settings.SSE_LATIDO_SEGUNDOS)
+                except asyncio.TimeoutError:
+                    yield ": latido\n\n"
+                    continue
+                if datos is None:
+                    break  # se cayó la suscripción del proceso
+                # publicar_progreso envía JSON en una sola línea
+                yield f"event: progreso\ndata: {datos}\n\n"
+    except redis.RedisError as e:
+        logger.warning(f"Stream de progreso interrumpido: {e}")
+
+
+@query_budget(3)
+@login_required
+async def progress_stream_view(request):
+    user = await ausuario(request)
+    # Bajo WSGI el stream ocuparía un worker sync por alumno: las páginas no abren el EventSource y, si llega
+    # igual (una pestaña de antes de cambiar de modo), 204 le indica que no reintente
+    if not isinstance(request, ASGIRequest) or not user.escuela_id:
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(eventos_progreso(user.escuela_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@query_budget(10)
 @login_required
 def leave_course_view(request, curso_id):
     curso = get_object_or_404(Curso, id=curso_id)
     user = request.user
 
-    if curso.creador == user:
+    if curso.creador_id == user.id:
         if curso.inscripciones.count() == 1:
             curso.delete()
             messages.info(request, f"El curso '{curso.nombre}' ha sido eliminado porque eras el único integrante.")
@@ -306,7 +508,7 @@ def leave_course_view(request, curso_id):
                            "No puedes salirte porque eres el Delegado. Debes asignar tu cargo a otro compañero y esperar a que acepte.")
             return redirect('frontend:course_detail', curso_id=curso.id)
 
-    if curso.delegado_pendiente == user:
+    if curso.delegado_pendiente_id == user.id:
         curso.delegado_pendiente = None
         curso.save()
 
@@ -318,11 +520,44 @@ def leave_course_view(request, curso_id):
     return redirect('frontend:dashboard')
 
 
+@query_budget(6)
+@login_required
+def export_roster_view(request, curso_id, formato):
+    curso = get_object_or_404(Curso, id=curso_id)
+
+    if curso.creador_id != request.user.id:
+        messages.error(request, "Solo el delegado puede exportar la lista de inscritos.")
+        return redirect('frontend:course_detail', curso_id=curso.id)
+    if curso.estado not in ESTADOS_EXPORTABLES:
+        messages.error(request, "La lista se puede exportar cuando el curso alcanza la meta de inscritos.")
+        return redirect('frontend:course_detail', curso_id=curso.id)
+
+    alcance_grupo = request.GET.get('alcance') == 'grupo'
+    filas = filas_roster(curso, alcance_grupo=alcance_grupo)
+
+    if formato == 'csv':
+        contenido, content_type = generar_csv(filas), 'text/csv; charset=utf-8'
+    elif formato == 'xlsx':
+        contenido = generar_xlsx(filas)
+        content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        raise Http404("Formato no soportado")
+
+    if isinstance(request, ASGIRequest):
+        contenido = en_async(contenido)
+    response = StreamingHttpResponse(contenido, content_type=content_type)
+
+    nombre = f"inscritos-{slugify(curso.nombre)}{'-grupo' if alcance_grupo else ''}.{formato}"
+    response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return response
+
+
+@query_budget(8)
 @login_required
 def nominate_delegado_view(request, curso_id):
     curso = get_object_or_404(Curso, id=curso_id)
 
-    if curso.creador != request.user:
+    if curso.creador_id != request.user.id:
         return redirect('frontend:dashboard')
 
     if request.method == 'POST':
@@ -342,11 +577,12 @@ def nominate_delegado_view(request, curso_id):
     return render(request, 'courses/nominate.html', {'curso': curso, 'candidatos': candidatos})
 
 
+@query_budget(6)
 @login_required
 def respond_nomination_view(request, curso_id, accion):
     curso = get_object_or_404(Curso, id=curso_id)
 
-    if curso.delegado_pendiente != request.user:
+    if curso.delegado_pendiente_id != request.user.id:
         messages.error(request, "No tienes una solicitud pendiente para este curso.")
         return redirect('frontend:dashboard')
 
@@ -365,13 +601,14 @@ def respond_nomination_view(request, curso_id, accion):
     return redirect('frontend:dashboard')
 
 
+@query_budget(7)
 @login_required
 def upload_document_view(request, inscripcion_id):
     inscripcion = get_object_or_404(Inscripcion, id=inscripcion_id)
 
-    if inscripcion.usuario != request.user:
+    if inscripcion.usuario_id != request.user.id:
         messages.error(request, "No puedes subir documentos de otros.")
-        return redirect('frontend:course_detail', curso_id=inscripcion.curso.id)
+        return redirect('frontend:course_detail', curso_id=inscripcion.curso_id)
 
     if request.method == 'POST':
         form = InscripcionDocForm(request.POST, request.FILES, instance=inscripcion)
@@ -379,20 +616,21 @@ def upload_document_view(request, inscripcion_id):
             form.save()
             messages.success(request, "Documento subido correctamente.")
 
-    return redirect('frontend:course_detail', curso_id=inscripcion.curso.id)
+    return redirect('frontend:course_detail', curso_id=inscripcion.curso_id)
 
 
+@query_budget(7)
 @login_required
 def delete_document_view(request, inscripcion_id):
     inscripcion = get_object_or_404(Inscripcion, id=inscripcion_id)
 
-    if inscripcion.usuario != request.user:
+    if inscripcion.usuario_id != request.user.id:
         messages.error(request, "No tienes permiso.")
-        return redirect('frontend:course_detail', curso_id=inscripcion.curso.id)
+        return redirect('frontend:course_detail', curso_id=inscripcion.curso_id)
 
     if inscripcion.documento:
         inscripcion.documento.delete()
         inscripcion.save()
         messages.info(request, "Documento eliminado.")
 
-    return redirect('frontend:course_detail', curso_id=inscripcion.curso.id)
+    return redirect('frontend:course_detail', curso_id=inscripcion.curso_id)
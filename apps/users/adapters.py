@@ -45,7 +45,7 @@ class MyAccountAdapter(DefaultAccountAdapter):
     def get_login_redirect_url(self, request):
         user = request.user
 
-        if not user.escuela or not user.codigo_alumno or not user.celular:
+        if not user.escuela_id or not user.codigo_alumno or not user.celular:
             return resolve_url('frontend:onboarding')
 
         return resolve_url('frontend:dashboard')
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Area, Escuela, Facultad
+from .taxonomia import invalidar_taxonomia
+
+
+@receiver([post_save, post_delete], sender=Area)
+@receiver([post_save, post_delete], sender=Facultad)
+@receiver([post_save, post_delete], sender=Escuela)
+def invalidar_cache_taxonomia(sender, **kwargs):
+    invalidar_taxonomia()
@@ -0,0 +1,174 @@
+"""
+Taxonomía académica (áreas, facultades y escuelas) en memoria de cada proceso.
+
+Cambia un par de veces por semestre pero se lee en casi todas las páginas: el nombre de la escuela en la
+barra, el muro, las tarjetas, la lista de inscritos y el árbol del onboarding. Cada proceso la carga con
+una sola query y la reutiliza. Para invalidarla entre workers de gunicorn y de Celery hay un contador en
+Redis (taxonomia:version) que sube al guardar o borrar un Área, Facultad o Escuela; cada proceso lo
+consulta como mucho cada TAXONOMIA_REVISION_SEGUNDOS. Si Redis no responde, se recarga por edad.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+
+import redis
+from django.conf import settings
+from django.db import transaction
+
+from verunsa.redis_client import get_redis
+from .models import Escuela
+
+logger = logging.getLogger(__name__)
+
+CLAVE_VERSION = 'taxonomia:version'
+PROVISORIA = 'provisoria'  # nunca coincide con la versión de Redis (bytes)
+_SIN_REDIS = object()
+
+
+@dataclass(frozen=True)
+class NodoEscuela:
+    id: int
+    nombre: str
+    facultad_id: int
+
+
+@dataclass(frozen=True)
+class NodoFacultad:
+    id: int
+    nombre: str
+    area_id: int
+    escuelas: tuple
+
+
+@dataclass(frozen=True)
+class Taxonomia:
+    version: object
+    cargada_en: float
+    areas: dict  # id -> nombre
+    facultades: dict  # id -> NodoFacultad
+    escuelas: dict  # id -> NodoEscuela
+    arbol: tuple  # facultades por nombre, cada una con sus escuelas por nombre (select del onboarding)
+
+    def nombre_escuela(self, escuela_id, defecto=''):
+        escuela = self.escuelas.get(escuela_id)
+        return escuela.nombre if escuela else defecto
+
+    def nombre_facultad(self, facultad_id, defecto=''):
+        facultad = self.facultades.get(facultad_id)
+        return facultad.nombre if facultad else defecto
+
+
+def cargar(version=None):
+    # Una sola query: las facultades y áreas sin escuelas no aparecen en ningún nombre ni en el onboarding
+    filas = (
+        Escuela.objects
+        .order_by('facultad__nombre', 'nombre')
+        .values_list('id', 'nombre', 'facultad_id', 'facultad__nombre', 'facultad__area_id', 'facultad__area__nombre')
+    )
+    areas, datos_facultad, escuelas = {}, {}, {}
+    por_facultad = defaultdict(list)
+    for escuela_id, nombre, facultad_id, nombre_facultad, area_id, nombre_area in filas:
+        escuela = NodoEscuela(escuela_id, nombre, facultad_id)
+        escuelas[escuela_id] = escuela
+        por_facultad[facultad_id].append(escuela)
+        datos_facultad[facultad_id] = (nombre_facultad, area_id)
+        areas[area_id] = nombre_area
+
+    facultades = {
+        facultad_id: NodoFacultad(facultad_id, nombre, area_id, tuple(por_facultad[facultad_id]))
+        for facultad_id, (nombre, area_id) in datos_facultad.items()
+    }
+    return Taxonomia(
+        version=version,
+        cargada_en=time.monotonic(),
+        areas=areas,
+        facultades=facultades,
+        escuelas=escuelas,
+        arbol=tuple(facultades.values()),
+    )
+
+
+_ACTUAL = None
+_REVISADA_EN = 0.0
+_LOCK = threading.Lock()
+
+
+def _version_remota():
+    try:
+        return get_redis().get(CLAVE_VERSION)
+    except redis.RedisError as e:
+        logger.debug(f"Versión de la taxonomía no disponible: {e}")
+        return _SIN_REDIS
+
+
+def get_taxonomia(forzar=False):
+    """
+    Taxonomía del proceso. forzar=True recarga sin esperar al intervalo (falta un id que existe en la BD);
+    esa copia queda PROVISORIA y se vuelve a cargar en la siguiente revisión, así una lectura hecha dentro
+    de una transacción que luego se revierte no sobrevive más de TAXONOMIA_REVISION_SEGUNDOS.
+    """
+    global _ACTUAL, _REVISADA_EN
+    actual = _ACTUAL
+    if actual is not None and not forzar and time.monotonic() - _REVISADA_EN < settings.TAXONOMIA_REVISION_SEGUNDOS:
+        return actual
+
+    with _LOCK:
+        ahora = time.monotonic()
+        if _ACTUAL is not actual and _ACTUAL is not None:
+            return _ACTUAL  # otro hilo la recargó mientras esperábamos
+
+        if forzar:
+            _ACTUAL = cargar(PROVISORIA)
+            _REVISADA_EN = ahora
+            return _ACTUAL
+
+        version = _version_remota()
+        if actual is not None and actual.version == PROVISORIA:
+            vigente = False
+            version = None if version is _SIN_REDIS else version
+        elif version is _SIN_REDIS:
+            vigente = actual is not None and ahora - actual.cargada_en < settings.TAXONOMIA_EDAD_MAXIMA
+            version = actual.version if vigente else None
+        else:
+            vigente = actual is not None and actual.version == version
+
+        if not vigente:
+            _ACTUAL = cargar(version)
+        _REVISADA_EN = ahora
+        return _ACTUAL
+
+
+def nombre_escuela(escuela_id, defecto=''):
+    if not escuela_id:
+        return defecto
+    taxonomia = get_taxonomia()
+    if escuela_id not in taxonomia.escuelas:
+        taxonomia = get_taxonomia(forzar=True)
+    return taxonomia.nombre_escuela(escuela_id, defecto)
+
+
+def olvidar_taxonomia():
+    """
+    Descarta la copia local sin tocar Redis. Para tests: revierten su transacción sin pasar por on_commit.
+    """
+    global _ACTUAL
+    with _LOCK:
+        _ACTUAL = None
+
+
+def _subir_version():
+    olvidar_taxonomia()
+    try:
+        get_redis().incr(CLAVE_VERSION)
+    except redis.RedisError as e:
+        logger.warning(f"No se pudo invalidar la taxonomía en Redis: {e}")
+
+
+def invalidar_taxonomia():
+    """
+    Solo tras el commit: recargar antes leería filas sin confirmar y las marcaría con la versión vieja.
+    Este proceso recarga en el siguiente uso; los demás, al ver la versión nueva.
+    """
+    transaction.on_commit(_subir_version)
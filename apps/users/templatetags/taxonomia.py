@@ -0,0 +1,13 @@
+from django import template
+
+from apps.users import taxonomia
+
+register = template.Library()
+
+
+@register.filter
+def nombre_escuela(escuela_id, defecto=''):
+    """
+    {{ curso.escuela_id|nombre_escuela }}: el nombre sale de la taxonomía en memoria, sin query ni JOIN.
+    """
+    return taxonomia.nombre_escuela(escuela_id, defecto)
@@ -1,4 +1,6 @@
 #!/bin/bash
+# Cualquier paso que falle detiene el despliegue
+set -e
 
 echo "Bajando cambios de GitHub..."
 git pull origin master
@@ -6,9 +8,20 @@ git pull origin master
 echo "Reconstruyendo contenedores..."
 sudo docker compose -f docker-compose.prod.yml up -d --build
 
+# Las columnas antiguas de análisis en Curso se borran al migrar: se respaldan antes y se cargan después
+# en CursoAnalisis. Sin columnas antiguas ambos pasos no hacen nada.
+echo "Respaldando análisis de sílabos..."
+if ! sudo docker compose -f docker-compose.prod.yml exec web python manage.py migrar_analisis_legado --exportar /tmp/analisis_legado.jsonl; then
+    echo "Falló el respaldo: no se migra, migrate borraría contenido_cache y embedding_vector sin copia."
+    exit 1
+fi
+
 echo "Aplicando migraciones..."
 sudo docker compose -f docker-compose.prod.yml exec web python manage.py migrate
 
+echo "Restaurando análisis de sílabos..."
+sudo docker compose -f docker-compose.prod.yml exec web python manage.py migrar_analisis_legado --importar /tmp/analisis_legado.jsonl
+
 echo "Subiendo estáticos a S3..."
 sudo docker compose -f docker-compose.prod.yml exec web python manage.py collectstatic --noinput
 
@@ -0,0 +1,24 @@
+"""
+Configuración de gunicorn para docker-compose.prod.yml.
+
+SERVIDOR_MODO=wsgi (por defecto): workers sync clásicos sobre verunsa.wsgi.
+SERVIDOR_MODO=asgi: workers uvicorn sobre verunsa.asgi; las vistas async (muro, detalle, landing)
+atienden muchas conexiones por worker y las sync corren en el pool de hilos de asgiref.
+"""
+import os
+
+MODO = os.environ.get('SERVIDOR_MODO', 'wsgi')
+
+bind = '0.0.0.0:8000'
+workers = int(os.environ.get('GUNICORN_WORKERS', 3))
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'debug')
+accesslog = '-'
+errorlog = '-'
+
+if MODO == 'asgi':
+    wsgi_app = 'verunsa.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+elif MODO == 'wsgi':
+    wsgi_app = 'verunsa.wsgi:application'
+else:
+    raise RuntimeError(f"SERVIDOR_MODO desconocido: {MODO} (usa wsgi o asgi)")
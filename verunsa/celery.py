@@ -1,8 +1,69 @@
 import os
+import time
+
 from celery import Celery
+from celery.signals import (
+    before_task_publish, task_failure, task_postrun, task_prerun, task_retry, worker_process_init,
+)
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'verunsa.settings')
 
 app = Celery('verunsa')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def precargar_modelos_worker(**kwargs):
+    # Cada hijo prefork carga los modelos al arrancar y no en la primera tarea
+    from django.conf import settings
+    if settings.MODELOS_PRECARGA:
+        from apps.courses.services import precargar_modelos
+        precargar_modelos()
+
+
+@before_task_publish.connect
+def marcar_encolado(headers=None, **kwargs):
+    # Reloj de pared: el productor (web o beat) y el worker son procesos distintos
+    headers.setdefault('encolado_en', time.time())
+
+
+@task_prerun.connect
+def marcar_inicio_tarea(task=None, **kwargs):
+    task._inicio_metricas = time.perf_counter()
+    encolado_en = task.request.get('encolado_en')
+    if encolado_en:
+        from verunsa.metricas import COLA_ESPERA
+        cola = (task.request.delivery_info or {}).get('routing_key') or 'desconocida'
+        COLA_ESPERA.observar(max(0.0, time.time() - encolado_en), cola=cola, tarea=task.name)
+    from django.conf import settings
+    if settings.PERFILADO_ENABLED:
+        from verunsa.perfilado import Perfil
+        task._perfil = Perfil(task.name).iniciar()
+
+
+@task_postrun.connect
+def registrar_duracion_tarea(task=None, state=None, args=None, kwargs=None, **extra):
+    perfil = getattr(task, '_perfil', None)
+    if perfil is not None:
+        from verunsa.perfilado import curso_id_de_tarea
+        task._perfil = None
+        perfil.terminar(curso_id=curso_id_de_tarea(task, args, kwargs))
+
+    inicio = getattr(task, '_inicio_metricas', None)
+    if inicio is None:
+        return
+    from verunsa.metricas import TAREA_DURACION
+    TAREA_DURACION.observar(time.perf_counter() - inicio, tarea=task.name, estado=state or 'UNKNOWN')
+
+
+@task_retry.connect
+def registrar_reintento(sender=None, **kwargs):
+    from verunsa.metricas import TAREA_REINTENTOS
+    TAREA_REINTENTOS.inc(tarea=sender.name)
+
+
+@task_failure.connect
+def registrar_fallo(sender=None, exception=None, **kwargs):
+    from verunsa.metricas import TAREA_FALLOS
+    TAREA_FALLOS.inc(tarea=sender.name, excepcion=type(exception).__name__)
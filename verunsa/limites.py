@@ -0,0 +1,99 @@
+"""
+Límites de tasa por usuario con token bucket en Redis.
+
+Todo el cálculo ocurre dentro de un script Lua (atómico), con el reloj de Redis: varios workers de
+gunicorn y uvicorn comparten el mismo bucket sin carreras ni desfase de relojes. Si Redis no responde
+el límite deja pasar: preferimos no bloquear a los alumnos por una caída de infraestructura.
+"""
+import logging
+from functools import wraps
+
+import redis
+from django.conf import settings
+from django.contrib import messages
+from django.shortcuts import redirect
+
+from .metricas import Contador
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+LIMITES_EXCEDIDOS = Contador('rate_limited_total', "Requests rechazados por límite de tasa")
+
+TOKEN_BUCKET = """
+local capacidad = tonumber(ARGV[1])
+local por_segundo = tonumber(ARGV[2])
+local reloj = redis.call('TIME')
+local ahora = tonumber(reloj[1]) + tonumber(reloj[2]) / 1000000
+
+local estado = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(estado[1]) or capacidad
+local ts = tonumber(estado[2]) or ahora
+tokens = math.min(capacidad, tokens + math.max(0, ahora - ts) * por_segundo)
+
+local permitido = 0
+local espera = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    permitido = 1
+else
+    espera = (1 - tokens) / por_segundo
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', ahora)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacidad / por_segundo) + 1)
+return {permitido, tostring(espera)}
+"""
+
+
+class LimiteTasa:
+    """
+    `capacidad` acciones seguidas como máximo; el bucket se recarga a `por_hora` acciones por hora.
+    """
+
+    def __init__(self, nombre, capacidad, por_hora):
+        self.nombre = nombre
+        self.capacidad = capacidad
+        self.por_segundo = por_hora / 3600
+        self._script = None
+
+    def consumir(self, identificador):
+        """
+        Devuelve (permitido, segundos hasta el próximo token).
+        """
+        try:
+            if self._script is None:
+                self._script = get_redis().register_script(TOKEN_BUCKET)
+            permitido, espera = self._script(
+                keys=[f'limite:{self.nombre}:{identificador}'],
+                args=[self.capacidad, self.por_segundo],
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Límite {self.nombre} sin Redis, se deja pasar: {e}")
+            return True, 0.0
+        return bool(permitido), float(espera)
+
+
+def _minutos(segundos):
+    return max(1, round(segundos / 60))
+
+
+def limitar(limite, metodos=('POST',)):
+    """
+    Aplica `limite` por usuario a los métodos indicados. Al excederlo avisa cuánto esperar y vuelve al muro.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            if settings.LIMITES_ENABLED and request.method in metodos and request.user.is_authenticated:
+                permitido, espera = limite.consumir(request.user.pk)
+                if not permitido:
+                    LIMITES_EXCEDIDOS.inc(limite=limite.nombre)
+                    messages.error(request, f"Demasiados intentos seguidos. Vuelve a intentarlo en "
+                                            f"{_minutos(espera)} minuto(s).")
+                    return redirect('frontend:dashboard')
+            return view_func(request, *args, **kwargs)
+
+        return _wrapped
+
+    return decorator
@@ -0,0 +1,269 @@
+"""
+Métricas en formato de exposición de texto de Prometheus, agregadas en Redis.
+
+Cada worker de gunicorn y cada hijo prefork de Celery escribe con HINCRBYFLOAT sobre los mismos hashes,
+así que el endpoint ve la suma de todos los procesos sin coordinación entre ellos. Los histogramas guardan
+un contador por bucket (no acumulado) más _sum y _count; la acumulación se hace al exponer.
+Si Redis no responde, las métricas se pierden en silencio: nunca rompen un request ni una tarea.
+"""
+import hmac
+import logging
+import time
+from contextlib import contextmanager
+
+import redis
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.http import Http404, HttpResponse
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+BUCKETS_QUERIES = (1, 2, 5, 10, 15, 20, 30, 50, 100, 200)
+BUCKETS_BATCH = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+_REGISTRO = []
+
+
+def _valor_etiqueta(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ').replace('|', '/')
+
+
+def _etiquetas(labels):
+    return ','.join(f'{k}="{_valor_etiqueta(v)}"' for k, v in sorted(labels.items()))
+
+
+def _numero(valor):
+    return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+def _escribir(operaciones, pipe):
+    if not settings.METRICAS_ENABLED:
+        return
+    if pipe is not None:
+        operaciones(pipe)
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        operaciones(pipe)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.debug(f"Métricas no registradas: {e}")
+
+
+@contextmanager
+def lote():
+    """
+    Agrupa varias escrituras en un solo viaje a Redis.
+    """
+    if not settings.METRICAS_ENABLED:
+        yield None
+        return
+    pipe = get_redis().pipeline(transaction=False)
+    yield pipe
+    try:
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.debug(f"Métricas no registradas: {e}")
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda):
+        self.nombre = f'verunsa_{nombre}'
+        self.ayuda = ayuda
+        self.clave = f'metricas:{self.nombre}'
+        _REGISTRO.append(self)
+
+    def _linea(self, sufijo, etiquetas, valor):
+        return f"{self.nombre}{sufijo}{{{etiquetas}}} {_numero(valor)}" if etiquetas else f"{self.nombre}{sufijo} {_numero(valor)}"
+
+
+class Contador(_Metrica):
+    tipo = 'counter'
+
+    def inc(self, valor=1, pipe=None, **labels):
+        _escribir(lambda p: p.hincrbyfloat(self.clave, _etiquetas(labels), valor), pipe)
+
+    def lineas(self, datos):
+        return [self._linea('', etiquetas, valor) for etiquetas, valor in sorted(datos.items())]
+
+
+class Histograma(_Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, buckets=BUCKETS_SEGUNDOS):
+        super().__init__(nombre, ayuda)
+        self.buckets = buckets
+
+    def observar(self, valor, pipe=None, **labels):
+        etiquetas = _etiquetas(labels)
+        bucket = next((_numero(b) for b in self.buckets if valor <= b), '+Inf')
+
+        def operaciones(p):
+            p.hincrbyfloat(self.clave, f'{etiquetas}|{bucket}', 1)
+            p.hincrbyfloat(self.clave, f'{etiquetas}|sum', valor)
+            p.hincrbyfloat(self.clave, f'{etiquetas}|count', 1)
+
+        _escribir(operaciones, pipe)
+
+    @contextmanager
+    def medir(self, **labels):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **labels)
+
+    def lineas(self, datos):
+        series = {}
+        for campo, valor in datos.items():
+            etiquetas, _, sufijo = campo.rpartition('|')
+            series.setdefault(etiquetas, {})[sufijo] = valor
+
+        lineas = []
+        for etiquetas, valores in sorted(series.items()):
+            acumulado = 0.0
+            for le in [_numero(b) for b in self.buckets] + ['+Inf']:
+                acumulado += valores.get(le, 0.0)
+                con_le = f'{etiquetas},le="{le}"' if etiquetas else f'le="{le}"'
+                lineas.append(self._linea('_bucket', con_le, acumulado))
+            lineas.append(self._linea('_sum', etiquetas, valores.get('sum', 0.0)))
+            lineas.append(self._linea('_count', etiquetas, valores.get('count', 0.0)))
+        return lineas
+
+
+# Web
+HTTP_DURACION = Histograma('http_request_duration_seconds', "Latencia de requests por vista")
+HTTP_REQUESTS = Contador('http_requests_total', "Requests por vista, método y clase de estado")
+HTTP_QUERIES = Histograma('http_db_queries', "Queries SQL por request", buckets=BUCKETS_QUERIES)
+
+# Celery y pipeline de sílabos
+TAREA_DURACION = Histograma('celery_task_duration_seconds', "Duración de tareas Celery por estado final")
+TAREA_REINTENTOS = Contador('celery_task_retries_total', "Reintentos de tareas Celery")
+TAREA_FALLOS = Contador('celery_task_failures_total', "Tareas Celery que terminaron en error")
+COLA_ESPERA = Histograma('celery_queue_wait_seconds', "Tiempo desde que se encola una tarea hasta que empieza, por cola")
+ETAPA_DURACION = Histograma('pipeline_stage_duration_seconds', "Duración de cada etapa del análisis de sílabos")
+MODELO_CARGA = Histograma('model_load_seconds', "Tiempo de carga de los modelos IA por proceso")
+INFERENCIA_BATCH = Histograma('inference_batch_size', "Textos por llamada a encode", buckets=BUCKETS_BATCH)
+PDF_PAGINAS = Contador('pdf_pages_parsed_total', "Páginas de PDF extraídas")
+PDF_SEGUNDOS = Contador('pdf_parse_seconds_total', "Segundos dedicados a extraer texto de PDFs")
+
+
+def _profundidad_colas():
+    broker = get_redis(settings.CELERY_BROKER_URL)
+    pipe = broker.pipeline(transaction=False)
+    for cola in settings.COLAS_CELERY:
+        pipe.llen(cola)
+    return [(f'cola="{cola}"', n) for cola, n in zip(settings.COLAS_CELERY, pipe.execute())]
+
+
+# Gauges que se leen al exponer: (nombre, ayuda, función que devuelve [(etiquetas, valor)])
+MEDIDORES = [
+    ('verunsa_celery_queue_length', "Tareas pendientes en cada cola del broker", _profundidad_colas),
+]
+
+
+def exponer():
+    r = get_redis()
+    pipe = r.pipeline(transaction=False)
+    for metrica in _REGISTRO:
+        pipe.hgetall(metrica.clave)
+
+    lineas = []
+    for metrica, datos in zip(_REGISTRO, pipe.execute()):
+        lineas.append(f'# HELP {metrica.nombre} {metrica.ayuda}')
+        lineas.append(f'# TYPE {metrica.nombre} {metrica.tipo}')
+        lineas.extend(metrica.lineas({k.decode(): float(v) for k, v in datos.items()}))
+
+    for nombre, ayuda, funcion in MEDIDORES:
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} gauge')
+        lineas.extend(f'{nombre}{{{etiquetas}}} {_numero(valor)}' for etiquetas, valor in funcion())
+    return '\n'.join(lineas) + '\n'
+
+
+class ContadorQueries:
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        return execute(sql, params, many, context)
+
+
+def _instalar_contador(contador):
+    connection.execute_wrappers.append(contador)
+
+
+def _quitar_contador(contador):
+    connection.execute_wrappers.remove(contador)
+
+
+class MetricasMiddleware:
+    """
+    Latencia, estado y número de queries por request, etiquetados por nombre de URL (no por path).
+    Sirve para WSGI y ASGI: en modo async no fuerza a las vistas async a correr en un hilo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+
+        contador = ContadorQueries()
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(contador):
+            response = self.get_response(request)
+        self._registrar(request, response, time.perf_counter() - inicio, contador.total)
+        return response
+
+    async def __acall__(self, request):
+        contador = ContadorQueries()
+        # El ORM async corre en el hilo sync del request (thread_sensitive): el wrapper va en esa conexión
+        await sync_to_async(_instalar_contador)(contador)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_quitar_contador)(contador)
+        duracion = time.perf_counter() - inicio
+        await sync_to_async(self._registrar, thread_sensitive=False)(request, response, duracion, contador.total)
+        return response
+
+    def _registrar(self, request, response, duracion, queries):
+        match = request.resolver_match
+        vista = match.view_name if match else 'sin_ruta'
+        with lote() as pipe:
+            HTTP_DURACION.observar(duracion, pipe=pipe, vista=vista, metodo=request.method)
+            HTTP_REQUESTS.inc(pipe=pipe, vista=vista, metodo=request.method, estado=f'{response.status_code // 100}xx')
+            HTTP_QUERIES.observar(queries, pipe=pipe, vista=vista)
+
+
+def _autorizada(request):
+    token = settings.METRICAS_TOKEN
+    if not token:
+        return False
+    esquema, _, recibido = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    return esquema.lower() == 'bearer' and hmac.compare_digest(recibido.strip().encode(), token.encode())
+
+
+def vista_metricas(request):
+    if not settings.METRICAS_ENABLED or not _autorizada(request):
+        raise Http404
+    try:
+        cuerpo = exponer()
+    except redis.RedisError as e:
+        return HttpResponse(f"# Redis no disponible: {e}\n", status=503, content_type='text/plain')
+    return HttpResponse(cuerpo, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,198 @@
+"""
+Perfilado por muestreo de pilas para requests y tareas Celery lentas.
+
+Un hilo por proceso toma la pila de cada hilo registrado cada PERFILADO_INTERVALO_MS con
+sys._current_frames(); no instrumenta llamadas, así que el costo no depende del código perfilado.
+Se muestrea todo request/tarea mientras dura, pero solo se escribe el perfil si cae en la fracción
+PERFILADO_MUESTREO o si superó PERFILADO_UMBRAL_SEGUNDOS. La salida es formato "folded"
+(una pila por línea, frames separados por ';' y el conteo al final), que leen flamegraph.pl y speedscope.
+"""
+import fcntl
+import inspect
+import logging
+import os
+import random
+import re
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PROFUNDIDAD_MAXIMA = 128
+
+
+def _nombre_frame(frame):
+    codigo = frame.f_code
+    modulo = frame.f_globals.get('__name__', '?')
+    return f"{modulo}.{getattr(codigo, 'co_qualname', codigo.co_name)}"
+
+
+def _pila(frame):
+    nombres = []
+    while frame is not None and len(nombres) < PROFUNDIDAD_MAXIMA:
+        nombres.append(_nombre_frame(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(nombres))
+
+
+class Muestreador(threading.Thread):
+    def __init__(self, intervalo):
+        super().__init__(name='perfilado', daemon=True)
+        self.intervalo = intervalo
+        self.activos = {}
+        self.lock = threading.Lock()
+
+    def registrar(self, hilo):
+        pilas = Counter()
+        with self.lock:
+            self.activos[hilo] = pilas
+        return pilas
+
+    def liberar(self, hilo):
+        with self.lock:
+            self.activos.pop(hilo, None)
+
+    def run(self):
+        while True:
+            time.sleep(self.intervalo)
+            with self.lock:
+                if not self.activos:
+                    continue
+                frames = sys._current_frames()
+                for hilo, pilas in self.activos.items():
+                    frame = frames.get(hilo)
+                    if frame is not None:
+                        pilas[_pila(frame)] += 1
+
+
+_MUESTREADOR = None
+_PID = None
+
+
+def get_muestreador():
+    # El hilo no sobrevive a un fork: cada worker de gunicorn y cada hijo prefork arranca el suyo
+    global _MUESTREADOR, _PID
+    if _MUESTREADOR is None or _PID != os.getpid():
+        _MUESTREADOR = Muestreador(settings.PERFILADO_INTERVALO_MS / 1000)
+        _MUESTREADOR.start()
+        _PID = os.getpid()
+    return _MUESTREADOR
+
+
+def _seguro(texto):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '-', str(texto)).strip('-')[:80]
+
+
+class Perfil:
+    """
+    perfil = Perfil('frontend:create_course'); perfil.iniciar(); ...; perfil.terminar(curso_id=...)
+    Iniciar y terminar deben llamarse desde el mismo hilo.
+    """
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.hilo = threading.get_ident()
+        self.muestreado = random.random() < settings.PERFILADO_MUESTREO
+        self.pilas = None
+        self.inicio = None
+
+    def iniciar(self):
+        self.pilas = get_muestreador().registrar(self.hilo)
+        self.inicio = time.perf_counter()
+        return self
+
+    def terminar(self, curso_id=None):
+        duracion = time.perf_counter() - self.inicio
+        get_muestreador().liberar(self.hilo)
+        if not self.pilas or not (self.muestreado or duracion >= settings.PERFILADO_UMBRAL_SEGUNDOS):
+            return None
+        try:
+            return escribir_perfil(self.nombre, curso_id, duracion, self.pilas)
+        except OSError as e:
+            logger.warning(f"No se pudo escribir el perfil de {self.nombre}: {e}")
+            return None
+
+
+def escribir_perfil(nombre, curso_id, duracion, pilas):
+    directorio = settings.PERFILADO_DIR
+    os.makedirs(directorio, exist_ok=True)
+
+    # La raíz de cada pila lleva la etiqueta, así se distingue al combinar varios archivos
+    raiz = f"{nombre}[curso={curso_id}]" if curso_id else nombre
+    partes = [time.strftime('%Y%m%d-%H%M%S'), _seguro(nombre), f'{int(duracion * 1000)}ms']
+    if curso_id:
+        partes.insert(2, _seguro(curso_id))
+    ruta = os.path.join(directorio, '_'.join(partes) + f'_{os.getpid()}-{secrets.token_hex(3)}.folded')
+
+    fd, temporal = tempfile.mkstemp(dir=directorio, suffix='.part')
+    with os.fdopen(fd, 'w', encoding='utf-8') as salida:
+        for pila, veces in pilas.most_common():
+            salida.write(f"{raiz};{pila} {veces}\n")
+    os.replace(temporal, ruta)
+
+    rotar(directorio, settings.PERFILADO_MAX_ARCHIVOS, settings.PERFILADO_MAX_MB * 1024 * 1024)
+    logger.info(f"Perfil de {nombre} ({duracion:.2f}s) en {ruta}")
+    return ruta
+
+
+def rotar(directorio, max_archivos, max_bytes):
+    """
+    Borra los perfiles más antiguos hasta quedar dentro de ambos límites. Se serializa con flock
+    porque varios procesos escriben en el mismo directorio.
+    """
+    with open(os.path.join(directorio, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archivos = []
+        for n in os.listdir(directorio):
+            if not n.endswith('.folded'):
+                continue
+            try:
+                st = os.stat(os.path.join(directorio, n))
+            except FileNotFoundError:
+                continue
+            archivos.append((st.st_mtime, n, st.st_size))
+
+        archivos.sort()
+        total = sum(tamano for _, _, tamano in archivos)
+        while archivos and (len(archivos) > max_archivos or total > max_bytes):
+            _, n, tamano = archivos.pop(0)
+            try:
+                os.unlink(os.path.join(directorio, n))
+            except FileNotFoundError:
+                pass
+            total -= tamano
+
+
+class PerfiladoMiddleware:
+    """
+    Etiqueta con el nombre de URL y el curso_id de la ruta; las vistas que crean el curso
+    pueden dejarlo en request.curso_id. Es solo sync (muestrea el hilo del request): bajo ASGI
+    las vistas async pasan a correr en un hilo mientras el perfilado esté activo.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        perfil = Perfil('request').iniciar()
+        try:
+            return self.get_response(request)
+        finally:
+            match = request.resolver_match
+            if match:
+                perfil.nombre = match.view_name
+            curso_id = (match.kwargs.get('curso_id') if match else None) or getattr(request, 'curso_id', None)
+            perfil.terminar(curso_id=curso_id)
+
+
+def curso_id_de_tarea(task, args, kwargs):
+    try:
+        return inspect.signature(task.run).bind_partial(*(args or ()), **(kwargs or {})).arguments.get('curso_id')
+    except (TypeError, ValueError):
+        return None
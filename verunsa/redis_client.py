@@ -0,0 +1,20 @@
+import redis
+from django.conf import settings
+
+_CLIENTES = {}
+
+
+def get_redis(url=None):
+    """
+    Cliente Redis compartido del proceso (métricas, límites, pub/sub). Por defecto REDIS_URL; el broker de
+    Celery se pide con su propia URL. redis-py recrea el pool tras un fork, así que es seguro entre hijos
+    de gunicorn y prefork de Celery.
+    """
+    url = url or settings.REDIS_URL
+    if url not in _CLIENTES:
+        _CLIENTES[url] = redis.Redis.from_url(
+            url,
+            socket_connect_timeout=settings.REDIS_TIMEOUT,
+            socket_timeout=settings.REDIS_TIMEOUT,
+        )
+    return _CLIENTES[url]
@@ -11,7 +11,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import json
 import os
+import tempfile
 from pathlib import Path
+from celery.schedules import crontab
 from django.core.exceptions import ImproperlyConfigured
 from django.contrib.messages import constants as messages
 
@@ -104,6 +106,34 @@ MIDDLEWARE = [
     'allauth.account.middleware.AccountMiddleware',
 ]
 
+# Conteo de queries por request, solo para desarrollo/staging
+QUERY_BUDGET_MIDDLEWARE = get_env_variable('QUERY_BUDGET_MIDDLEWARE', 'False') == 'True'
+QUERY_BUDGET_DEFAULT = int(get_env_variable('QUERY_BUDGET_DEFAULT', 30))
+
+if QUERY_BUDGET_MIDDLEWARE:
+    MIDDLEWARE.insert(0, 'apps.frontend.middleware.QueryBudgetMiddleware')
+
+# Métricas Prometheus agregadas en Redis (web + Celery), expuestas en /internal/metrics/
+METRICAS_ENABLED = get_env_variable('METRICAS_ENABLED', 'True') == 'True'
+# Prometheus se autentica con 'Authorization: Bearer <token>' (bearer_token en el scrape_config). Sin token el
+# endpoint responde 404: detrás del proxy del host todas las IPs parecen internas, así que no se confía en ellas
+METRICAS_TOKEN = get_env_variable('METRICAS_TOKEN', '')
+
+if METRICAS_ENABLED:
+    MIDDLEWARE.insert(0, 'verunsa.metricas.MetricasMiddleware')
+
+# Perfilado por muestreo (opt-in): escribe .folded para una fracción de requests/tareas y para todas las lentas
+PERFILADO_ENABLED = get_env_variable('PERFILADO_ENABLED', 'False') == 'True'
+PERFILADO_MUESTREO = float(get_env_variable('PERFILADO_MUESTREO', 0.01))
+PERFILADO_UMBRAL_SEGUNDOS = float(get_env_variable('PERFILADO_UMBRAL_SEGUNDOS', 3.0))
+PERFILADO_INTERVALO_MS = int(get_env_variable('PERFILADO_INTERVALO_MS', 10))
+PERFILADO_DIR = get_env_variable('PERFILADO_DIR', os.path.join(tempfile.gettempdir(), 'verunsa-perfiles'))
+PERFILADO_MAX_ARCHIVOS = int(get_env_variable('PERFILADO_MAX_ARCHIVOS', 200))
+PERFILADO_MAX_MB = int(get_env_variable('PERFILADO_MAX_MB', 100))
+
+if PERFILADO_ENABLED:
+    MIDDLEWARE.insert(0, 'verunsa.perfilado.PerfiladoMiddleware')
+
 ROOT_URLCONF = 'verunsa.urls'
 
 TEMPLATES = [
@@ -217,6 +247,28 @@ if AWS_ACCESS_KEY_ID and AWS_STORAGE_BUCKET_NAME:
     STATIC_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/static/'
     MEDIA_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/media/'
 
+# Modelos IA: en producción se cargan solo desde el bundle local (manage.py descargar_modelos)
+MODELOS_DIR = get_env_variable('MODELOS_DIR', str(BASE_DIR / 'modelos'))
+MODELOS_OFFLINE = get_env_variable('MODELOS_OFFLINE', 'False') == 'True'
+MODELOS_PRECARGA = get_env_variable('MODELOS_PRECARGA', 'True') == 'True'
+
+# Backend de inferencia para embeddings: 'torch' (fp32), 'int8' (cuantización dinámica) u 'onnx'.
+# Validar con manage.py paridad_embeddings antes de cambiarlo: los umbrales 0.82/0.92 dependen de él.
+EMBEDDING_BACKEND = get_env_variable('EMBEDDING_BACKEND', 'torch')
+
+# Cache local de sílabos descargados por los workers
+SYLLABUS_CACHE_ENABLED = get_env_variable('SYLLABUS_CACHE_ENABLED', 'True') == 'True'
+SYLLABUS_CACHE_DIR = get_env_variable('SYLLABUS_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'verunsa-silabos'))
+SYLLABUS_CACHE_MAX_MB = int(get_env_variable('SYLLABUS_CACHE_MAX_MB', 512))
+
+# Búsqueda semántica: 'exacto', 'aproximado' (IVF) o 'auto' (aproximado desde 20k cursos)
+BUSQUEDA_SEMANTICA_MODO = get_env_variable('BUSQUEDA_SEMANTICA_MODO', 'auto')
+# Activa ?modo=semantico en la web. Cada worker de gunicorn/uvicorn que atienda una búsqueda carga el modelo de
+# embeddings (varios cientos de MB por proceso) más la matriz del índice: dimensionar la memoria antes de activarlo
+BUSQUEDA_SEMANTICA_WEB = get_env_variable('BUSQUEDA_SEMANTICA_WEB', 'False') == 'True'
+BUSQUEDA_SEMANTICA_TTL = int(get_env_variable('BUSQUEDA_SEMANTICA_TTL', 300))
+BUSQUEDA_CACHE_CONSULTAS = int(get_env_variable('BUSQUEDA_CACHE_CONSULTAS', 1024))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -258,14 +310,76 @@ MESSAGE_TAGS = {messages.ERROR: 'danger'}
 
 # Celery
 CELERY_BROKER_URL = get_env_variable('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+CELERY_RESULT_BACKEND = get_env_variable('CELERY_RESULT_BACKEND', CELERY_BROKER_URL)
+CELERY_RESULT_EXPIRES = 3600
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'America/Lima'
 
+# Colas con prioridad: un sílabo recién subido nunca espera detrás de un backfill
+#   interactivo: análisis de cursos subidos desde la web (y readiness de modelos)
+#   masivo: re-análisis y backfills (reanalizar_cursos), en lotes con pausa
+#   mantenimiento: tareas de celery beat
+COLAS_CELERY = ('interactivo', 'masivo', 'mantenimiento')
+CELERY_TASK_DEFAULT_QUEUE = 'interactivo'
+CELERY_TASK_ROUTES = {
+    'apps.courses.tasks.task_analizar_curso_ia': {'queue': 'interactivo'},
+    'apps.courses.tasks.task_estado_modelos': {'queue': 'interactivo'},
+    'apps.courses.tasks.task_compactar_similares': {'queue': 'mantenimiento'},
+    'apps.courses.tasks.task_encolar_diferidos': {'queue': 'mantenimiento'},
+}
+# Tareas largas: cada hijo reserva una sola, así una tarea nueva no queda atrapada detrás de otra en el mismo hijo.
+# El worker masivo lo sube con --prefetch-multiplier en docker-compose.prod.yml
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_BEAT_SCHEDULE = {
+    'compactar-similares': {
+        'task': 'apps.courses.tasks.task_compactar_similares',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'encolar-diferidos': {
+        'task': 'apps.courses.tasks.task_encolar_diferidos',
+        'schedule': 60.0,
+    },
+}
+
+# Redis de uso general (métricas); por defecto el mismo del broker
+REDIS_URL = get_env_variable('REDIS_URL', CELERY_BROKER_URL)
+REDIS_TIMEOUT = float(get_env_variable('REDIS_TIMEOUT', 0.5))
+
+# Entra en el ETag de las páginas con GET condicional (apps.frontend.condicional): cambiarla en cada despliegue
+# evita que un navegador reciba 304 sobre HTML de plantillas anteriores
+VERSION_DESPLIEGUE = get_env_variable('VERSION_DESPLIEGUE', '')
+
+# Taxonomía académica en memoria (ver apps.users.taxonomia): cada cuánto se mira la versión en Redis y
+# edad máxima de la copia local si Redis no responde
+TAXONOMIA_REVISION_SEGUNDOS = int(get_env_variable('TAXONOMIA_REVISION_SEGUNDOS', 10))
+TAXONOMIA_EDAD_MAXIMA = int(get_env_variable('TAXONOMIA_EDAD_MAXIMA', 300))
+
+# Límites por usuario (token bucket en Redis): ráfaga máxima y recarga por hora
+LIMITES_ENABLED = get_env_variable('LIMITES_ENABLED', 'True') == 'True'
+LIMITE_SUBIDAS_RAFAGA = int(get_env_variable('LIMITE_SUBIDAS_RAFAGA', 3))
+LIMITE_SUBIDAS_POR_HORA = int(get_env_variable('LIMITE_SUBIDAS_POR_HORA', 6))
+LIMITE_INSCRIPCIONES_RAFAGA = int(get_env_variable('LIMITE_INSCRIPCIONES_RAFAGA', 10))
+LIMITE_INSCRIPCIONES_POR_HORA = int(get_env_variable('LIMITE_INSCRIPCIONES_POR_HORA', 60))
+
+# Control de admisión del análisis IA según la cola de Celery (ver apps.courses.admision)
+ADMISION_COLA = get_env_variable('ADMISION_COLA', 'interactivo')
+ADMISION_WORKERS = int(get_env_variable('ADMISION_WORKERS', 2))  # --concurrency del worker interactivo
+ADMISION_ESPERA_AVISO = int(get_env_variable('ADMISION_ESPERA_AVISO', 120))
+ADMISION_ESPERA_DIFERIR = int(get_env_variable('ADMISION_ESPERA_DIFERIR', 1800))
+ADMISION_COLA_MAXIMA = int(get_env_variable('ADMISION_COLA_MAXIMA', 1000))
+
+# Progreso de inscripción en vivo (SSE, solo en modo ASGI)
+SSE_LATIDO_SEGUNDOS = int(get_env_variable('SSE_LATIDO_SEGUNDOS', 15))
+SSE_DURACION_MAXIMA = int(get_env_variable('SSE_DURACION_MAXIMA', 300))
+SSE_REINTENTO_MS = int(get_env_variable('SSE_REINTENTO_MS', 5000))
+
 # Seguridad SSL
 ACCOUNT_DEFAULT_HTTP_PROTOCOL = 'https'
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 SECURE_SSL_REDIRECT = True
+# Prometheus raspa por HTTP dentro de la red de Docker
+SECURE_REDIRECT_EXEMPT = [r'^internal/metrics/$']
 SESSION_COOKIE_SECURE = True
 CSRF_COOKIE_SECURE = True
 
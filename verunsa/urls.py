@@ -20,11 +20,15 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from verunsa.metricas import vista_metricas
+
 urlpatterns = [
     path('spany-741/', admin.site.urls),
 
     # URLs de autenticación de Google
     path('accounts/', include('allauth.urls')),
+    # Solo accesible desde la red interna (ver verunsa.metricas)
+    path('internal/metrics/', vista_metricas, name='metricas'),
     # app frontend
     path('', include('apps.frontend.urls')),
 ]